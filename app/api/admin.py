@@ -1,13 +1,29 @@
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
+from app.cores.activity_detector import activity_detector
+from app.cores.auth import hash_pool
+from app.cores.blacklist_index import blacklist_index
+from app.cores.config import USERS_WITH_POSTS_MAX_POSTS_PER_USER
+from app.cores.count_cache import user_count_cache
 from app.cores.dependencies import get_db
+from app.cores.login_guard import login_guard
+from app.cores.maintenance import maintenance_scheduler
+from app.cores.post_search import get_post_search_index
+from app.cores.rate_limiter_engine import rate_limiter_engine
+from app.cores.response_cache import response_cache
+from app.cores.telemetry_storage import telemetry_storage
+from app.cores.token_cache import token_cache
+from app.cores.token_versions import token_versions
+from app.cores.user_cache import user_cache
+from app.cores.user_search import trigram_frequencies
 from app.schemas.response import StandardResponseSchema
 from app.schemas.token_log import TokenLogResponse
-from app.schemas.users import UserReadAdmin, UserWithPostsResponse
+from app.schemas.users import UserIdsRequest, UserReadAdmin, UserWithPostsResponse
 from app.schemas.posts import MessageResponse
+from app.services.auth_service import AuthService
 from app.services.token_log_service import TokenLogService
 from app.services.user_service import UserService
 
@@ -34,16 +50,58 @@ def list_users(
 
 @router.get("/users-with-posts", response_model=StandardResponseSchema)
 def get_users_with_posts(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     name: Optional[str] = Query(None),
     status: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None, description="Giá trị pagination.next_cursor của trang trước (bỏ qua page)"),
+    posts_limit: Optional[int] = Query(
+        None, ge=0, le=USERS_WITH_POSTS_MAX_POSTS_PER_USER, description="Số bài post mới nhất trả về cho mỗi user"
+    ),
     service: UserService = Depends(get_user_service),
 ):
-    result = service.get_users_with_posts_paginated(page, limit, name, status)
+    result = service.get_users_with_posts_paginated(page, limit, name, status, cursor, posts_limit)
+    result["link"] = users_with_posts_links(request, limit, result["pagination"])
     return result
 
 
+def users_with_posts_links(request: Request, limit: int, pagination: dict) -> dict:
+    """Link dựng từ URL của request (giữ nguyên host, prefix và bộ lọc); trang kế dùng cursor."""
+    url = request.url
+    last_page = max((pagination["total"] - 1) // limit + 1, 1)
+    next_cursor = pagination["next_cursor"]
+    return {
+        "self": str(url),
+        "next": str(url.remove_query_params("page").include_query_params(cursor=next_cursor)) if next_cursor else None,
+        "last": str(url.remove_query_params("cursor").include_query_params(page=last_page, limit=limit)),
+    }
+
+
+@router.post("/users/logout", response_model=MessageResponse)
+def logout_users(payload: UserIdsRequest, db: Session = Depends(get_db)):
+    """
+    Admin đăng xuất các người dùng khỏi mọi thiết bị (thu hồi session và access token).
+    """
+    revoked = AuthService(db).logout_all(payload.user_ids)
+    return {"detail": f"Revoked {revoked} access tokens of {len(set(payload.user_ids))} users"}
+
+
+@router.get("/users/search", response_model=list[UserReadAdmin])
+def search_users(
+    q: str = Query(..., min_length=1, max_length=255, description="Chuỗi cần tìm trong username hoặc họ tên"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    status: Optional[bool] = Query(None, description="Trạng thái người dùng: true = active, false = blocked"),
+    service: UserService = Depends(get_user_service),
+):
+    """
+    Tìm người dùng theo tiền tố hoặc chuỗi con của username/họ tên (không phân biệt hoa thường, dấu),
+    kết quả xếp theo độ liên quan.
+    """
+    return service.search_users(q, limit, offset, status)
+
+
 @router.get("/users/{user_id}", response_model=UserReadAdmin)
 def get_user(user_id: int, service: UserService = Depends(get_user_service)):
     """
@@ -78,4 +136,27 @@ def delete_user(user_id: int, service: UserService = Depends(get_user_service)):
 
 @router.get("/token", response_model=List[TokenLogResponse])
 def get_token_logs(token_service: TokenLogService = Depends(get_token_log_service)):
-    return token_service.get_paginated()
\ No newline at end of file
+    return token_service.get_paginated()
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Số liệu vận hành của các thành phần in-memory (cache, bộ đếm...).
+    """
+    return {
+        "token_cache": token_cache.stats(),
+        "blacklist_index": blacklist_index.stats(),
+        "rate_limiter": rate_limiter_engine.stats(),
+        "login_guard": login_guard.stats(),
+        "password_hash_pool": hash_pool.stats(),
+        "activity_detector": activity_detector.stats(),
+        "maintenance": maintenance_scheduler.stats(),
+        "telemetry_storage": telemetry_storage.stats(),
+        "post_search": get_post_search_index().stats(),
+        "response_cache": response_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "user_count_cache": user_count_cache.stats(),
+        "user_search_frequencies": trigram_frequencies.stats(),
+    }
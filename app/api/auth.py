@@ -1,13 +1,20 @@
+import math
 from datetime import datetime, timedelta, timezone
 
 import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Response, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.cores import auth
+from app.cores.auth_utils import Principal, check_token_version
+from app.cores.config import LOGIN_MAX_FAILURES_PER_USERNAME
 from app.cores.dependencies import get_db, get_current_user
+from app.cores.login_guard import login_guard
+from app.cores.unit_of_work import UnitOfWork, in_unit_of_work, savepoint
 from app.models.users import User
+from app.repositories.user_repository import UserRepository
 from app.schemas.active_access_tokens import ActiveAccessTokenCreate
 from app.schemas.response import StandardResponse
 from app.schemas.session import SessionCreate
@@ -25,10 +32,10 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=StandardResponse[UserRead])
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Kiểm tra username và email đã tồn tại chưa
     auth_service = AuthService(db)
-    new_user = auth_service.register_user(user)
+    new_user = await auth_service.register_user(user)
     return {
         "status_code": 200,
         "message": "Success",
@@ -37,27 +44,44 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=StandardResponse[TokenResponse])
-def login(
+async def login(
     response: Response,
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.password):
-        if user:
-            safe_log_token_action(db, user, "login failed", request)
+    # Chặn IP/username đang bị backoff trước khi truy vấn DB hay chạy bcrypt
+    ip = request.client.host if request.client else "unknown"
+    retry_after = login_guard.retry_after(ip, form_data.username)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    # Truy vấn DB chạy trên thread pool; bcrypt chạy trên hash_pool và được chờ trên event loop
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == form_data.username).first()
+    )
+    verified, new_password_hash = False, None
+    if user:
+        verified, new_password_hash = await auth.verify_and_update_password(form_data.password, user.password)
+    if not verified:
+        failures = login_guard.record_failure(ip, form_data.username)
+        # Log gộp: lần sai đầu tiên và mỗi lần chạm ngưỡng chặn, thay vì mỗi lần sai một dòng
+        # Nằm ngoài UnitOfWork nên log được commit ngay dù request trả 401
+        if user and (failures == 1 or failures % LOGIN_MAX_FAILURES_PER_USERNAME == 0):
+            action = "login failed" if failures == 1 else f"login failed x{failures}"
+            await run_in_threadpool(safe_log_token_action, db, user, action, request)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    login_guard.record_success(ip, form_data.username)
+
     if not user.status:
         raise HTTPException(status_code=401, detail="User blocked")
 
-    # Tạo access token và refresh token
-    access_token = auth.create_access_token(data={"sub": user.username})
-    refresh_token = auth.create_refresh_token(data={"sub": user.username})
-
-    # Lưu access token vào DB
-    save_access_token(db, access_token, user.id)
+    data, refresh_token = await run_in_threadpool(start_session, db, user, new_password_hash, request)
 
     # Set refresh token trong cookie HttpOnly
     response.set_cookie(
@@ -69,18 +93,10 @@ def login(
         max_age=7 * 24 * 3600,  # 7 ngày
     )
 
-    safe_log_token_action(db, user, "login", request)
-    log_session(db, refresh_token, request, user)
-
     return {
         "status_code": 200,
         "message": "Success",
-        "data": {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "id": user.id,
-            "username": user.username,
-        }
+        "data": data,
     }
 
 
@@ -90,26 +106,31 @@ def refresh_token(request: Request, response: Response, db: Session = Depends(ge
     if not refresh_token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token missing")
 
-    username = decode_refresh_token_or_raise(refresh_token)
+    payload = decode_refresh_token_or_raise(refresh_token)
 
-    user = db.query(User).filter(User.username == username).first()
+    user = UserRepository(db).get_summary_by_username(payload["sub"])
     if not user or not user.status:
         raise HTTPException(status_code=401, detail="User not found or blocked")
+    # Refresh token cấp trước khi đổi mật khẩu/logout-all không được cấp access token mới
+    check_token_version(payload, user.version)
 
     validate_refresh_session_or_raise(db, refresh_token)
 
-    new_access_token = auth.create_access_token(data={"sub": user.username})
-    save_access_token(db, new_access_token, user.id)
-
-    safe_log_token_action(db, user, "refresh", request)
+    new_access_token = auth.create_access_token(
+        data=auth.user_claims(user.id, user.username, user.role, user.version)
+    )
+    with UnitOfWork(db):
+        save_access_token(db, new_access_token, user.id)
+        safe_log_token_action(db, user, "refresh", request)
 
-    # Trả token mới (client dùng để gọi API)
-    return {
-        "access_token": new_access_token,
-        "token_type": "bearer",
-        "id": user.id,
-        "username": user.username,
-    }
+        # Trả token mới (client dùng để gọi API)
+        data = {
+            "access_token": new_access_token,
+            "token_type": "bearer",
+            "id": user.id,
+            "username": user.username,
+        }
+    return data
 
 
 @router.post("/logout")
@@ -120,15 +141,16 @@ def logout(request: Request, response: Response, db: Session = Depends(get_db)):
 
     session_service = SessionService(db)
     token_service = ActiveAccessTokenService(db)
-    success = session_service.revoke_session(refresh_token)
-
-    # Blacklist access token lấy từ header Authorization
-    auth_header = request.headers.get("Authorization")
-    if auth_header and auth_header.startswith("Bearer "):
-        access_token = auth_header.split(" ")[1]
-        blacklist_service = BlacklistTokenService(db)
-        blacklist_service.blacklist_token(access_token)
-        token_service.delete_token(access_token)
+    with UnitOfWork(db):
+        success = session_service.revoke_session(refresh_token)
+
+        # Blacklist access token lấy từ header Authorization
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            access_token = auth_header.split(" ")[1]
+            blacklist_service = BlacklistTokenService(db)
+            blacklist_service.blacklist_token(access_token)
+            token_service.delete_token(access_token)
     response.delete_cookie("refresh_token")
 
     if not success:
@@ -143,19 +165,9 @@ def logout(request: Request, response: Response, db: Session = Depends(get_db)):
 def logout_all(
     response: Response,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
-    session_service = SessionService(db)
-    session_service.revoke_all_sessions(user.id)
-
-    token_service = ActiveAccessTokenService(db)
-    blacklist_service = BlacklistTokenService(db)
-
-    active_tokens = token_service.get_tokens_by_user_id(user.id)
-    for token in active_tokens:
-        blacklist_service.blacklist_token(token.access_token)
-
-    token_service.delete_tokens_by_user_id(user.id)
+    AuthService(db).logout_all([user.id])
 
     response.delete_cookie("refresh_token")
     return {
@@ -164,12 +176,45 @@ def logout_all(
 
 
 # --- Helper functions ---
+def start_session(db: Session, user: User, new_password_hash, request: Request) -> tuple[dict, str]:
+    """Tạo access/refresh token và ghi DB của lần đăng nhập; trả về (data của response, refresh token)."""
+    # Tạo access token và refresh token
+    claims = auth.user_claims(user.id, user.username, user.role, user.token_version)
+    access_token = auth.create_access_token(data=claims)
+    refresh_token = auth.create_refresh_token(data=claims)
+
+    # Toàn bộ ghi DB của lần đăng nhập được commit một lần
+    with UnitOfWork(db):
+        # Hash được tạo với cost cũ: băm lại theo BCRYPT_ROUNDS hiện tại, không cần user đổi mật khẩu
+        if new_password_hash:
+            UserRepository(db).update_password(user, new_password_hash)
+
+        # Lưu access token vào DB
+        save_access_token(db, access_token, user.id)
+        safe_log_token_action(db, user, "login", request)
+        log_session(db, refresh_token, request, user)
+
+        # Đọc trước khi commit (commit làm user hết hạn, đọc sau sẽ SELECT lại)
+        data = {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "id": user.id,
+            "username": user.username,
+        }
+    return data, refresh_token
+
+
 def safe_log_token_action(db: Session, user: User, action: str, request: Request):
-    """Ghi log hành động token, tránh lỗi gây crash."""
+    """
+    Ghi log hành động token, tránh lỗi gây crash.
+    Trong UnitOfWork log được ghi trong SAVEPOINT: lỗi khi ghi log không làm hỏng transaction của login/refresh.
+    """
     try:
-        log_token_action(db, user, action, request)
+        with savepoint(db):
+            log_token_action(db, user, action, request)
     except Exception:
-        pass
+        if not in_unit_of_work(db):
+            db.rollback()
 
 
 def log_token_action(db: Session, user: User, action: str, request: Request):
@@ -184,9 +229,11 @@ def log_token_action(db: Session, user: User, action: str, request: Request):
         user_agent=agent,
         action=action,
     )
+    # So với log trước đó rồi mới ghi log hiện tại (nếu ghi trước, get_last_log trả về chính log này)
+    suspicious = log_service.is_suspicious(user.id, ip, agent, action)
     log_service.log_token_request(log_data)
 
-    if log_service.is_suspicious(user.id, ip, agent, action):
+    if suspicious:
         suspicious_log = TokenLogCreate(**{**log_data.dict(), "action": f"suspicious {action} detected"})
         log_service.log_token_request(suspicious_log)
 
@@ -206,14 +253,13 @@ def log_session(db: Session, refresh_token: str, request: Request, user: User):
         raise HTTPException(status_code=401, detail="Session creation failed")
 
 
-def decode_refresh_token_or_raise(token: str) -> str:
-    """Giải mã refresh token và trả về username hoặc raise lỗi."""
+def decode_refresh_token_or_raise(token: str) -> dict:
+    """Giải mã refresh token và trả về payload (có sub) hoặc raise lỗi."""
     try:
         payload = auth.decode_token(token)
-        username = payload.get("sub")
-        if not username:
+        if not payload.get("sub"):
             raise HTTPException(status_code=401, detail="Invalid token payload")
-        return username
+        return payload
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
@@ -228,7 +274,7 @@ def save_access_token(db: Session, access_token: str, user_id: int):
     token_service = ActiveAccessTokenService(db)
     token_create = ActiveAccessTokenCreate(
         user_id=user_id,
-        access_token=access_token,
+        token_digest=auth.token_digest(access_token),
         expires_at=datetime.now(timezone.utc) + timedelta(minutes=30),  # ví dụ expire 30 phút
     )
     token_service.create_token(token_create)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from app.schemas.posts import PostCreate, PostUpdate, PostRead, MessageResponse
 
-from app.models.users import User
+from app.cores.auth_utils import Principal
+from app.cores.config import POSTS_PAGE_DEFAULT_LIMIT, POSTS_PAGE_MAX_LIMIT
 from app.cores.dependencies import get_current_user, get_db
+from app.cores.pagination import Page
 from app.services.post_service import PostService
 
 
@@ -14,28 +19,60 @@ def get_post_service(db: Session = Depends(get_db)) -> PostService:
     return PostService(db)
 
 
+@dataclass
+class PostListParams:
+    limit: int = Query(POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=POSTS_PAGE_MAX_LIMIT)
+    cursor: Optional[str] = Query(None, description="Giá trị X-Next-Cursor của trang trước")
+    offset: Optional[int] = Query(None, ge=0, description="Phân trang kiểu cũ; nên dùng cursor")
+    title: Optional[str] = Query(None, min_length=1, max_length=255, description="Lọc bài có tiêu đề chứa chuỗi này")
+
+
+def paginated(page: Page, request: Request, response: Response) -> list:
+    """Body vẫn là danh sách bài post như trước; cursor trang kế nằm trong header X-Next-Cursor và Link."""
+    if page.next_cursor:
+        next_url = request.url.remove_query_params("offset").include_query_params(cursor=page.next_cursor)
+        response.headers["X-Next-Cursor"] = page.next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return page.items
+
+
 @router.get("/", response_model=list[PostRead])
-def get_all_posts(service: PostService = Depends(get_post_service)):
-    return service.get_all_posts_active_users()
+def get_all_posts(request: Request, response: Response, params: PostListParams = Depends(),
+                  service: PostService = Depends(get_post_service)):
+    page = service.get_posts_page(params.limit, params.cursor, params.offset, active_users_only=True, title=params.title)
+    return paginated(page, request, response)
 
 
 @router.get("/me", response_model=list[PostRead])
-def get_my_posts(current_user: User = Depends(get_current_user), service: PostService = Depends(get_post_service)):
-    return service.get_posts_by_user_id(current_user.id)
+def get_my_posts(request: Request, response: Response, params: PostListParams = Depends(),
+                 current_user: Principal = Depends(get_current_user), service: PostService = Depends(get_post_service)):
+    page = service.get_posts_page(params.limit, params.cursor, params.offset, user_id=current_user.id, title=params.title)
+    return paginated(page, request, response)
 
 
 @router.get("/users/{user_id}", response_model=list[PostRead])
-def get_posts_by_user(user_id: int, service: PostService = Depends(get_post_service)):
-    return service.get_posts_by_user_id(user_id)
+def get_posts_by_user(user_id: int, request: Request, response: Response, params: PostListParams = Depends(),
+                      service: PostService = Depends(get_post_service)):
+    page = service.get_posts_page(params.limit, params.cursor, params.offset, user_id=user_id, title=params.title)
+    return paginated(page, request, response)
+
+
+@router.get("/search", response_model=list[PostRead])
+def search_posts(request: Request, response: Response,
+                 q: str = Query(..., min_length=1, max_length=255, description="Từ khóa tìm trong tiêu đề và nội dung"),
+                 limit: int = Query(POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=POSTS_PAGE_MAX_LIMIT),
+                 cursor: Optional[str] = Query(None, description="Giá trị X-Next-Cursor của trang trước"),
+                 service: PostService = Depends(get_post_service)):
+    return paginated(service.search_posts(q, limit, cursor), request, response)
 
 
 @router.post("/", response_model=PostRead)
-def create_post(post: PostCreate, current_user: User = Depends(get_current_user), service: PostService = Depends(get_post_service)):
+def create_post(post: PostCreate, current_user: Principal = Depends(get_current_user), service: PostService = Depends(get_post_service)):
     return service.create_post(post, current_user.id)
 
 
 @router.put("/{post_id}", response_model=MessageResponse)
-def update_post(post_id: int, post: PostUpdate, current_user: User = Depends(get_current_user), service: PostService = Depends(get_post_service)):
+def update_post(post_id: int, post: PostUpdate, current_user: Principal = Depends(get_current_user), service: PostService = Depends(get_post_service)):
     return service.update_post(post_id, post, current_user.id)
 
 
@@ -45,5 +82,5 @@ def get_post(post_id: int, service: PostService = Depends(get_post_service)):
 
 
 @router.delete("/{post_id}", response_model=MessageResponse)
-def delete_post(post_id: int, current_user: User = Depends(get_current_user), service: PostService = Depends(get_post_service)):
+def delete_post(post_id: int, current_user: Principal = Depends(get_current_user), service: PostService = Depends(get_post_service)):
     return service.delete_post(post_id, current_user.id)
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.services.user_service import UserService
-from app.models.users import User
+from app.cores.auth_utils import Principal
 from app.schemas.users import (UserRead, UserUpdateRequest, PasswordChangeRequest, MessageResponse)
 from app.cores.dependencies import get_db, get_current_user
 
@@ -24,7 +24,7 @@ def list_active_users(
 
 @router.get("/me", response_model=UserRead)
 def get_current_user_info(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     service: UserService = Depends(get_user_service)
 ):
     return service.get_user_by_id(current_user.id)
@@ -41,24 +41,24 @@ def get_user_by_id(
 @router.put("/me", response_model=UserRead)
 def update_current_user_info(
     user_update: UserUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     service: UserService = Depends(get_user_service)
 ):
     return service.update_user(current_user.id, user_update)
 
 
 @router.patch("/me/change-password", response_model=MessageResponse)
-def change_current_user_password(
+async def change_current_user_password(
     password_data: PasswordChangeRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     service: UserService = Depends(get_user_service)
 ):
-    return service.update_user_password(current_user.id, password_data)
+    return await service.update_user_password(current_user.id, password_data)
 
 
 @router.delete("/me", response_model=MessageResponse)
 def deactivate_current_user(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     service: UserService = Depends(get_user_service)
 ):
     return service.block_user(current_user.id)
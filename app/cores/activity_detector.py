@@ -0,0 +1,216 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from app.cores.config import (
+    ACTIVITY_DETECTOR_MAX_DEVICES,
+    ACTIVITY_DETECTOR_MAX_USERS,
+    SUSPICIOUS_LOGIN_TIME_WINDOW,
+    SUSPICIOUS_REFRESH_TIME_WINDOW,
+)
+
+
+@dataclass(frozen=True)
+class LastSeen:
+    ip_address: str
+    user_agent: Optional[str]
+    timestamp: datetime  # UTC, không kèm tzinfo (giống cột token_logs.timestamp)
+
+    @property
+    def device(self) -> tuple:
+        return self.ip_address, self.user_agent
+
+
+class UserActivity:
+    """Trạng thái trong bộ nhớ của một user: lần gần nhất theo từng action và các thiết bị gần đây."""
+    __slots__ = ("last", "devices")
+
+    def __init__(self):
+        self.last: dict[str, Optional[LastSeen]] = {}
+        self.devices: "OrderedDict[tuple, datetime]" = OrderedDict()
+
+
+class ActivityRule:
+    """
+    Quy tắc phát hiện hoạt động bất thường. Chỉ được đọc trạng thái trong bộ nhớ (previous, activity),
+    không truy vấn DB. actions là các action mà quy tắc áp dụng.
+    """
+    actions: tuple = ()
+
+    def is_suspicious(self, previous: Optional[LastSeen], current: LastSeen, activity: UserActivity) -> bool:
+        raise NotImplementedError
+
+    def lookback(self) -> Optional[timedelta]:
+        """Lần hoạt động trước cũ hơn khoảng này không ảnh hưởng tới quy tắc (None: không giới hạn)."""
+        return None
+
+
+class LoginLocationChangeRule(ActivityRule):
+    """Đăng nhập từ IP hoặc user agent khác trong khoảng thời gian ngắn sau lần đăng nhập trước."""
+    actions = ("login",)
+
+    def __init__(self, window: timedelta = SUSPICIOUS_LOGIN_TIME_WINDOW):
+        self.window = window
+
+    def is_suspicious(self, previous, current, activity) -> bool:
+        if previous is None:
+            return False
+        changed = previous.ip_address != current.ip_address or previous.user_agent != current.user_agent
+        return changed and current.timestamp - previous.timestamp < self.window
+
+    def lookback(self) -> Optional[timedelta]:
+        return self.window
+
+
+class RapidRefreshRule(ActivityRule):
+    """Refresh token quá dày so với lần refresh trước."""
+    actions = ("refresh",)
+
+    def __init__(self, window: timedelta = SUSPICIOUS_REFRESH_TIME_WINDOW):
+        self.window = window
+
+    def is_suspicious(self, previous, current, activity) -> bool:
+        return previous is not None and current.timestamp - previous.timestamp < self.window
+
+    def lookback(self) -> Optional[timedelta]:
+        return self.window
+
+
+class NewDeviceRule(ActivityRule):
+    """Đăng nhập từ thiết bị (IP, user agent) chưa gặp trong các thiết bị gần đây. Không bật mặc định."""
+    actions = ("login",)
+
+    def is_suspicious(self, previous, current, activity) -> bool:
+        return bool(activity.devices) and current.device not in activity.devices
+
+
+DEFAULT_RULES = (LoginLocationChangeRule(), RapidRefreshRule())
+
+
+class SuspiciousActivityDetector:
+    """
+    Phát hiện login/refresh đáng ngờ bằng trạng thái lần hoạt động gần nhất của từng user giữ trong LRU.
+    Lần đầu gặp (user, action) trạng thái được nạp từ DB qua hàm load_last (một truy vấn, chỉ trong
+    khoảng lookback(action) vì lần hoạt động cũ hơn không làm quy tắc nào đổi kết quả),
+    sau đó mọi lần kiểm tra là O(1) và không truy vấn DB; record() cập nhật trạng thái sau khi log được ghi.
+    """
+
+    def __init__(
+        self,
+        rules=DEFAULT_RULES,
+        max_users: int = ACTIVITY_DETECTOR_MAX_USERS,
+        max_devices: int = ACTIVITY_DETECTOR_MAX_DEVICES,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.rules = list(rules)
+        self.max_users = max_users
+        self.max_devices = max_devices
+        self.clock = clock
+        self._users: "OrderedDict[int, UserActivity]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.seeds = 0
+        self.flagged = 0
+        self.evictions = 0
+
+    def add_rule(self, rule: ActivityRule):
+        self.rules.append(rule)
+
+    @property
+    def actions(self) -> set:
+        return {action for rule in self.rules for action in rule.actions}
+
+    def lookback(self, action: str) -> Optional[timedelta]:
+        """Khoảng thời gian cần nạp lần hoạt động trước của action: lớn nhất trong các quy tắc áp dụng."""
+        lookbacks = [rule.lookback() for rule in self.rules if action in rule.actions]
+        if not lookbacks or None in lookbacks:
+            return None
+        return max(lookbacks)
+
+    def is_suspicious(
+        self,
+        user_id: int,
+        action: str,
+        ip_address: str,
+        user_agent: Optional[str],
+        load_last: Callable[[], Optional[LastSeen]],
+    ) -> bool:
+        rules = [rule for rule in self.rules if action in rule.actions]
+        if not rules:
+            return False
+
+        with self._lock:
+            activity = self._get(user_id)
+            seeded = action in activity.last
+
+        if not seeded:
+            # Nạp ngoài lock để truy vấn DB không chặn các user khác
+            previous = load_last()
+            with self._lock:
+                self.seeds += 1
+                activity = self._get(user_id)
+                if action not in activity.last:
+                    activity.last[action] = previous
+                    if previous is not None:
+                        self._remember_device(activity, previous)
+
+        current = LastSeen(ip_address, user_agent, self.clock())
+        with self._lock:
+            self.checks += 1
+            previous = activity.last.get(action)
+            suspicious = any(rule.is_suspicious(previous, current, activity) for rule in rules)
+            if suspicious:
+                self.flagged += 1
+            return suspicious
+
+    def record(self, user_id: int, action: str, ip_address: str, user_agent: Optional[str]):
+        if action not in self.actions:
+            return
+        seen = LastSeen(ip_address, user_agent, self.clock())
+        with self._lock:
+            activity = self._get(user_id)
+            activity.last[action] = seen
+            self._remember_device(activity, seen)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def _get(self, user_id: int) -> UserActivity:
+        activity = self._users.get(user_id)
+        if activity is None:
+            activity = UserActivity()
+            self._users[user_id] = activity
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._users.move_to_end(user_id)
+        return activity
+
+    def _remember_device(self, activity: UserActivity, seen: LastSeen):
+        activity.devices[seen.device] = seen.timestamp
+        activity.devices.move_to_end(seen.device)
+        while len(activity.devices) > self.max_devices:
+            activity.devices.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "rules": [type(rule).__name__ for rule in self.rules],
+                "checks": self.checks,
+                "seeds": self.seeds,
+                "flagged": self.flagged,
+                "evictions": self.evictions,
+            }
+
+
+activity_detector = SuspiciousActivityDetector()
@@ -1,35 +1,76 @@
+import hashlib
+import uuid
+
 from fastapi import HTTPException
 from passlib.context import CryptContext
-from jose import jwt, JWTError, ExpiredSignatureError
+from jose import JWTError, ExpiredSignatureError
 from datetime import datetime,timedelta,UTC
 
+from app.cores.config import BCRYPT_ROUNDS, JWT_BACKEND
+from app.cores.password_hasher import PasswordHashPool
+from app.cores.token_codec import create_token_codec
+
 SECRET_KEY = "secret"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Key và thuật toán được dựng một lần, dùng lại cho mọi lần encode/decode
+token_codec = create_token_codec(JWT_BACKEND, SECRET_KEY, ALGORITHM)
 
-def verify_password(plain_password, hashed_password):
+# min/max = default để verify_and_update băm lại mọi hash có cost khác chính sách hiện tại (tăng hoặc giảm)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt chạy trên pool riêng, không tranh thread pool mặc định với các endpoint khác
+hash_pool = PasswordHashPool()
+
+def _verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
+def _hash(password):
     return pwd_context.hash(password)
 
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Các hàm băm/kiểm tra mật khẩu là coroutine: gọi từ endpoint async (await), phần truy vấn DB chạy bằng run_in_threadpool
+async def verify_password(plain_password, hashed_password):
+    return await hash_pool.run("verify", _verify, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password, hashed_password):
+    """Trả về (hợp lệ, hash mới hoặc None nếu hash hiện tại đã đúng chính sách)."""
+    return await hash_pool.run("verify", _verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await hash_pool.run("hash", _hash, password)
+
+def user_claims(user_id: int, username: str, role, token_version: int) -> dict:
+    """
+    Claims của access/refresh token: ngoài sub còn có uid, role và ver (users.token_version),
+    đủ để xác thực và phân quyền mà không đọc bảng users (xem auth_utils.get_user_from_payload).
+    """
+    return {"sub": username, "uid": user_id, "role": role.value, "ver": token_version}
+
 def create_access_token(data: dict):
     to_encode = data.copy()
-    to_encode.update({"exp": datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti đảm bảo hai token cấp trong cùng một giây vẫn khác nhau (digest là unique)
+    to_encode.update({"exp": datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), "jti": uuid.uuid4().hex})
+    return token_codec.encode(to_encode)
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
-    to_encode.update({"exp": datetime.now(UTC) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": datetime.now(UTC) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), "jti": uuid.uuid4().hex})
+    return token_codec.encode(to_encode)
 
 
 def decode_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_codec.decode(token)
         return payload
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Access token expired")
@@ -37,3 +78,6 @@ def decode_token(token: str):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def token_digest(token: str) -> str:
+    """SHA-256 (hex) của token, dùng làm khóa tra cứu thay cho chuỗi JWT gốc."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
@@ -2,23 +2,52 @@ from jose import JWTError, ExpiredSignatureError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.cores import auth
-from app.models.users import User
+from app.cores.user_cache import UserSummary
+from app.models.users import RoleEnum
+from app.repositories.user_repository import UserRepository
 
-def validate_token_and_get_user(token: str, db: Session) -> User:
-    try:
-        payload = auth.decode_token(token)
-        username = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+# User đã xác thực chính là summary trong user_cache
+Principal = UserSummary
+
+
+def get_user_from_payload(payload: dict, db: Session) -> Principal:
+    username = payload.get("sub")
+    if username is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-        user = db.query(User).filter(User.username == username).first()
+    repo = UserRepository(db)
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Token cấp trước khi có claim uid/role/ver: đọc user, coi như ver = 0
+        user = repo.get_summary_by_username(username)
         if not user or not user.status:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User blocked or not found")
-
+        check_token_version(payload, user.version)
         return user
 
+    # Block/đổi mật khẩu/logout-all đều tăng token_version, nên token có ver khớp là của user còn hoạt động
+    version = repo.get_token_version(user_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User blocked or not found")
+    check_token_version(payload, version)
+    try:
+        role = RoleEnum(payload.get("role"))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    return Principal(id=user_id, username=username, role=role, status=True, version=version)
+
+
+def check_token_version(payload: dict, current_version: int):
+    if payload.get("ver", 0) != current_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+
+def validate_token_and_get_user(token: str, db: Session) -> Principal:
+    try:
+        payload = auth.decode_token(token)
+        return get_user_from_payload(payload, db)
+
     except ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Access token expired")
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-
@@ -0,0 +1,157 @@
+import math
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional
+
+from app.cores.config import BLACKLIST_BLOOM_CAPACITY, BLACKLIST_BLOOM_ERROR_RATE
+
+
+def _to_timestamp(value: Optional[datetime]) -> float:
+    if value is None:
+        return datetime.now(timezone.utc).timestamp()
+    # DB như SQLite trả về datetime naive, coi là UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class BloomFilter:
+    """Bloom filter trên bytearray, dùng double hashing từ digest SHA-256 của token."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: str):
+        raw = bytes.fromhex(digest)
+        h1 = int.from_bytes(raw[:8], "big")
+        h2 = int.from_bytes(raw[8:16], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, digest: str):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def estimated_false_positive_rate(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class BlacklistIndex:
+    """
+    Chỉ mục in-memory các token đã bị thu hồi: Bloom filter phía trước và tập digest chính xác phía sau.
+    Câu trả lời "chưa bị thu hồi" không cần truy vấn DB; chỉ khi filter báo trúng
+    mà digest không có trong tập chính xác mới phải hỏi lại DB (token có thể do worker khác thu hồi).
+    Khi chưa load (ví dụ chưa chạy lifespan), mọi kiểm tra đều đi thẳng xuống DB.
+
+    Token thu hồi trong process này được add sau khi commit; token do worker khác thu hồi chỉ có mặt
+    sau lần reload kế tiếp (job "blacklist_index", BLACKLIST_INDEX_RELOAD_INTERVAL_SECONDS), nên chu kỳ
+    đó là độ cũ tối đa giữa các worker.
+    """
+
+    def __init__(self, capacity: int = BLACKLIST_BLOOM_CAPACITY, error_rate: float = BLACKLIST_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.loaded = False
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._entries: dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Digest được add trong lúc reload đang đọc DB (None khi không reload)
+        self._added_during_reload: Optional[dict[str, float]] = None
+        self.db_fallbacks = 0
+        self.false_positives = 0
+
+    def load(self, entries: Iterable[tuple[str, Optional[datetime]]]):
+        """Nạp lại toàn bộ index từ các cặp (digest, blacklisted_at)."""
+        self.reload(lambda: entries)
+
+    def reload(self, fetch: Callable[[], Iterable[tuple[str, Optional[datetime]]]]):
+        """
+        Nạp lại index từ fetch() (đọc DB). Digest được add trong lúc fetch đang chạy vẫn được giữ,
+        vì bản đọc có thể bắt đầu trước khi commit của chúng hiển thị.
+        """
+        with self._lock:
+            self._added_during_reload = {}
+        try:
+            loaded = {digest: _to_timestamp(blacklisted_at) for digest, blacklisted_at in fetch()}
+            with self._lock:
+                loaded.update(self._added_during_reload)
+                self._entries = loaded
+                self._rebuild()
+                self.loaded = True
+        finally:
+            with self._lock:
+                self._added_during_reload = None
+
+    def add(self, digest: str, blacklisted_at: Optional[datetime] = None):
+        timestamp = _to_timestamp(blacklisted_at)
+        with self._lock:
+            if self._added_during_reload is not None:
+                self._added_during_reload[digest] = timestamp
+            if digest in self._entries:
+                return
+            self._entries[digest] = timestamp
+            self._bloom.add(digest)
+
+    def might_contain(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._bloom
+
+    def contains(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def record_db_fallback(self, revoked: bool):
+        with self._lock:
+            self.db_fallbacks += 1
+            if not revoked:
+                self.false_positives += 1
+
+    def prune(self, expire_before: datetime) -> int:
+        """Bỏ các digest đã hết hạn giữ và dựng lại Bloom filter (filter không hỗ trợ xóa)."""
+        cutoff = _to_timestamp(expire_before)
+        with self._lock:
+            before = len(self._entries)
+            self._entries = {d: ts for d, ts in self._entries.items() if ts >= cutoff}
+            self._rebuild()
+            return before - len(self._entries)
+
+    def _rebuild(self):
+        # Nới dung lượng khi số token vượt capacity để giữ tỉ lệ dương tính giả
+        capacity = max(self.capacity, len(self._entries) * 2)
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for digest in self._entries:
+            self._bloom.add(digest)
+
+    def stats(self) -> dict:
+        with self._lock:
+            memory_bytes = (
+                sys.getsizeof(self._bloom.bits)
+                + sys.getsizeof(self._entries)
+                + sum(sys.getsizeof(d) for d in self._entries)
+            )
+            return {
+                "loaded": self.loaded,
+                "size": len(self._entries),
+                "bloom_bits": self._bloom.num_bits,
+                "bloom_hashes": self._bloom.num_hashes,
+                "estimated_false_positive_rate": self._bloom.estimated_false_positive_rate(),
+                "observed_false_positives": self.false_positives,
+                "db_fallbacks": self.db_fallbacks,
+                "memory_bytes": memory_bytes,
+            }
+
+
+blacklist_index = BlacklistIndex()
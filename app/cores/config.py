@@ -1,6 +1,7 @@
-# Thời gian token bị blacklist giữ lại (phút)
+import os
 from datetime import timedelta
 
+# Thời gian token bị blacklist giữ lại (phút)
 BLACKLIST_TOKEN_EXPIRE_MINUTES = 30
 
 # Thời gian giữ log request (rate limiting)
@@ -10,8 +11,127 @@ TOKEN_USAGE_LOG_EXPIRE_MINUTES = 1
 RATE_LIMIT_MAX_REQUESTS = 10
 RATE_LIMIT_PERIOD_SECONDS = 10
 
+# Backend của rate limiter: "memory" (sliding window trong process), "sql" (bảng token_usage_log)
+# hoặc "sql_buffered" (token_usage_log, ghi theo lô ở background)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Số key tối đa backend "memory" giữ trong bộ nhớ, key ít dùng nhất bị loại trước
+RATE_LIMIT_MAX_KEYS = 100000
+
+# Bộ đệm ghi token_usage_log cho backend "sql_buffered"
+# Số sự kiện tối đa chờ ghi (vượt quá sẽ bị bỏ), ngưỡng số lượng và chu kỳ (giây) để flush
+TOKEN_USAGE_BUFFER_MAX_EVENTS = 10000
+TOKEN_USAGE_FLUSH_SIZE = 500
+TOKEN_USAGE_FLUSH_INTERVAL_SECONDS = 1.0
+
 # Được dùng để xác định login có đáng ngờ không
 SUSPICIOUS_LOGIN_TIME_WINDOW = timedelta(minutes=2)
 
 # Được dùng để xác định refresh token có đáng ngờ không
-SUSPICIOUS_REFRESH_TIME_WINDOW = timedelta(seconds=10)
\ No newline at end of file
+SUSPICIOUS_REFRESH_TIME_WINDOW = timedelta(seconds=10)
+
+# Số user tối đa giữ trạng thái lần hoạt động gần nhất (IP, user agent, thời điểm) trong bộ nhớ (LRU)
+ACTIVITY_DETECTOR_MAX_USERS = 100000
+# Số thiết bị (IP, user agent) gần nhất nhớ cho mỗi user, dùng cho các quy tắc như NewDeviceRule
+ACTIVITY_DETECTOR_MAX_DEVICES = 8
+
+# Cache token đã xác thực trong AuthMiddleware
+# Số token tối đa giữ trong cache (LRU)
+TOKEN_CACHE_MAX_SIZE = 10000
+# Thời gian tối đa một principal nằm trong cache (giây), không vượt quá exp của token
+TOKEN_CACHE_TTL_SECONDS = 60
+
+# Cache user id -> (username, role, status) dùng cho xác thực và kiểm tra chủ bài viết.
+# Được xóa khi user bị block/unblock/cập nhật/xóa; TTL giới hạn độ cũ giữa các worker
+USER_CACHE_MAX_SIZE = 10000
+USER_CACHE_TTL_SECONDS = 60
+
+# Bảng user id -> token_version dùng để kiểm tra claim "ver" của access token mà không đọc bảng users.
+# Mỗi entry chỉ là hai số nguyên nên có thể giữ nhiều user hơn USER_CACHE_MAX_SIZE;
+# TTL giới hạn thời gian worker khác còn chấp nhận token đã bị thu hồi (block, đổi mật khẩu, logout-all)
+TOKEN_VERSION_MAX_SIZE = 100000
+TOKEN_VERSION_TTL_SECONDS = 60
+
+# Bloom filter cho danh sách token bị thu hồi
+# Số token dự kiến trong blacklist và tỉ lệ dương tính giả mong muốn
+BLACKLIST_BLOOM_CAPACITY = 100000
+BLACKLIST_BLOOM_ERROR_RATE = 0.01
+# Chu kỳ (giây) nạp lại blacklist từ DB. Token bị thu hồi ở worker khác chỉ được worker này thấy sau lần nạp kế tiếp,
+# nên đây là độ cũ tối đa giữa các worker (cộng TOKEN_CACHE_TTL_SECONDS nếu token đang nằm trong token cache)
+BLACKLIST_INDEX_RELOAD_INTERVAL_SECONDS = 30
+
+# Chống dò mật khẩu ở /auth/login (giữ trong bộ nhớ)
+# Số lần sai tối đa theo username / theo IP trước khi bắt đầu chặn với thời gian tăng gấp đôi
+LOGIN_MAX_FAILURES_PER_USERNAME = 5
+LOGIN_MAX_FAILURES_PER_IP = 20
+LOGIN_BACKOFF_BASE_SECONDS = 1
+LOGIN_BACKOFF_MAX_SECONDS = 900
+# Bộ đếm lần sai được reset nếu không có lần sai mới trong khoảng này (giây)
+LOGIN_FAILURE_WINDOW_SECONDS = 900
+LOGIN_GUARD_MAX_KEYS = 100000
+
+# Cost (số vòng log2) của bcrypt; hash cũ có cost khác sẽ được băm lại khi user đăng nhập.
+# Dùng python -m app.scripts.calibrate_bcrypt để chọn giá trị phù hợp với máy chủ
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Pool riêng cho băm/kiểm tra mật khẩu (bcrypt)
+# Loại pool: "thread" hoặc "process"; số worker và số tác vụ được xếp hàng tối đa (vượt quá trả 503)
+PASSWORD_HASH_POOL_KIND = os.getenv("PASSWORD_HASH_POOL_KIND", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
+
+# Backend mã hóa/giải mã JWT: "jose" (python-jose), "hmac" (thư viện chuẩn, chỉ HS*) hoặc "pyjwt" (cần cài PyJWT).
+# Dùng python -m app.cores.token_codec để so sánh throughput giữa các backend
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+
+# Job dọn dẹp nền (chạy ngoài event loop)
+# Chu kỳ (giây) của từng job, độ lệch ngẫu nhiên ±jitter để các worker không chạy cùng lúc
+MAINTENANCE_TOKEN_CLEANUP_INTERVAL_SECONDS = 600
+MAINTENANCE_USAGE_LOG_CLEANUP_INTERVAL_SECONDS = 60
+MAINTENANCE_SESSION_CLEANUP_INTERVAL_SECONDS = 3600
+MAINTENANCE_JITTER_SECONDS = 30
+# Số dòng tối đa mỗi câu DELETE; mỗi lô được commit riêng để không giữ khóa lâu
+MAINTENANCE_DELETE_CHUNK_SIZE = 1000
+
+# Lưu các bảng telemetry (token_usage_log, token_logs, blacklisted_tokens) theo bucket thời gian.
+# "single": một bảng, dọn bằng DELETE theo lô; "bucketed": mỗi giờ/ngày một bảng (vd. token_logs_20250101),
+# hết hạn thì DROP cả bảng và truy vấn chỉ đọc các bucket nằm trong khoảng thời gian cần
+TELEMETRY_STORAGE_MODE = os.getenv("TELEMETRY_STORAGE_MODE", "single")
+# Độ rộng bucket của từng bảng: "hour" hoặc "day"
+TELEMETRY_BUCKET_GRANULARITY = {
+    "token_usage_log": "hour",
+    "blacklisted_tokens": "hour",
+    "token_logs": "day",
+}
+# Thời gian giữ token_logs (ngày), chỉ áp dụng ở chế độ "bucketed"
+TOKEN_LOG_RETENTION_DAYS = 90
+# Chu kỳ (giây) job tạo sẵn bucket kế tiếp và xóa bucket hết hạn
+MAINTENANCE_BUCKET_INTERVAL_SECONDS = 300
+
+# Phân trang keyset cho các endpoint liệt kê bài viết (/posts, /posts/me, /posts/users/{id})
+POSTS_PAGE_DEFAULT_LIMIT = 50
+POSTS_PAGE_MAX_LIMIT = 100
+
+# /admin/users-with-posts: giá trị lớn nhất của posts_limit (số bài post mới nhất trả về cho mỗi user,
+# bỏ trống thì trả mọi bài) và cache tổng số user theo bộ lọc (xóa khi thêm/sửa/block/unblock/xóa user)
+USERS_WITH_POSTS_MAX_POSTS_PER_USER = 100
+USERS_COUNT_CACHE_TTL_SECONDS = 30
+USERS_COUNT_CACHE_MAX_ENTRIES = 1024
+
+# Tìm user theo tên (/admin/users/search, bộ lọc name của /admin/users-with-posts) bằng bảng user_name_trigrams.
+# Ứng viên được lọc bằng USER_SEARCH_CANDIDATE_GRAMS trigram hiếm nhất của truy vấn (phần còn lại kiểm tra bằng LIKE
+# trên users.search_name); tần suất trigram được đếm một lần và giữ trong bộ nhớ theo TTL (giây)
+USER_SEARCH_CANDIDATE_GRAMS = 2
+USER_SEARCH_FREQUENCY_TTL_SECONDS = 600
+USER_SEARCH_FREQUENCY_MAX_ENTRIES = 100000
+
+# Chỉ mục tìm kiếm bài viết cho /posts/search: "fts5" (bảng ảo FTS5 của SQLite), "memory" (inverted index
+# trong process, nạp lại khi khởi động) hoặc "auto" (fts5 nếu DB là SQLite hỗ trợ FTS5, ngược lại memory).
+# Dựng lại chỉ mục: python -m app.scripts.rebuild_post_search_index
+POST_SEARCH_BACKEND = os.getenv("POST_SEARCH_BACKEND", "auto")
+
+# Cache response (body đã serialize + ETag) cho các GET đọc nhiều: /posts/, /posts/{id}, /users/, /users/{id}.
+# Được invalidate theo tag khi PostService/UserService ghi dữ liệu; TTL giới hạn độ cũ giữa các worker
+RESPONSE_CACHE_TTL_SECONDS = 30
+RESPONSE_CACHE_MAX_ENTRIES = 2048
+# Response lớn hơn ngưỡng này (byte) không được cache
+RESPONSE_CACHE_MAX_BODY_BYTES = 1024 * 1024
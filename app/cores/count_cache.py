@@ -0,0 +1,24 @@
+from typing import Optional
+
+from app.cores.config import USERS_COUNT_CACHE_MAX_ENTRIES, USERS_COUNT_CACHE_TTL_SECONDS
+from app.cores.ttl_cache import TTLCache
+from app.cores.user_search import name_matches
+
+# (search_name, status) của một user, đủ để biết user có nằm trong tổng theo bộ lọc (name, status) hay không
+CountedUser = tuple[Optional[str], bool]
+
+
+def is_counted(key: tuple[Optional[str], Optional[bool]], user: Optional[CountedUser]) -> bool:
+    """User có được đếm trong UserRepository.count_users(name, status) hay không (None: user không tồn tại)."""
+    if user is None:
+        return False
+    name, status = key
+    search_name, user_status = user
+    return (status is None or status == user_status) and (not name or name_matches(name, search_name or ""))
+
+
+# Tổng số user theo bộ lọc (name, status) của /admin/users-with-posts; UserRepository chỉ bỏ các tổng
+# mà thay đổi của user làm lệch (is_counted trước và sau khác nhau)
+user_count_cache: TTLCache[tuple[Optional[str], Optional[bool]], int] = TTLCache(
+    USERS_COUNT_CACHE_MAX_ENTRIES, USERS_COUNT_CACHE_TTL_SECONDS
+)
@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.util import find_tables
 import os
 
 
@@ -10,14 +11,58 @@ if os.getenv("ENV", "development") != "production":
 
 # Lấy URL kết nối database từ biến môi trường, nếu không có thì dùng giá trị mặc định
 DATABASE_CONNECTION = os.environ["DATABASE_CONNECTION"]
+# DB riêng cho các bảng telemetry (token_usage_log, token_logs, blacklisted_tokens, active_access_tokens).
+# Không đặt thì dùng chung DATABASE_CONNECTION như trước
+TELEMETRY_DATABASE_CONNECTION = os.getenv("TELEMETRY_DATABASE_CONNECTION") or DATABASE_CONNECTION
 
 
 # Tạo engine để kết nối với cơ sở dữ liệu
 engine = create_engine(DATABASE_CONNECTION)
+telemetry_engine = (
+    engine if TELEMETRY_DATABASE_CONNECTION == DATABASE_CONNECTION
+    else create_engine(TELEMETRY_DATABASE_CONNECTION)
+)
+
+# Model telemetry khai báo __table_args__ = {"info": TELEMETRY_TABLE_INFO}; bảng copy (vd. bucket) giữ nguyên info
+TELEMETRY_TABLE_INFO = {"bind_key": "telemetry"}
+
+
+def is_telemetry_table(table) -> bool:
+    return table.info.get("bind_key") == TELEMETRY_TABLE_INFO["bind_key"]
+
+
+class RoutingSession(Session):
+    """
+    Session chọn engine theo bảng: câu lệnh chạm bảng telemetry đi vào telemetry_engine, còn lại vào engine.
+    Khi hai engine là một (mặc định) thì không khác Session thường.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if telemetry_engine is not engine:
+            if mapper is not None:
+                tables = [inspect(mapper).local_table]
+            elif clause is not None:
+                tables = find_tables(clause, include_crud=True)
+            else:
+                tables = []
+            if any(is_telemetry_table(table) for table in tables):
+                return telemetry_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
 
 # Tạo lớp SessionLocal để quản lý phiên làm việc với database
 # autocommit=False: không tự động commit sau mỗi câu lệnh
 # autoflush=False: không tự động flush dữ liệu về database
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 # Tạo lớp cơ sở để khai báo các model (bảng dữ liệu)
 Base = declarative_base()
+
+
+def create_all_tables():
+    """create_all trên đúng engine của từng bảng."""
+    telemetry = [table for table in Base.metadata.sorted_tables if is_telemetry_table(table)]
+    if telemetry_engine is engine:
+        Base.metadata.create_all(bind=engine)
+        return
+    Base.metadata.create_all(bind=engine, tables=[t for t in Base.metadata.sorted_tables if t not in telemetry])
+    Base.metadata.create_all(bind=telemetry_engine, tables=telemetry)
@@ -1,10 +1,10 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from app.cores.auth_utils import validate_token_and_get_user
+from app.cores.auth_utils import Principal, validate_token_and_get_user
 from app.cores.database import SessionLocal
-from app.models.users import User, RoleEnum
+from app.models.users import RoleEnum
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -15,12 +15,20 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> Principal:
+    # AuthMiddleware đã xác thực token và gắn principal vào request
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
     return validate_token_and_get_user(token, db)
 
 
 def require_roles(*roles: RoleEnum):
-    def role_dependency(user: User = Depends(get_current_user)):
+    def role_dependency(user: Principal = Depends(get_current_user)):
         if user.role not in roles:
             raise HTTPException(status_code=403, detail="Forbidden")
         return user
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.cores.config import (
+    LOGIN_BACKOFF_BASE_SECONDS,
+    LOGIN_BACKOFF_MAX_SECONDS,
+    LOGIN_FAILURE_WINDOW_SECONDS,
+    LOGIN_GUARD_MAX_KEYS,
+    LOGIN_MAX_FAILURES_PER_IP,
+    LOGIN_MAX_FAILURES_PER_USERNAME,
+)
+
+
+class _Attempts:
+    __slots__ = ("failures", "last_failure", "blocked_until")
+
+    def __init__(self):
+        self.failures = 0
+        self.last_failure = 0.0
+        self.blocked_until = 0.0
+
+
+class LoginAttemptLimiter:
+    """
+    Đếm số lần đăng nhập sai theo IP và theo username trong bộ nhớ.
+    Khi vượt ngưỡng, key bị chặn với thời gian tăng gấp đôi sau mỗi lần sai tiếp theo
+    (base * 2^(failures - ngưỡng), tối đa backoff_max), để /auth/login có thể trả 429
+    trước khi truy vấn user hay chạy bcrypt.
+    """
+
+    def __init__(
+        self,
+        max_failures_per_username: int = LOGIN_MAX_FAILURES_PER_USERNAME,
+        max_failures_per_ip: int = LOGIN_MAX_FAILURES_PER_IP,
+        backoff_base: float = LOGIN_BACKOFF_BASE_SECONDS,
+        backoff_max: float = LOGIN_BACKOFF_MAX_SECONDS,
+        failure_window: float = LOGIN_FAILURE_WINDOW_SECONDS,
+        max_keys: int = LOGIN_GUARD_MAX_KEYS,
+        clock=time.monotonic,
+    ):
+        self.max_failures_per_username = max_failures_per_username
+        self.max_failures_per_ip = max_failures_per_ip
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_window = failure_window
+        self.max_keys = max_keys
+        self.clock = clock
+        self._attempts: "OrderedDict[str, _Attempts]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def retry_after(self, ip: str, username: str) -> float:
+        """Số giây còn phải chờ nếu IP hoặc username đang bị chặn, 0 nếu được phép thử."""
+        now = self.clock()
+        with self._lock:
+            wait = 0.0
+            for key in (f"ip:{ip}", f"user:{username}"):
+                attempts = self._attempts.get(key)
+                if attempts is not None:
+                    wait = max(wait, attempts.blocked_until - now)
+            if wait > 0:
+                self.rejected += 1
+            return max(wait, 0.0)
+
+    def record_failure(self, ip: str, username: str) -> int:
+        """Ghi nhận một lần sai, trả về số lần sai liên tiếp của username."""
+        now = self.clock()
+        with self._lock:
+            self._register_failure(f"ip:{ip}", self.max_failures_per_ip, now)
+            return self._register_failure(f"user:{username}", self.max_failures_per_username, now)
+
+    def record_success(self, ip: str, username: str):
+        with self._lock:
+            self._attempts.pop(f"user:{username}", None)
+
+    def _register_failure(self, key: str, threshold: int, now: float) -> int:
+        attempts = self._attempts.get(key)
+        if attempts is None or now - attempts.last_failure > self.failure_window:
+            attempts = _Attempts()
+            self._attempts[key] = attempts
+        self._attempts.move_to_end(key)
+
+        attempts.failures += 1
+        attempts.last_failure = now
+        if attempts.failures >= threshold:
+            backoff = self.backoff_base * 2 ** (attempts.failures - threshold)
+            attempts.blocked_until = now + min(backoff, self.backoff_max)
+
+        while len(self._attempts) > self.max_keys:
+            self._attempts.popitem(last=False)
+        return attempts.failures
+
+    def stats(self) -> dict:
+        now = self.clock()
+        with self._lock:
+            return {
+                "tracked_keys": len(self._attempts),
+                "blocked_keys": sum(1 for a in self._attempts.values() if a.blocked_until > now),
+                "rejected": self.rejected,
+            }
+
+
+login_guard = LoginAttemptLimiter()
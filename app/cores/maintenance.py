@@ -0,0 +1,181 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from app.cores.config import (
+    BLACKLIST_INDEX_RELOAD_INTERVAL_SECONDS,
+    BLACKLIST_TOKEN_EXPIRE_MINUTES,
+    MAINTENANCE_BUCKET_INTERVAL_SECONDS,
+    MAINTENANCE_JITTER_SECONDS,
+    MAINTENANCE_SESSION_CLEANUP_INTERVAL_SECONDS,
+    MAINTENANCE_TOKEN_CLEANUP_INTERVAL_SECONDS,
+    MAINTENANCE_USAGE_LOG_CLEANUP_INTERVAL_SECONDS,
+    TOKEN_LOG_RETENTION_DAYS,
+    TOKEN_USAGE_LOG_EXPIRE_MINUTES,
+)
+from app.cores.database import SessionLocal, telemetry_engine
+from app.cores.logger import get_logger
+from app.cores.telemetry_storage import telemetry_storage
+from app.services.active_access_token_service import ActiveAccessTokenService
+from app.services.blacklist_token_service import BlacklistTokenService
+from app.services.rate_limiter_service import RateLimiterService
+from app.services.session_service import SessionService
+from app.services.token_log_service import TokenLogService
+
+logger = get_logger("maintenance")
+
+
+class MaintenanceJob:
+    """Một job dọn dẹp: func nhận Session và trả về số dòng đã xóa (số bucket đã DROP ở chế độ bucketed)."""
+
+    def __init__(self, name: str, func: Callable, interval_seconds: float, jitter_seconds: float = 0):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+
+        self.runs = 0
+        self.failures = 0
+        self.rows_purged = 0
+        self.last_rows = 0
+        self.last_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+        self.last_run_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def next_delay(self) -> float:
+        return max(0.0, self.interval_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds))
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "rows_purged": self.rows_purged,
+            "last_rows": self.last_rows,
+            "last_duration_ms": self.last_duration_ms,
+            "max_duration_ms": self.max_duration_ms,
+            "last_run_at": self.last_run_at,
+            "last_error": self.last_error,
+        }
+
+
+class MaintenanceScheduler:
+    """
+    Chạy các job dọn dẹp định kỳ trong thread pool (asyncio.to_thread) để không chặn event loop.
+    Mỗi job có chu kỳ và jitter riêng, mở Session riêng cho mỗi lần chạy; lỗi của một lần chạy
+    được ghi log và tính vào metrics, không làm dừng job.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.jobs: dict[str, MaintenanceJob] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._lock = threading.Lock()
+
+    def add_job(self, name: str, func: Callable, interval_seconds: float, jitter_seconds: float = 0) -> MaintenanceJob:
+        job = MaintenanceJob(name, func, interval_seconds, jitter_seconds)
+        self.jobs[name] = job
+        return job
+
+    def run_job(self, name: str) -> int:
+        """Chạy một job ngay trong thread hiện tại, trả về số dòng đã xóa."""
+        job = self.jobs[name]
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            rows = job.func(db) or 0
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                job.runs += 1
+                job.failures += 1
+                job.last_error = repr(e)
+            logger.exception("Maintenance job %s failed", name)
+            return 0
+        finally:
+            db.close()
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            job.runs += 1
+            job.rows_purged += rows
+            job.last_rows = rows
+            job.last_duration_ms = elapsed_ms
+            job.max_duration_ms = max(job.max_duration_ms, elapsed_ms)
+            job.last_run_at = time.time()
+            job.last_error = None
+        logger.info("Maintenance job %s purged %d rows in %.1fms", name, rows, elapsed_ms)
+        return rows
+
+    async def _loop(self, job: MaintenanceJob):
+        while True:
+            await asyncio.sleep(job.next_delay())
+            await asyncio.to_thread(self.run_job, job.name)
+
+    def start(self):
+        """Gọi trong lifespan (cần event loop đang chạy)."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._loop(job), name=f"maintenance-{job.name}") for job in self.jobs.values()]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: job.stats() for name, job in self.jobs.items()}
+
+
+def create_maintenance_scheduler() -> MaintenanceScheduler:
+    scheduler = MaintenanceScheduler()
+    scheduler.add_job(
+        "blacklisted_tokens",
+        lambda db: BlacklistTokenService(db).cleanup_expired_tokens(expire_minutes=BLACKLIST_TOKEN_EXPIRE_MINUTES),
+        MAINTENANCE_TOKEN_CLEANUP_INTERVAL_SECONDS,
+        MAINTENANCE_JITTER_SECONDS,
+    )
+    scheduler.add_job(
+        "active_access_tokens",
+        lambda db: ActiveAccessTokenService(db).cleanup_expired_tokens(),
+        MAINTENANCE_TOKEN_CLEANUP_INTERVAL_SECONDS,
+        MAINTENANCE_JITTER_SECONDS,
+    )
+    scheduler.add_job(
+        "token_usage_log",
+        lambda db: RateLimiterService(db).cleanup_expired_tokens(expire_minutes=TOKEN_USAGE_LOG_EXPIRE_MINUTES),
+        MAINTENANCE_USAGE_LOG_CLEANUP_INTERVAL_SECONDS,
+        MAINTENANCE_JITTER_SECONDS,
+    )
+    scheduler.add_job(
+        "sessions",
+        lambda db: SessionService(db).cleanup_expired_sessions(),
+        MAINTENANCE_SESSION_CLEANUP_INTERVAL_SECONDS,
+        MAINTENANCE_JITTER_SECONDS,
+    )
+    # Không xóa dòng nào: nạp lại blacklist_index để thấy token do worker khác thu hồi.
+    # Không có jitter để chu kỳ đúng bằng độ cũ tối đa đã cấu hình
+    scheduler.add_job(
+        "blacklist_index",
+        lambda db: BlacklistTokenService(db).load_index(),
+        BLACKLIST_INDEX_RELOAD_INTERVAL_SECONDS,
+    )
+    if telemetry_storage.bucketed:
+        scheduler.add_job("telemetry_buckets", _rotate_buckets, MAINTENANCE_BUCKET_INTERVAL_SECONDS, MAINTENANCE_JITTER_SECONDS)
+    return scheduler
+
+
+def _rotate_buckets(db) -> int:
+    # Tạo trước bucket kế tiếp; blacklisted_tokens/token_usage_log được xóa bởi job riêng của chúng
+    telemetry_storage.ensure_buckets(telemetry_engine)
+    return TokenLogService(db).cleanup_expired_logs(TOKEN_LOG_RETENTION_DAYS)
+
+
+# Khởi động và dừng trong lifespan (app/main.py)
+maintenance_scheduler = create_maintenance_scheduler()
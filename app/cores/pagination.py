@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(**position) -> str:
+    """Cursor opaque cho client: base64url của vị trí dòng cuối cùng (vd. {"id": 42})."""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *keys: str) -> dict:
+    """Giải mã cursor, kiểm tra đủ các khóa cần thiết; cursor hỏng trả về 400."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict) or any(key not in position for key in keys):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+@dataclass
+class Page:
+    """Một trang kết quả keyset: items và cursor của trang kế (None nếu là trang cuối)."""
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def page_from_rows(rows: list, limit: int, cursor_of) -> Page:
+    """rows được lấy với LIMIT limit + 1: có dòng thừa nghĩa là còn trang kế."""
+    if len(rows) > limit:
+        items = rows[:limit]
+        return Page(items=items, next_cursor=cursor_of(items[-1]))
+    return Page(items=rows)
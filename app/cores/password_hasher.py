@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from app.cores.config import PASSWORD_HASH_POOL_KIND, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS
+
+
+class PasswordHashPool:
+    """
+    Pool worker giới hạn kích thước dành riêng cho bcrypt.
+    Tối đa workers tác vụ chạy cùng lúc và queue_limit tác vụ chờ; khi đầy, request nhận 503 ngay.
+    Endpoint async chờ kết quả trên event loop (không giữ thread nào của AnyIO trong lúc bcrypt chạy),
+    nên một đợt login dồn dập không chiếm hết CPU hay thread pool của các API khác.
+    """
+
+    def __init__(self, kind: str = PASSWORD_HASH_POOL_KIND, workers: int = PASSWORD_HASH_WORKERS,
+                 queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash pool kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    def _get_executor(self) -> Executor:
+        # Tạo pool khi dùng lần đầu, tránh fork process lúc import
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    async def run(self, operation: str, fn, *args):
+        """Chạy fn(*args) trên pool và chờ trên event loop; fn phải là hàm cấp module nếu dùng pool process."""
+        if not self._slots.acquire(blocking=False):
+            self._record(operation, rejected=True)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        start = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        finally:
+            self._slots.release()
+            self._record(operation, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+    def _record(self, operation: str, elapsed_ms: float = 0.0, rejected: bool = False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                operation, {"count": 0, "rejected": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+            )
+            if rejected:
+                stats["rejected"] += 1
+                return
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["last_ms"] = elapsed_ms
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            operations = {
+                name: {
+                    "count": s["count"],
+                    "rejected": s["rejected"],
+                    "avg_ms": s["total_ms"] / s["count"] if s["count"] else 0.0,
+                    "max_ms": s["max_ms"],
+                    "last_ms": s["last_ms"],
+                }
+                for name, s in self._stats.items()
+            }
+        return {"kind": self.kind, "workers": self.workers, "queue_limit": self.queue_limit, "operations": operations}
@@ -0,0 +1,296 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.cores.config import POST_SEARCH_BACKEND
+from app.cores.database import engine
+from app.cores.unit_of_work import after_commit
+
+# Trọng số BM25 của cột title so với content (content = 1)
+TITLE_WEIGHT = 2.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(value: str) -> list[str]:
+    """Chữ thường, bỏ dấu (giống tokenizer unicode61 remove_diacritics 2 của FTS5): "Bảo mật" -> ["bao", "mat"]."""
+    value = unicodedata.normalize("NFKD", value.lower())
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _WORD.findall(value)
+
+
+def _after(hit: tuple[int, float], after: Optional[tuple[float, int]]) -> bool:
+    """Thứ tự kết quả: score giảm dần rồi id tăng dần; after là (score, id) của dòng cuối trang trước."""
+    if after is None:
+        return True
+    post_id, score = hit
+    after_score, after_id = after
+    return score < after_score or (score == after_score and post_id > after_id)
+
+
+class PostSearchIndex:
+    """
+    Chỉ mục full-text của bài post. search trả về [(post_id, score)] với score càng cao càng liên quan,
+    mọi từ trong truy vấn phải xuất hiện. index_post/remove_post được gọi trong transaction ghi post.
+    """
+
+    backend = ""
+
+    def index_post(self, db: Session, post_id: int, title: str, content: str):
+        raise NotImplementedError
+
+    def remove_post(self, db: Session, post_id: int):
+        raise NotImplementedError
+
+    def remove_posts(self, db: Session, post_ids: Iterable[int]):
+        """Xóa nhiều bài cùng lúc (vd. khi xóa user cùng toàn bộ post của họ)."""
+        for post_id in post_ids:
+            self.remove_post(db, post_id)
+
+    def search(self, db: Session, query: str, limit: int, after: Optional[tuple[float, int]] = None) -> list[tuple[int, float]]:
+        raise NotImplementedError
+
+    def rebuild(self, db: Session, posts: Iterable[tuple[int, str, str]]) -> int:
+        raise NotImplementedError
+
+    def load(self, db: Session, posts: Iterable[tuple[int, str, str]]):
+        """Gọi khi khởi động: chuẩn bị chỉ mục (nạp lại từ DB nếu chỉ mục không bền)."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+
+class InvertedPostIndex(PostSearchIndex):
+    """
+    Inverted index trong bộ nhớ, xếp hạng BM25. Dùng cho DB không phải SQLite.
+    Chỉ cập nhật sau khi transaction commit; mỗi process giữ một bản riêng và nạp lại khi khởi động.
+    """
+
+    backend = "memory"
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._terms: dict[int, list[str]] = {}
+        self._lengths: dict[int, float] = {}
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+
+    def _add(self, post_id: int, title: str, content: str):
+        frequencies = Counter()
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+        for term in tokenize(content):
+            frequencies[term] += 1
+        with self._lock:
+            self._remove(post_id)
+            for term, frequency in frequencies.items():
+                self._postings[term][post_id] = frequency
+            self._terms[post_id] = list(frequencies)
+            self._lengths[post_id] = sum(frequencies.values())
+            self._total_length += self._lengths[post_id]
+
+    def _remove(self, post_id: int):
+        for term in self._terms.pop(post_id, ()):
+            postings = self._postings[term]
+            postings.pop(post_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(post_id, 0.0)
+
+    def _discard(self, post_id: int):
+        with self._lock:
+            self._remove(post_id)
+
+    def index_post(self, db: Session, post_id: int, title: str, content: str):
+        after_commit(db, lambda: self._add(post_id, title, content))
+
+    def remove_post(self, db: Session, post_id: int):
+        after_commit(db, lambda: self._discard(post_id))
+
+    def remove_posts(self, db: Session, post_ids: Iterable[int]):
+        post_ids = list(post_ids)
+
+        def discard():
+            with self._lock:
+                for post_id in post_ids:
+                    self._remove(post_id)
+
+        after_commit(db, discard)
+
+    def search(self, db: Session, query: str, limit: int, after: Optional[tuple[float, int]] = None) -> list[tuple[int, float]]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            documents = len(self._lengths)
+            average_length = self._total_length / documents
+            idf = [math.log(1 + (documents - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+
+            hits = []
+            for post_id in postings[0]:
+                if not all(post_id in p for p in postings[1:]):
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[post_id] / average_length)
+                score = sum(w * p[post_id] * (BM25_K1 + 1) / (p[post_id] + norm) for w, p in zip(idf, postings))
+                hit = (post_id, score)
+                if _after(hit, after):
+                    hits.append(hit)
+        return heapq.nsmallest(limit, hits, key=lambda hit: (-hit[1], hit[0]))
+
+    def rebuild(self, db: Session, posts: Iterable[tuple[int, str, str]]) -> int:
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._lengths.clear()
+            self._total_length = 0.0
+        count = 0
+        for post_id, title, content in posts:
+            self._add(post_id, title, content)
+            count += 1
+        return count
+
+    def load(self, db: Session, posts: Iterable[tuple[int, str, str]]):
+        self.rebuild(db, posts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": self.backend, "documents": len(self._lengths), "terms": len(self._postings)}
+
+
+class Fts5PostIndex(PostSearchIndex):
+    """
+    Bảng ảo FTS5 posts_fts (rowid = posts.id) trong chính DB SQLite. Được ghi trong cùng transaction
+    với bài post nên luôn khớp với bảng posts, kể cả khi chạy nhiều process.
+    """
+
+    backend = "fts5"
+    table = "posts_fts"
+
+    def __init__(self):
+        self._ready = False
+
+    def _exists(self, db: Session) -> bool:
+        return db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": self.table}
+        ).first() is not None
+
+    def _create(self, db: Session):
+        db.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5(title, content, tokenize = 'unicode61 remove_diacritics 2')"))
+        self._ready = True
+
+    def _ensure(self, db: Session):
+        """Tạo bảng FTS5 (và nạp các bài post đã có) nếu DB chưa có, chỉ kiểm tra một lần mỗi process."""
+        if self._ready:
+            return
+        if not self._exists(db):
+            self._create(db)
+            db.execute(text(f"INSERT INTO {self.table}(rowid, title, content) SELECT id, title, content FROM posts"))
+        self._ready = True
+
+    def index_post(self, db: Session, post_id: int, title: str, content: str):
+        self._ensure(db)
+        db.execute(
+            text(f"INSERT OR REPLACE INTO {self.table}(rowid, title, content) VALUES (:id, :title, :content)"),
+            {"id": post_id, "title": title, "content": content},
+        )
+
+    def remove_post(self, db: Session, post_id: int):
+        self._ensure(db)
+        db.execute(text(f"DELETE FROM {self.table} WHERE rowid = :id"), {"id": post_id})
+
+    def remove_posts(self, db: Session, post_ids: Iterable[int]):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        self._ensure(db)
+        db.execute(
+            text(f"DELETE FROM {self.table} WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": post_ids},
+        )
+
+    def search(self, db: Session, query: str, limit: int, after: Optional[tuple[float, int]] = None) -> list[tuple[int, float]]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self._ensure(db)
+        # Mỗi từ được đặt trong ngoặc kép để cú pháp truy vấn FTS5 (AND, OR, NEAR, *...) không lọt vào
+        params = {"match": " ".join(f'"{term}"' for term in terms), "limit": limit}
+        keyset = ""
+        if after is not None:
+            keyset = "WHERE score < :score OR (score = :score AND id > :id)"
+            params.update(score=after[0], id=after[1])
+        rows = db.execute(
+            text(
+                f"SELECT id, score FROM ("
+                f"SELECT rowid AS id, -bm25({self.table}, {TITLE_WEIGHT}, 1.0) AS score "
+                f"FROM {self.table} WHERE {self.table} MATCH :match"
+                f") {keyset} ORDER BY score DESC, id LIMIT :limit"
+            ),
+            params,
+        )
+        return [(row.id, row.score) for row in rows]
+
+    def rebuild(self, db: Session, posts: Iterable[tuple[int, str, str]]) -> int:
+        self._create(db)
+        db.execute(text(f"DELETE FROM {self.table}"))
+        count = 0
+        for post_id, title, content in posts:
+            self.index_post(db, post_id, title, content)
+            count += 1
+        db.commit()
+        return count
+
+    def load(self, db: Session, posts: Iterable[tuple[int, str, str]]):
+        # Chỉ mục FTS5 nằm trong DB nên chỉ cần nạp khi bảng vừa được tạo
+        self._ensure(db)
+        db.commit()
+
+
+def fts5_available(bind) -> bool:
+    if bind.dialect.name != "sqlite":
+        return False
+    with bind.connect() as connection:
+        options = connection.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in options
+
+
+def create_post_search_index(backend: str, bind) -> PostSearchIndex:
+    """backend: "fts5", "memory" hoặc "auto" (FTS5 khi DB là SQLite có FTS5, ngược lại memory)."""
+    if backend == "auto":
+        backend = "fts5" if fts5_available(bind) else "memory"
+    if backend == "fts5":
+        return Fts5PostIndex()
+    if backend == "memory":
+        return InvertedPostIndex()
+    raise ValueError(f"Unknown post search backend: {backend}")
+
+
+_post_search_index: Optional[PostSearchIndex] = None
+_post_search_lock = threading.Lock()
+
+
+def get_post_search_index() -> PostSearchIndex:
+    """
+    Chỉ mục chọn theo POST_SEARCH_BACKEND ở lần gọi đầu (lifespan hoặc request đầu tiên)
+    chứ không phải lúc import, vì "auto" phải mở kết nối DB để kiểm tra FTS5.
+    """
+    global _post_search_index
+    if _post_search_index is None:
+        with _post_search_lock:
+            if _post_search_index is None:
+                _post_search_index = create_post_search_index(POST_SEARCH_BACKEND, engine)
+    return _post_search_index
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.cores.auth import token_digest
+from app.cores.config import RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS
+from app.cores.database import SessionLocal
+from app.cores.usage_log_buffer import TokenUsageBuffer
+from app.services.rate_limiter_service import RateLimiterService
+
+
+class RateLimiterEngine:
+    """
+    Giao diện chung của các backend rate limiter.
+    is_rate_limited ghi nhận request hiện tại và trả về True nếu số request
+    trước đó trong period_seconds giây đã đạt max_requests.
+    """
+    name = "base"
+
+    def is_rate_limited(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        raise NotImplementedError
+
+    async def check(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        """Bản gọi từ middleware trên event loop: mặc định chạy is_rate_limited trong threadpool vì có thể truy vấn DB."""
+        return await run_in_threadpool(self.is_rate_limited, token, max_requests, period_seconds)
+
+    def start(self):
+        """Khởi động tác vụ nền của backend (nếu có), gọi trong lifespan."""
+
+    def stop(self):
+        """Dừng tác vụ nền của backend (nếu có), gọi trong lifespan."""
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class SQLRateLimiterEngine(RateLimiterEngine):
+    """Backend dùng bảng token_usage_log (COUNT + INSERT cho mỗi request)."""
+    name = "sql"
+
+    def is_rate_limited(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        db = SessionLocal()
+        try:
+            return RateLimiterService(db).is_rate_limited(token, max_requests, period_seconds)
+        finally:
+            db.close()
+
+
+class BufferedSQLRateLimiterEngine(RateLimiterEngine):
+    """
+    Backend SQL với ghi write-behind: số request được đếm trong bộ đệm (TokenUsageBuffer.count),
+    DB chỉ được đọc khi digest xuất hiện lần đầu (trong threadpool) và sau mỗi lần flush; request hiện tại chỉ được xếp hàng,
+    không SELECT/INSERT/COMMIT.
+    """
+    name = "sql_buffered"
+
+    def __init__(self, buffer: TokenUsageBuffer = None):
+        self.buffer = buffer or TokenUsageBuffer()
+
+    def is_rate_limited(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        digest = token_digest(token)
+        now = datetime.now(timezone.utc)
+        count = self.buffer.count(digest, now - timedelta(seconds=period_seconds))
+        self.buffer.record(digest, now)
+        return count >= max_requests
+
+    async def check(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        # Chỉ lần đầu gặp digest mới đọc DB, trong threadpool; các request sau đếm trong bộ nhớ
+        digest = token_digest(token)
+        if self.buffer.needs_seed(digest):
+            since = datetime.now(timezone.utc) - timedelta(seconds=period_seconds)
+            await run_in_threadpool(self.buffer.seed, digest, since)
+        now = datetime.now(timezone.utc)
+        count = self.buffer.count(digest, now - timedelta(seconds=period_seconds), load=False)
+        self.buffer.record(digest, now)
+        return count >= max_requests
+
+    def start(self):
+        self.buffer.start()
+
+    def stop(self):
+        self.buffer.stop()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.buffer.stats()}
+
+
+class _Window:
+    __slots__ = ("index", "current", "previous", "last_seen")
+
+    def __init__(self, index: int, now: float):
+        self.index = index
+        self.current = 0
+        self.previous = 0
+        self.last_seen = now
+
+
+class MemoryRateLimiterEngine(RateLimiterEngine):
+    """
+    Sliding window counter trong process: mỗi key chỉ giữ số request của cửa sổ hiện tại và cửa sổ trước,
+    số request trong period được ước lượng bằng previous * (phần cửa sổ trước còn nằm trong period) + current.
+    Các key được sắp theo lần dùng gần nhất nên key nhàn rỗi (quá 2 period) bị loại từ đầu danh sách.
+    """
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._windows: "OrderedDict[str, _Window]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+        self.evictions = 0
+
+    async def check(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        # Chỉ thao tác trong bộ nhớ, không cần threadpool
+        return self.is_rate_limited(token, max_requests, period_seconds)
+
+    def is_rate_limited(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        key = token_digest(token)
+        now = self.clock()
+        index = int(now // period_seconds)
+
+        with self._lock:
+            self._evict_idle(now, period_seconds)
+
+            window = self._windows.get(key)
+            if window is None:
+                window = _Window(index, now)
+                self._windows[key] = window
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._windows.move_to_end(key)
+
+            if window.index != index:
+                window.previous = window.current if window.index == index - 1 else 0
+                window.current = 0
+                window.index = index
+
+            elapsed = (now - index * period_seconds) / period_seconds
+            estimated = window.previous * (1 - elapsed) + window.current
+
+            window.current += 1
+            window.last_seen = now
+
+            if estimated >= max_requests:
+                self.limited += 1
+                return True
+            return False
+
+    def _evict_idle(self, now: float, period_seconds: int):
+        while self._windows:
+            key, window = next(iter(self._windows.items()))
+            if now - window.last_seen < 2 * period_seconds:
+                break
+            del self._windows[key]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "keys": len(self._windows),
+                "max_keys": self.max_keys,
+                "limited": self.limited,
+                "evictions": self.evictions,
+            }
+
+
+def create_rate_limiter_engine(backend: str) -> RateLimiterEngine:
+    if backend == "memory":
+        return MemoryRateLimiterEngine()
+    if backend == "sql":
+        return SQLRateLimiterEngine()
+    if backend == "sql_buffered":
+        return BufferedSQLRateLimiterEngine()
+    raise ValueError(f"Unknown rate limiter backend: {backend}")
+
+
+# Backend chọn theo RATE_LIMIT_BACKEND
+rate_limiter_engine = create_rate_limiter_engine(RATE_LIMIT_BACKEND)
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.cores.config import RESPONSE_CACHE_MAX_ENTRIES
+from app.cores.unit_of_work import after_commit
+
+# Tag của các response được cache; service ghi dữ liệu gọi invalidate_after_commit với đúng tag bị ảnh hưởng
+POSTS_LIST = "posts:list"
+USERS_LIST = "users:list"
+# Trạng thái (active/blocked/đã xóa) của user ảnh hưởng tới bài post hiển thị và chi tiết bài post
+USER_STATUS = "users:status"
+
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def make_etag(body: bytes) -> str:
+    """ETag mạnh: băm nội dung đã serialize."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: list
+    body: bytes
+    etag: str
+    tags: frozenset
+    expires_at: float = field(default=0.0)
+
+
+class ResponseCache:
+    """
+    Cache LRU có TTL cho body đã serialize của các GET, khóa là path + query string.
+    Mỗi entry gắn tag; invalidate(tag) xóa mọi entry mang tag đó và tăng version của tag
+    để response đang được tạo từ dữ liệu cũ không được ghi vào cache (xem versions/put).
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tag_index: dict[str, set[str]] = {}
+        self._tag_versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_skips = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def versions(self, tags: Iterable[str]) -> dict[str, int]:
+        with self._lock:
+            return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+    def put(self, key: str, entry: CachedResponse, ttl_seconds: float, versions: dict[str, int]) -> bool:
+        """Ghi entry nếu không tag nào bị invalidate kể từ khi lấy versions (lúc bắt đầu request)."""
+        with self._lock:
+            if any(self._tag_versions.get(tag, 0) != version for tag, version in versions.items()):
+                self.stale_skips += 1
+                return False
+            if key in self._entries:
+                self._remove(key)
+            entry.expires_at = time.time() + ttl_seconds
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in list(self._tag_index.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_skips": self.stale_skips,
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+
+def invalidate_after_commit(db: Session, *tags: str):
+    """Xóa các response mang tag sau khi transaction ghi dữ liệu commit thành công."""
+    after_commit(db, lambda: response_cache.invalidate(*tags))
+
+
+response_cache = ResponseCache()
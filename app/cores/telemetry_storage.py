@@ -0,0 +1,192 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import MetaData, Table, inspect, insert
+from sqlalchemy.orm import Session
+
+from app.cores.config import TELEMETRY_BUCKET_GRANULARITY, TELEMETRY_STORAGE_MODE
+from app.models.blacklisted_tokens import BlacklistedToken
+from app.models.token_logs import TokenLog
+from app.models.token_usage_log import TokenUsageLog
+
+GRANULARITIES = {
+    "hour": ("%Y%m%d%H", timedelta(hours=1)),
+    "day": ("%Y%m%d", timedelta(days=1)),
+}
+
+
+def to_utc_naive(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class BucketedTable:
+    """
+    Một bảng logic được chia thành các bảng vật lý theo giờ/ngày (vd. token_usage_log_2025010112),
+    cùng cột và index với bảng gốc. Bucket được tạo trước bởi job bảo trì (ensure), truy vấn chỉ đọc
+    các bucket giao với khoảng thời gian cần, và retention là DROP TABLE cả bucket.
+    """
+
+    def __init__(self, base: Table, time_column: str, granularity: str, refresh_seconds: float = 60):
+        self.base = base
+        self.time_column = time_column
+        self.granularity = granularity
+        self._format, self.step = GRANULARITIES[granularity]
+        digits = 10 if granularity == "hour" else 8
+        self._name_pattern = re.compile(rf"^{re.escape(base.name)}_(\d{{{digits}}})$")
+        self.refresh_seconds = refresh_seconds
+        self.metadata = MetaData()
+        self._known: dict[datetime, Table] = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._define_lock = threading.Lock()
+        self.created = 0
+        self.dropped = 0
+
+    def bucket_start(self, moment: datetime) -> datetime:
+        moment = to_utc_naive(moment)
+        if self.granularity == "hour":
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _table(self, start: datetime) -> Table:
+        suffix = start.strftime(self._format)
+        name = f"{self.base.name}_{suffix}"
+        with self._define_lock:
+            table = self.metadata.tables.get(name)
+            if table is None:
+                table = self.base.to_metadata(self.metadata, name=name)
+                # Tên index là duy nhất trong cả DB (SQLite) nên gắn thêm hậu tố của bucket
+                for index in table.indexes:
+                    if not index.name.endswith(suffix):
+                        index.name = f"{index.name}_{suffix}"
+            return table
+
+    def _buckets(self, bind, force_refresh: bool = False) -> dict[datetime, Table]:
+        with self._lock:
+            if not force_refresh and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return dict(self._known)
+        known = {}
+        for name in inspect(bind).get_table_names():
+            match = self._name_pattern.match(name)
+            if match:
+                start = datetime.strptime(match.group(1), self._format)
+                known[start] = self._table(start)
+        with self._lock:
+            self._known = known
+            self._refreshed_at = time.monotonic()
+            return dict(known)
+
+    def bind(self, db: Session):
+        """Engine chứa các bucket (cùng engine với bảng gốc, xem RoutingSession)."""
+        return db.get_bind(clause=self.base)
+
+    def ensure(self, bind, moment: datetime) -> Table:
+        """Tạo bucket chứa moment nếu chưa có. DDL chạy trên kết nối riêng (MySQL tự commit khi gặp DDL)."""
+        start = self.bucket_start(moment)
+        with self._lock:
+            table = self._known.get(start)
+        if table is not None:
+            return table
+
+        table = self._table(start)
+        engine = getattr(bind, "engine", bind)
+        with engine.begin() as connection:
+            table.create(connection, checkfirst=True)
+        with self._lock:
+            if start not in self._known:
+                self._known[start] = table
+                self.created += 1
+        return table
+
+    def insert(self, db: Session, rows: list[dict]):
+        """Ghi các dòng vào bucket tương ứng với cột thời gian (một INSERT cho mỗi bucket)."""
+        groups = defaultdict(list)
+        for row in rows:
+            groups[self.bucket_start(row[self.time_column])].append(row)
+        # Tạo đủ bucket trước khi ghi dòng nào, để DDL không phải chờ khóa ghi của chính transaction này
+        tables = {start: self.ensure(self.bind(db), start) for start in groups}
+        for start, group in groups.items():
+            db.execute(insert(tables[start]), group)
+
+    def tables_between(self, db: Session, start: datetime, end: datetime) -> list[Table]:
+        """Các bucket giao với [start, end], mới nhất trước."""
+        first, last = self.bucket_start(start), self.bucket_start(end)
+        buckets = self._buckets(self.bind(db))
+        if last not in buckets:
+            # Bucket mới có thể vừa được process khác tạo
+            buckets = self._buckets(self.bind(db), force_refresh=True)
+        return [buckets[key] for key in sorted(buckets, reverse=True) if first <= key <= last]
+
+    def tables_newest_first(self, db: Session) -> list[Table]:
+        buckets = self._buckets(self.bind(db))
+        return [buckets[key] for key in sorted(buckets, reverse=True)]
+
+    def drop_before(self, bind, expire_before: datetime) -> int:
+        """Xóa các bucket mà mọi dòng đều cũ hơn expire_before, trả về số bucket đã xóa."""
+        expire_before = to_utc_naive(expire_before)
+        expired = [
+            (start, table) for start, table in self._buckets(bind, force_refresh=True).items()
+            if start + self.step <= expire_before
+        ]
+        engine = getattr(bind, "engine", bind)
+        for start, table in expired:
+            with engine.begin() as connection:
+                table.drop(connection, checkfirst=True)
+            with self._lock:
+                self._known.pop(start, None)
+                self.dropped += 1
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "granularity": self.granularity,
+                "buckets": len(self._known),
+                "created": self.created,
+                "dropped": self.dropped,
+            }
+
+
+class TelemetryStorage:
+    """Chọn cách lưu các bảng telemetry theo TELEMETRY_STORAGE_MODE ("single" hoặc "bucketed")."""
+
+    def __init__(self, mode: str = TELEMETRY_STORAGE_MODE, granularity: dict = TELEMETRY_BUCKET_GRANULARITY):
+        if mode not in ("single", "bucketed"):
+            raise ValueError(f"Unknown telemetry storage mode: {mode}")
+        self.mode = mode
+        self.tables = {
+            "token_usage_log": BucketedTable(TokenUsageLog.__table__, "requested_at", granularity["token_usage_log"]),
+            "blacklisted_tokens": BucketedTable(BlacklistedToken.__table__, "blacklisted_at", granularity["blacklisted_tokens"]),
+            "token_logs": BucketedTable(TokenLog.__table__, "timestamp", granularity["token_logs"]),
+        }
+
+    @property
+    def bucketed(self) -> bool:
+        return self.mode == "bucketed"
+
+    def get(self, name: str) -> Optional[BucketedTable]:
+        """BucketedTable của bảng name, hoặc None ở chế độ "single"."""
+        return self.tables[name] if self.bucketed else None
+
+    def ensure_buckets(self, bind, now: Optional[datetime] = None):
+        """Tạo sẵn bucket hiện tại và bucket kế tiếp để request không phải chạy DDL."""
+        if not self.bucketed:
+            return
+        now = now or datetime.now(timezone.utc)
+        for table in self.tables.values():
+            table.ensure(bind, now)
+            table.ensure(bind, now + table.step)
+
+    def stats(self) -> dict:
+        if not self.bucketed:
+            return {"mode": self.mode}
+        return {"mode": self.mode, **{name: table.stats() for name, table in self.tables.items()}}
+
+
+telemetry_storage = TelemetryStorage()
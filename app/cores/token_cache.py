@@ -0,0 +1,50 @@
+import time
+from typing import Optional
+
+from app.cores.auth import token_digest
+from app.cores.auth_utils import Principal
+from app.cores.config import TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS
+from app.cores.ttl_cache import TTLCache
+
+
+class VerifiedTokenCache(TTLCache[str, Principal]):
+    """
+    Cache (TTLCache) các access token đã được AuthMiddleware xác thực.
+    Khóa là digest của token, giá trị là Principal; entry hết hạn không muộn hơn exp của token.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, ttl_seconds: int = TOKEN_CACHE_TTL_SECONDS):
+        super().__init__(max_size, ttl_seconds)
+        self._user_index: dict[int, set[str]] = {}
+
+    def get(self, token: str) -> Optional[Principal]:
+        return super().get(token_digest(token))
+
+    def set(self, token: str, principal: Principal, exp: Optional[float] = None):
+        super().set(token_digest(token), principal, None if exp is None else float(exp) - time.time())
+
+    def invalidate_token(self, token: str):
+        self.invalidate(token_digest(token))
+
+    def invalidate_digest(self, digest: str):
+        self.invalidate(digest)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            for digest in list(self._user_index.get(user_id, ())):
+                self._remove(digest)
+                self.invalidations += 1
+
+    def _on_store(self, digest: str, principal: Principal):
+        self._user_index.setdefault(principal.id, set()).add(digest)
+
+    def _on_remove(self, digest: str, principal: Principal):
+        digests = self._user_index.get(principal.id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._user_index[principal.id]
+
+
+token_cache = VerifiedTokenCache()
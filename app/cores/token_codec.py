@@ -0,0 +1,190 @@
+"""
+Mã hóa/giải mã JWT qua một interface chung (TokenCodec) để có thể đổi backend mà không sửa nơi gọi.
+Mọi backend đều ném ExpiredSignatureError / JWTError của python-jose khi token hết hạn hoặc không hợp lệ.
+
+Benchmark các backend: python -m app.cores.token_codec --iterations 20000
+"""
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from jose import jwk, jwt, ExpiredSignatureError, JWTError
+
+try:
+    import jwt as pyjwt
+except ImportError:  # PyJWT là phụ thuộc tùy chọn
+    pyjwt = None
+
+
+class TokenCodec:
+    name = "base"
+
+    def encode(self, claims: dict) -> str:
+        raise NotImplementedError
+
+    def decode(self, token: str) -> dict:
+        raise NotImplementedError
+
+
+class JoseTokenCodec(TokenCodec):
+    """python-jose với key và danh sách thuật toán dựng sẵn một lần."""
+    name = "jose"
+
+    def __init__(self, secret: str, algorithm: str):
+        self.algorithm = algorithm
+        self._key = jwk.construct(secret, algorithm)
+        self._algorithms = [algorithm]
+
+    def encode(self, claims: dict) -> str:
+        # jose đổi exp/iat/nbf sang số ngay trong dict được truyền vào
+        return jwt.encode(dict(claims), self._key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(token, self._key, algorithms=self._algorithms)
+
+
+class HmacTokenCodec(TokenCodec):
+    """Triển khai HS256/HS384/HS512 bằng hmac của thư viện chuẩn, header được mã hóa sẵn."""
+    name = "hmac"
+
+    _DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def __init__(self, secret: str, algorithm: str):
+        if algorithm not in self._DIGESTS:
+            raise ValueError(f"Unsupported algorithm for hmac codec: {algorithm}")
+        self.algorithm = algorithm
+        self._secret = secret.encode("utf-8")
+        self._digest = self._DIGESTS[algorithm]
+        self._header = _b64encode(json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self._secret, signing_input, self._digest).digest()
+
+    def encode(self, claims: dict) -> str:
+        payload = {key: _to_numeric_date(value) if key in ("exp", "iat", "nbf") else value for key, value in claims.items()}
+        signing_input = self._header + b"." + _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode("ascii")
+
+    def decode(self, token: str) -> dict:
+        try:
+            signing_input, _, signature = token.encode("ascii").rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            header = json.loads(_b64decode(header_segment))
+            claims = json.loads(_b64decode(payload_segment))
+            expected = self._sign(signing_input)
+            valid_signature = hmac.compare_digest(expected, _b64decode(signature))
+        except (ValueError, UnicodeError):
+            raise JWTError("Invalid token")
+
+        # Header/payload là JSON hợp lệ nhưng không phải object (vd. "[]") thì cũng là token không hợp lệ
+        if not isinstance(header, dict):
+            raise JWTError("Invalid header string: must be a json object")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload string: must be a json object")
+        if header.get("alg") != self.algorithm or not valid_signature:
+            raise JWTError("Signature verification failed.")
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise JWTError("Expiration Time claim (exp) must be an integer.")
+            if exp < now:
+                raise ExpiredSignatureError("Signature has expired.")
+        nbf = claims.get("nbf")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+            raise JWTError("The token is not yet valid (nbf)")
+        return claims
+
+
+class PyJWTTokenCodec(TokenCodec):
+    """PyJWT (nếu được cài), lỗi được chuyển về exception của python-jose."""
+    name = "pyjwt"
+
+    def __init__(self, secret: str, algorithm: str):
+        if pyjwt is None:
+            raise RuntimeError("PyJWT is not installed; pip install pyjwt to use JWT_BACKEND=pyjwt")
+        self.algorithm = algorithm
+        self._secret = secret
+        self._algorithms = [algorithm]
+
+    def encode(self, claims: dict) -> str:
+        return pyjwt.encode(claims, self._secret, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return pyjwt.decode(token, self._secret, algorithms=self._algorithms)
+        except pyjwt.ExpiredSignatureError:
+            raise ExpiredSignatureError("Signature has expired.")
+        except pyjwt.InvalidTokenError as e:
+            raise JWTError(str(e))
+
+
+CODECS = {codec.name: codec for codec in (JoseTokenCodec, HmacTokenCodec, PyJWTTokenCodec)}
+
+
+def create_token_codec(backend: str, secret: str, algorithm: str) -> TokenCodec:
+    if backend not in CODECS:
+        raise ValueError(f"Unknown JWT backend: {backend}")
+    return CODECS[backend](secret, algorithm)
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _to_numeric_date(value):
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+def benchmark(iterations: int = 20000, secret: str = "benchmark-secret-0123456789abcdef", algorithm: str = "HS256") -> dict:
+    """Đo số lần encode/decode mỗi giây của từng backend có sẵn."""
+    claims = {"sub": "benchmark", "jti": "0" * 32, "exp": datetime.now(timezone.utc) + timedelta(minutes=30)}
+    results = {}
+    for name, codec_class in CODECS.items():
+        try:
+            codec = codec_class(secret, algorithm)
+        except RuntimeError:
+            continue
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            token = codec.encode(claims)
+        encode_per_sec = iterations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            codec.decode(token)
+        decode_per_sec = iterations / (time.perf_counter() - start)
+
+        # Các backend phải đọc được token của nhau
+        for other_class in CODECS.values():
+            try:
+                assert other_class(secret, algorithm).decode(token)["sub"] == "benchmark"
+            except RuntimeError:
+                pass
+
+        results[name] = {"encode_per_sec": encode_per_sec, "decode_per_sec": decode_per_sec}
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10}{'encode/s':>12}{'decode/s':>12}")
+    for name, result in benchmark(args.iterations).items():
+        print(f"{name:<10}{result['encode_per_sec']:>12.0f}{result['decode_per_sec']:>12.0f}")
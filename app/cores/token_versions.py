@@ -0,0 +1,36 @@
+from typing import Optional
+
+from app.cores.config import TOKEN_VERSION_MAX_SIZE, TOKEN_VERSION_TTL_SECONDS
+from app.cores.ttl_cache import TTLCache
+
+
+class TokenVersionTable(TTLCache[int, int]):
+    """
+    Bảng user id -> token_version hiện tại (cột users.token_version), TTLCache.
+    Access token mang claim "ver"; token chỉ hợp lệ khi ver bằng version trong bảng, nên việc xác thực
+    chỉ cần một lần tra dict thay vì đọc bảng users. UserRepository ghi version mới (set) sau khi commit
+    block/đổi mật khẩu/logout-all và xóa entry (discard) khi user bị xóa.
+    TTL giới hạn thời gian một worker khác còn chấp nhận token cũ.
+    """
+
+    def __init__(self, max_size: int = TOKEN_VERSION_MAX_SIZE, ttl_seconds: float = TOKEN_VERSION_TTL_SECONDS):
+        super().__init__(max_size, ttl_seconds)
+        self.bumps = 0
+
+    def set(self, user_id: int, version: int, ttl_seconds: Optional[float] = None):
+        """Ghi version mới sau khi commit thay đổi làm các token cũ hết hiệu lực."""
+        super().set(user_id, version, ttl_seconds)
+        with self._lock:
+            self.bumps += 1
+
+    def discard(self, user_id: int):
+        self.invalidate(user_id)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats["bumps"] = self.bumps
+        return stats
+
+
+token_versions = TokenVersionTable()
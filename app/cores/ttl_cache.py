@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Cache LRU có giới hạn kích thước và TTL, an toàn giữa các thread.
+
+    get_or_load chỉ ghi giá trị vừa nạp nếu trong lúc nạp không có set/invalidate/clear nào (so sánh
+    generation trước và sau khi gọi loader), nên một lần đọc DB chậm không ghi đè được thay đổi vừa commit.
+    Lớp con giữ chỉ mục phụ bằng cách override _on_store/_on_remove (được gọi khi đang giữ khóa).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[K, tuple[V, float]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_skips = 0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            return self._lookup(key)
+
+    def get_or_load(self, key: K, loader: Callable[[], Optional[V]]) -> Optional[V]:
+        """Trả giá trị từ cache, nếu không có thì gọi loader và ghi lại kết quả khác None."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            generation = self._generation
+
+        value = loader()
+        if value is not None:
+            self.put(key, value, generation)
+        return value
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, key: K, value: V, generation: int) -> bool:
+        """Ghi giá trị đã nạp từ lúc generation; bỏ qua (trả về False) nếu đã có thay đổi từ đó."""
+        with self._lock:
+            if generation != self._generation:
+                self.stale_skips += 1
+                return False
+            self._store(key, value, self.ttl_seconds)
+            return True
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None):
+        """Ghi giá trị mới nhất (vd. sau khi commit); các lần nạp đang chạy sẽ không ghi đè nó."""
+        ttl = self.ttl_seconds if ttl_seconds is None else min(self.ttl_seconds, ttl_seconds)
+        with self._lock:
+            self._generation += 1
+            self._store(key, value, ttl)
+
+    def invalidate(self, key: K) -> bool:
+        with self._lock:
+            self._generation += 1
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def invalidate_where(self, predicate: Callable[[K, V], bool]) -> int:
+        """Xóa các entry thỏa predicate(key, value), trả về số entry đã xóa."""
+        with self._lock:
+            self._generation += 1
+            keys = [key for key, (value, _) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_skips": self.stale_skips,
+            }
+
+    def _lookup(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= self.clock():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _store(self, key: K, value: V, ttl_seconds: float):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, self.clock() + ttl_seconds)
+        self._on_store(key, value)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: K):
+        value, _ = self._entries.pop(key)
+        self._on_remove(key, value)
+
+    def _on_store(self, key: K, value: V):
+        pass
+
+    def _on_remove(self, key: K, value: V):
+        pass
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+
+_DEPTH_KEY = "unit_of_work_depth"
+_CALLBACKS_KEY = "unit_of_work_after_commit"
+
+
+class UnitOfWork:
+    """
+    Gom mọi thay đổi của một luồng (login, refresh, logout...) vào một transaction duy nhất.
+    Bên trong `with UnitOfWork(db):` các repository chỉ flush (commit_or_flush) thay vì commit;
+    khối ngoài cùng commit một lần khi thoát, hoặc rollback nếu có exception.
+    Có thể lồng nhau, chỉ khối ngoài cùng commit.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def __enter__(self) -> Session:
+        info = self.db.info
+        if not info.get(_DEPTH_KEY):
+            info[_CALLBACKS_KEY] = []
+        info[_DEPTH_KEY] = info.get(_DEPTH_KEY, 0) + 1
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        info = self.db.info
+        info[_DEPTH_KEY] -= 1
+        if info[_DEPTH_KEY]:
+            return False
+
+        callbacks = info.pop(_CALLBACKS_KEY, [])
+        if exc_type is not None:
+            self.db.rollback()
+            return False
+        try:
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        for callback in callbacks:
+            callback()
+        return False
+
+
+def in_unit_of_work(db: Session) -> bool:
+    return bool(db.info.get(_DEPTH_KEY))
+
+
+def commit_or_flush(db: Session) -> bool:
+    """Commit nếu không nằm trong UnitOfWork, ngược lại chỉ flush. Trả về True nếu đã commit."""
+    if in_unit_of_work(db):
+        db.flush()
+        return False
+    db.commit()
+    return True
+
+
+def after_commit(db: Session, callback):
+    """Chạy callback (cập nhật cache/index trong bộ nhớ) sau khi transaction hiện tại commit thành công."""
+    if in_unit_of_work(db):
+        db.info[_CALLBACKS_KEY].append(callback)
+    else:
+        callback()
+
+
+@contextmanager
+def savepoint(db: Session):
+    """
+    Chạy một phần phụ của UnitOfWork (vd. ghi log) trong SAVEPOINT: nếu khối này lỗi thì chỉ các thay đổi
+    và after_commit callback của nó bị bỏ, transaction ngoài vẫn dùng được và vẫn commit như bình thường.
+    Ngoài UnitOfWork thì không làm gì thêm (mỗi repository tự commit).
+    """
+    if not in_unit_of_work(db):
+        yield db
+        return
+    callbacks = db.info[_CALLBACKS_KEY]
+    callback_count = len(callbacks)
+    try:
+        with db.begin_nested():
+            yield db
+    except Exception:
+        del callbacks[callback_count:]
+        raise
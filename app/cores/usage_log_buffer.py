@@ -0,0 +1,235 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+
+from app.cores.config import (
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_PERIOD_SECONDS,
+    TOKEN_USAGE_BUFFER_MAX_EVENTS,
+    TOKEN_USAGE_FLUSH_INTERVAL_SECONDS,
+    TOKEN_USAGE_FLUSH_SIZE,
+)
+from app.cores.database import SessionLocal
+from app.cores.logger import get_logger
+from app.cores.telemetry_storage import to_utc_naive
+from app.services.rate_limiter_service import RateLimiterService
+
+logger = get_logger("usage_log_buffer")
+
+
+class TokenUsageBuffer:
+    """
+    Bộ đệm write-behind cho token_usage_log.
+    Request chỉ thêm sự kiện vào hàng đợi trong bộ nhớ; một thread nền ghi cả lô bằng một câu INSERT
+    khi đủ flush_size sự kiện hoặc sau flush_interval giây.
+
+    count không truy vấn DB cho mỗi request: mỗi digest giữ thời điểm các request đã có trong DB
+    (của mọi worker), đọc một lần khi digest xuất hiện lần đầu và đọc lại sau mỗi lần flush cho các digest
+    trong lô, cộng với các sự kiện chưa ghi (đang chờ hoặc đang ghi). Danh sách đã ghi được thay và lô
+    đang ghi được bỏ trong cùng một lần giữ khóa nên không sự kiện nào bị đếm hai lần.
+    Request của worker khác chỉ được thấy sau lần flush kế tiếp (trễ tối đa khoảng flush_interval).
+    """
+
+    def __init__(
+        self,
+        max_events: int = TOKEN_USAGE_BUFFER_MAX_EVENTS,
+        flush_size: int = TOKEN_USAGE_FLUSH_SIZE,
+        flush_interval: float = TOKEN_USAGE_FLUSH_INTERVAL_SECONDS,
+        session_factory=SessionLocal,
+        max_digests: int = RATE_LIMIT_MAX_KEYS,
+        window_seconds: float = RATE_LIMIT_PERIOD_SECONDS,
+    ):
+        self.max_events = max_events
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self.max_digests = max_digests
+        self.window = timedelta(seconds=window_seconds)
+
+        self._queue: deque[tuple[str, datetime]] = deque()
+        self._pending: dict[str, list[datetime]] = {}
+        self._in_flight: dict[str, list[datetime]] = {}
+        # digest -> thời điểm (UTC naive, tăng dần) các request đã có trong DB, LRU theo lần dùng gần nhất
+        self._stored: "OrderedDict[str, list[datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Tăng mỗi khi flush lấy một lô: seed biết có lô nào được ghi trong lúc nó đọc DB hay không
+        self._flush_generation = 0
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+        self.dropped = 0
+        self.seeds = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def record(self, digest: str, requested_at: datetime) -> bool:
+        with self._lock:
+            if len(self._queue) >= self.max_events:
+                self.dropped += 1
+                return False
+            self._queue.append((digest, requested_at))
+            self._pending.setdefault(digest, []).append(to_utc_naive(requested_at))
+            queue_depth = len(self._queue)
+
+        if queue_depth >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def needs_seed(self, digest: str) -> bool:
+        with self._lock:
+            return digest not in self._stored
+
+    def count(self, digest: str, since: datetime, load: bool = True) -> int:
+        """
+        Số request của digest từ since: đã ghi vào DB cộng đang chờ/đang ghi.
+        Digest chưa có trong bộ nhớ được đọc từ DB ngay tại đây (load=True); caller chạy trên event loop
+        gọi seed trong threadpool trước rồi đếm với load=False (xem BufferedSQLRateLimiterEngine.check).
+        """
+        since = to_utc_naive(since)
+        if load and self.needs_seed(digest):
+            self.seed(digest, since)
+
+        with self._lock:
+            stored = self._stored.get(digest, [])
+            if digest in self._stored:
+                self._stored.move_to_end(digest)
+            return len(stored) - bisect_left(stored, since) + sum(
+                1
+                for events in (self._pending.get(digest, ()), self._in_flight.get(digest, ()))
+                for requested_at in events
+                if requested_at >= since
+            )
+
+    def seed(self, digest: str, since: datetime):
+        """
+        Đọc từ DB thời điểm các request đã ghi của digest (truy vấn chặn, không gọi trên event loop).
+        Không giữ _flush_lock trong lúc đọc nên có thể chạy song song với một lần flush; kết quả chỉ được
+        lưu khi chắc chắn không có lô nào chứa digest được ghi trong lúc đọc. Ngược lại lô đó đã hoặc sẽ
+        được flush đọc lại, còn request hiện tại chỉ đếm các sự kiện chưa ghi (đếm thiếu, không đếm hai lần).
+        """
+        since = to_utc_naive(since)
+        with self._lock:
+            if digest not in self._stored:
+                # Cửa sổ đọc lại sau flush phải bao được period dài nhất mà caller dùng
+                self.window = max(self.window, datetime.now(timezone.utc).replace(tzinfo=None) - since)
+            generation = self._flush_generation
+            touched = digest in self._pending or digest in self._in_flight
+
+        db = self.session_factory()
+        try:
+            times = RateLimiterService(db).get_usage_times({digest}, since).get(digest, [])
+        finally:
+            db.close()
+
+        with self._lock:
+            self.seeds += 1
+            if digest in self._stored or digest in self._in_flight:
+                return
+            if touched and generation != self._flush_generation:
+                return
+            self._store(digest, times)
+
+    def _store(self, digest: str, times: list[datetime]):
+        self._stored[digest] = sorted(to_utc_naive(requested_at) for requested_at in times)
+        self._stored.move_to_end(digest)
+        while len(self._stored) > self.max_digests:
+            self._stored.popitem(last=False)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                if not self._queue:
+                    return 0
+                events = list(self._queue)
+                self._queue.clear()
+                self._in_flight, self._pending = self._pending, {}
+                self._flush_generation += 1
+
+            start = time.perf_counter()
+            digests = {digest for digest, _ in events}
+            db = self.session_factory()
+            try:
+                service = RateLimiterService(db)
+                service.log_token_usage_batch(events)
+            except Exception:
+                db.rollback()
+                db.close()
+                with self._lock:
+                    self._in_flight = {}
+                    self.failed_flushes += 1
+                    self.dropped += len(events)
+                logger.exception("Failed to flush %d token usage events", len(events))
+                return 0
+
+            # Đọc lại các digest trong lô (gồm cả request đã ghi của worker khác)
+            try:
+                stored = service.get_usage_times(digests, datetime.now(timezone.utc) - self.window)
+            except Exception:
+                stored = None
+                logger.exception("Failed to reload token usage of %d digests", len(digests))
+            finally:
+                db.close()
+            with self._lock:
+                for digest in digests:
+                    if stored is None:
+                        # Đọc lại từ DB ở request kế tiếp
+                        self._stored.pop(digest, None)
+                    else:
+                        self._store(digest, stored.get(digest, []))
+                self._in_flight = {}
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.flushed += len(events)
+                self.flushes += 1
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            return len(events)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="token-usage-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        # Ghi nốt các sự kiện còn lại trước khi tắt
+        self.flush()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": len(self._queue),
+                "max_events": self.max_events,
+                "dropped": self.dropped,
+                "digests": len(self._stored),
+                "seeds": self.seeds,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_ms": self.last_flush_ms,
+                "max_flush_ms": self.max_flush_ms,
+                "avg_flush_ms": self._total_flush_ms / self.flushes if self.flushes else 0.0,
+            }
@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.cores.config import USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS
+from app.cores.ttl_cache import TTLCache
+from app.models.users import RoleEnum, User
+
+
+@dataclass(frozen=True)
+class UserSummary:
+    """Thông tin tối thiểu của user (id, username, role, status, token_version), an toàn để cache giữa các request."""
+    id: int
+    username: str
+    role: RoleEnum
+    status: bool
+    # users.token_version lúc summary được nạp
+    version: int = 0
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSummary":
+        return cls(id=user.id, username=user.username, role=user.role, status=user.status,
+                   version=user.token_version)
+
+
+class UserSummaryCache(TTLCache[int, UserSummary]):
+    """
+    user id -> UserSummary (TTLCache), kèm chỉ mục username -> id.
+    Được invalidate bởi UserRepository sau khi commit thay đổi user.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl_seconds: float = USER_CACHE_TTL_SECONDS):
+        super().__init__(max_size, ttl_seconds)
+        self._by_username: dict[str, int] = {}
+
+    def get_by_username(self, username: str) -> Optional[UserSummary]:
+        with self._lock:
+            user_id = self._by_username.get(username)
+            if user_id is None:
+                self.misses += 1
+                return None
+            return self._lookup(user_id)
+
+    def get_or_load_by_username(self, username: str, loader: Callable[[], Optional[UserSummary]]) -> Optional[UserSummary]:
+        summary = self.get_by_username(username)
+        if summary is not None:
+            return summary
+        generation = self.generation()
+        summary = loader()
+        if summary is not None:
+            self.put(summary.id, summary, generation)
+        return summary
+
+    def _on_store(self, user_id: int, summary: UserSummary):
+        self._by_username[summary.username] = user_id
+
+    def _on_remove(self, user_id: int, summary: UserSummary):
+        if self._by_username.get(summary.username) == user_id:
+            del self._by_username[summary.username]
+
+
+user_cache = UserSummaryCache()
@@ -0,0 +1,104 @@
+import re
+import threading
+import time
+import unicodedata
+from typing import Callable, Iterable
+
+from app.cores.config import USER_SEARCH_FREQUENCY_MAX_ENTRIES, USER_SEARCH_FREQUENCY_TTL_SECONDS
+
+# Đánh dấu đầu mỗi từ trong users.search_name: "^^an" đủ 3 ký tự nên truy vấn 1-2 ký tự
+# vẫn tra được bằng trigram (khớp tiền tố của từ)
+WORD_START = "^^"
+GRAM_SIZE = 3
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(value: str) -> list[str]:
+    """Chữ thường, bỏ dấu (kể cả đ -> d), tách thành từ: "Nguyễn Đức" -> ["nguyen", "duc"]."""
+    value = unicodedata.normalize("NFKD", value.lower().replace("đ", "d"))
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _WORD.findall(value)
+
+
+def search_text(username: str, fullname: str) -> str:
+    """Giá trị của users.search_name: "alice", "Nguyễn Văn A" -> "^^alice ^^nguyen ^^van ^^a"."""
+    return " ".join(WORD_START + word for word in normalize(f"{username} {fullname or ''}"))
+
+
+def trigrams(value: str) -> set[str]:
+    """Các trigram của từng từ (không nối qua khoảng trắng)."""
+    grams = set()
+    for word in value.split():
+        grams.update(word[i:i + GRAM_SIZE] for i in range(len(word) - GRAM_SIZE + 1))
+    return grams
+
+
+def query_patterns(query: str) -> list[str]:
+    """
+    Mỗi từ của truy vấn thành một chuỗi cần có trong search_name: từ từ 3 ký tự trở lên khớp
+    chuỗi con bất kỳ ("yen" khớp "nguyen"), từ ngắn hơn chỉ khớp đầu từ ("ng" khớp "nguyen").
+    """
+    return [word if len(word) >= GRAM_SIZE else WORD_START + word for word in normalize(query)]
+
+
+def name_matches(query: str, search_name: str) -> bool:
+    """Bản trong bộ nhớ của UserSearchRepository.name_condition cho một user (không xét lọc ứng viên trigram)."""
+    patterns = query_patterns(query)
+    return bool(patterns) and all(pattern in search_name for pattern in patterns)
+
+
+class TrigramFrequencies:
+    """
+    Số user chứa từng trigram (đếm trên user_name_trigrams, giữ trong TTL). Chỉ dùng để chọn các trigram
+    hiếm nhất làm bộ lọc ứng viên, nên giá trị cũ chỉ làm truy vấn chậm hơn chứ không làm sai kết quả.
+    """
+
+    def __init__(self, max_entries: int = USER_SEARCH_FREQUENCY_MAX_ENTRIES,
+                 ttl_seconds: float = USER_SEARCH_FREQUENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, grams: Iterable[str], count: Callable[[list[str]], dict[str, int]]) -> dict[str, int]:
+        """Tần suất của grams; các trigram chưa có (hoặc hết hạn) được đếm bằng một lần gọi count."""
+        now = time.monotonic()
+        frequencies, missing = {}, []
+        with self._lock:
+            for gram in grams:
+                entry = self._entries.get(gram)
+                if entry is not None and entry[1] > now:
+                    frequencies[gram] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.append(gram)
+                    self.misses += 1
+        if missing:
+            counted = count(missing)
+            with self._lock:
+                if len(self._entries) + len(missing) > self.max_entries:
+                    self._entries.clear()
+                for gram in missing:
+                    frequencies[gram] = counted.get(gram, 0)
+                    self._entries[gram] = (frequencies[gram], now + self.ttl_seconds)
+        return frequencies
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+trigram_frequencies = TrigramFrequencies()
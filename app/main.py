@@ -1,47 +1,59 @@
-import asyncio
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.api import api_router
-from app.cores.database import Base, engine
+from app.cores.database import create_all_tables, telemetry_engine
+from app.cores.auth import hash_pool
 from app.cores.dependencies import get_db
+from app.cores.maintenance import maintenance_scheduler
+from app.cores.telemetry_storage import telemetry_storage
+from app.cores.rate_limiter_engine import rate_limiter_engine
 from app.middleware.access_log import AccessLogMiddleware
 from app.middleware.auth_middleware import AuthMiddleware
 from app.middleware.rate_limiter import RateLimiterMiddleware
-from app.services.active_access_token_service import ActiveAccessTokenService
+from app.middleware.response_cache import CacheRule, ResponseCacheMiddleware
+from app.cores.response_cache import POSTS_LIST, USERS_LIST, USER_STATUS, post_tag, user_tag
 from app.services.blacklist_token_service import BlacklistTokenService
-from app.services.rate_limiter_service import RateLimiterService
+from app.services.post_service import PostService
+from app.services.user_service import UserService
 from app.cores.config import *
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async def cleanup_job():
-        while True:
-            db_gen = get_db()
-            db = next(db_gen)
-            try:
-                blacklist_service = BlacklistTokenService(db)
-                token_service = ActiveAccessTokenService(db)
-                token_usage_log = RateLimiterService(db)
-                blacklist_service.cleanup_expired_tokens(expire_minutes=BLACKLIST_TOKEN_EXPIRE_MINUTES)
-                token_service.cleanup_expired_tokens()
-                token_usage_log.cleanup_expired_tokens(expire_minutes=TOKEN_USAGE_LOG_EXPIRE_MINUTES)
-            finally:
-                try:
-                    next(db_gen)
-                except StopIteration:
-                    pass  # Generator đã hoàn tất
-
-            await asyncio.sleep(600)
-
-    asyncio.create_task(cleanup_job())
+    # Tạo sẵn các bucket telemetry hiện tại (chế độ bucketed) để request không phải chạy DDL
+    telemetry_storage.ensure_buckets(telemetry_engine)
+
+    # Nạp blacklist vào bộ nhớ trước khi nhận request
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        BlacklistTokenService(db).load_index()
+        # Chỉ mục tìm kiếm bài viết: chọn backend, nạp vào bộ nhớ (memory) hoặc tạo bảng FTS5 nếu chưa có
+        PostService(db).load_search_index()
+        # Chỉ mục tìm kiếm user nằm trong DB, chỉ cần bổ sung cho user chưa có search_name
+        UserService(db).index_missing_users()
+    finally:
+        db.close()
+
+    maintenance_scheduler.start()
+    rate_limiter_engine.start()
     yield  # Đây là phần bắt buộc để FastAPI chạy đúng lifecycle
+    await maintenance_scheduler.stop()
+    rate_limiter_engine.stop()
+    hash_pool.shutdown()
 
 
 # Khởi tạo app
 app = FastAPI(title="FastAPI Security 5", lifespan=lifespan)
 
-# Thêm middleware
+# Thêm middleware (middleware thêm sau bọc ngoài middleware thêm trước).
+# ResponseCache nằm trong cùng để request vẫn đi qua RateLimiter và Auth trước khi được trả từ cache
+app.add_middleware(ResponseCacheMiddleware, rules=[
+    CacheRule(r"^/api/v1/posts/$", {POSTS_LIST, USER_STATUS}),
+    CacheRule(r"^/api/v1/posts/(?P<post_id>\d+)$", lambda m: {post_tag(int(m["post_id"])), USER_STATUS}),
+    CacheRule(r"^/api/v1/users/$", {USERS_LIST}),
+    CacheRule(r"^/api/v1/users/(?P<user_id>\d+)$", lambda m: {user_tag(int(m["user_id"]))}),
+])
 app.add_middleware(AccessLogMiddleware)
 app.add_middleware(AuthMiddleware)
 app.add_middleware(RateLimiterMiddleware, max_requests=RATE_LIMIT_MAX_REQUESTS,
@@ -50,7 +62,9 @@ app.add_middleware(RateLimiterMiddleware, max_requests=RATE_LIMIT_MAX_REQUESTS,
 # Đăng ký router
 app.include_router(api_router, prefix="/api/v1")
 
-# Tạo bảng nếu chưa có
-Base.metadata.create_all(bind=engine)
+# Tạo bảng nếu chưa có (DB mới khi dev/test). DB đang chạy được nâng cấp bằng `alembic upgrade head`;
+# revision 0001 bỏ qua các bảng đã tồn tại nên cũng chạy được trên DB đã tạo bằng create_all.
+# Bảng telemetry được tạo trên TELEMETRY_DATABASE_CONNECTION nếu có cấu hình
+create_all_tables()
 
 
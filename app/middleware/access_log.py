@@ -1,23 +1,40 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
 import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from app.cores.logger import get_logger
 
 logger = get_logger("access")
 
-class AccessLogMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class AccessLogMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start = time.time()
-        response = await call_next(request)
-        duration_ms = (time.time() - start) * 1000
-
-        client_host = request.client.host if request.client else "unknown"
-        log_msg = (
-            f"{request.method} {request.url.path} "
-            f"status={response.status_code} "
-            f"duration={duration_ms:.2f}ms "
-            f"client={client_host}"
-        )
-        logger.info(log_msg)
-
-        return response
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.time() - start) * 1000
+
+            client = scope.get("client")
+            client_host = client[0] if client else "unknown"
+            log_msg = (
+                f"{scope['method']} {scope['path']} "
+                f"status={status_code} "
+                f"duration={duration_ms:.2f}ms "
+                f"client={client_host}"
+            )
+            logger.info(log_msg)
@@ -1,26 +1,61 @@
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from fastapi import Request, HTTPException
+from fastapi import HTTPException
 
+from app.cores import auth
 from app.cores.dependencies import get_db
+from app.cores.token_cache import token_cache
+from app.cores.token_versions import token_versions
 from app.services.blacklist_token_service import BlacklistTokenService
-from app.cores.auth_utils import validate_token_and_get_user
+from app.cores.auth_utils import get_user_from_payload
 
 
 EXCLUDE_PATHS = ["/api/v1/auth/login", "/api/v1/auth/register", "/api/v1/auth/refresh"]
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class AuthMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
         if request.url.path in EXCLUDE_PATHS or request.method == "OPTIONS":
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
-            return JSONResponse(status_code=401, content={"detail": "Missing or invalid Authorization header"})
+            response = JSONResponse(status_code=401, content={"detail": "Missing or invalid Authorization header"})
+            await response(scope, receive, send)
+            return
 
         token = auth_header.split(" ")[1]
+
+        # Token đã được xác thực gần đây: bỏ qua blacklist, decode JWT và truy vấn user
+        principal = token_cache.get(token)
+        if principal is not None and token_versions.get(principal.id) not in (None, principal.version):
+            # token_version đã tăng (block, đổi mật khẩu...) ở request khác: xác thực lại để trả 401
+            token_cache.invalidate_token(token)
+            principal = None
+        if principal is None:
+            error_response = self.authenticate(request, token)
+            if error_response is not None:
+                await error_response(scope, receive, send)
+                return
+        else:
+            request.state.user = principal.username
+            request.state.principal = principal
+
+        await self.app(scope, receive, send)
+
+    def authenticate(self, request: Request, token: str):
+        """Xác thực token qua DB; trả về JSONResponse lỗi hoặc None nếu hợp lệ."""
         db_generator = get_db()
         db = next(db_generator)
 
@@ -29,12 +64,18 @@ class AuthMiddleware(BaseHTTPMiddleware):
             if blacklist_service.is_token_blacklisted(token):
                 return JSONResponse(status_code=401, content={"detail": "Token has been revoked"})
 
-            user = validate_token_and_get_user(token, db)
-            request.state.user = user.username  # hoặc gán luôn object nếu cần
+            payload = auth.decode_token(token)
+            principal = get_user_from_payload(payload, db)
+            token_cache.set(token, principal, payload.get("exp"))
+            request.state.user = principal.username
+            # Dependency get_current_user dùng lại principal này, không decode/truy vấn lần nữa
+            request.state.principal = principal
 
         except HTTPException as e:
             return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
         except Exception:
             return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+        finally:
+            db.close()
 
-        return await call_next(request)
+        return None
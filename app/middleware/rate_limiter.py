@@ -1,39 +1,53 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from fastapi import status
+from fastapi.concurrency import run_in_threadpool
 
 from app.cores.dependencies import get_db
-from app.repositories.rate_limiter_repository import RateLimiterRepository
+from app.cores.rate_limiter_engine import RateLimiterEngine, rate_limiter_engine
 from app.services.rate_limiter_service import RateLimiterService
 
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_requests: int, period_seconds: int):
-        super().__init__(app)
+class RateLimiterMiddleware:
+    def __init__(self, app: ASGIApp, max_requests: int, period_seconds: int, engine: RateLimiterEngine = None):
+        self.app = app
         self.max_requests = max_requests
         self.period_seconds = period_seconds
+        self.engine = engine or rate_limiter_engine
 
-    async def dispatch(self, request: Request, call_next):
-        auth_header = request.headers.get("Authorization")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        auth_header = Headers(scope=scope).get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         token = auth_header.split(" ")[1]
-        db = next(get_db())
+        response = await self.check_rate_limit(token)
+        if response is not None:
+            await response(scope, receive, send)
+            return
 
+        await self.app(scope, receive, send)
+
+    async def check_rate_limit(self, token: str):
+        """Trả về JSONResponse nếu token vượt giới hạn hoặc có lỗi, ngược lại None."""
         try:
-            limiter = RateLimiterService(db)
+            if not await self.engine.check(token, self.max_requests, self.period_seconds):
+                return None
 
-            if limiter.is_rate_limited(token, self.max_requests, self.period_seconds):
-                limiter.blacklist_token(token)
-                return JSONResponse(
-                    content={"message": "Too many requests, token has been blacklisted."},
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                )
+            # Chỉ mở phiên DB khi cần blacklist token vượt giới hạn, ngoài event loop
+            await run_in_threadpool(self.blacklist_token, token)
 
-            return await call_next(request)
+            return JSONResponse(
+                content={"message": "Too many requests, token has been blacklisted."},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
 
         except Exception as e:
             # Log và trả lỗi rõ ràng thay vì để 500 propagate
@@ -41,5 +55,11 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
                 content={"detail": f"Internal middleware error: {str(e)}"},
                 status_code=500
             )
+
+    @staticmethod
+    def blacklist_token(token: str):
+        db = next(get_db())
+        try:
+            RateLimiterService(db).blacklist_token(token)
         finally:
-            db.close()
\ No newline at end of file
+            db.close()
@@ -0,0 +1,121 @@
+import re
+from typing import Callable, Iterable, Optional, Union
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cores.config import RESPONSE_CACHE_MAX_BODY_BYTES, RESPONSE_CACHE_TTL_SECONDS
+from app.cores.response_cache import CachedResponse, ResponseCache, make_etag, response_cache
+
+
+class CacheRule:
+    """
+    Route GET được cache: pattern khớp với path, tags là tập tag cố định hoặc hàm nhận re.Match
+    (vd. lấy post_id từ path) trả về tập tag dùng để invalidate.
+    """
+
+    def __init__(self, pattern: str, tags: Union[Iterable[str], Callable[[re.Match], Iterable[str]]],
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.pattern = re.compile(pattern)
+        self.tags = tags
+        self.ttl_seconds = ttl_seconds
+
+    def match(self, path: str) -> Optional[frozenset]:
+        match = self.pattern.match(path)
+        if match is None:
+            return None
+        return frozenset(self.tags(match) if callable(self.tags) else self.tags)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+class ResponseCacheMiddleware:
+    """
+    Middleware trong cùng (sau Auth và RateLimiter): trả body đã serialize từ ResponseCache
+    cho các route trong rules, kèm ETag mạnh. If-None-Match khớp thì trả 304 mà không chạm tới DB.
+    Chỉ cache response 200 không có Set-Cookie.
+    """
+
+    def __init__(self, app: ASGIApp, rules: list[CacheRule], cache: ResponseCache = None):
+        self.app = app
+        self.rules = rules
+        self.cache = cache or response_cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        rule, tags = None, None
+        for candidate in self.rules:
+            tags = candidate.match(scope["path"])
+            if tags is not None:
+                rule = candidate
+                break
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+        if_none_match = Headers(scope=scope).get("if-none-match")
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._reply(entry, if_none_match, "HIT", send)
+            return
+
+        versions = self.cache.versions(tags)
+        start: Optional[Message] = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                if message["status"] != 200 or "set-cookie" in headers:
+                    passthrough = True
+                    await send(message)
+                return
+            chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send_wrapper)
+        if passthrough or start is None:
+            return
+
+        body = b"".join(chunks)
+        headers = [(name, value) for name, value in start["headers"] if name.lower() != b"content-length"]
+        entry = CachedResponse(status=start["status"], headers=headers, body=body, etag=make_etag(body), tags=tags)
+        if len(body) <= RESPONSE_CACHE_MAX_BODY_BYTES:
+            self.cache.put(key, entry, rule.ttl_seconds, versions)
+        await self._reply(entry, if_none_match, "MISS", send)
+
+    async def _reply(self, entry: CachedResponse, if_none_match: Optional[str], cache_status: str, send: Send):
+        not_modified = etag_matches(if_none_match, entry.etag)
+        headers = MutableHeaders(raw=list(entry.headers))
+        headers["ETag"] = entry.etag
+        # Client luôn hỏi lại server (rẻ nhờ 304), không lưu dữ liệu cần đăng nhập vào cache dùng chung
+        headers["Cache-Control"] = "private, no-cache"
+        headers["X-Cache"] = cache_status
+
+        if not_modified:
+            self.cache.record_not_modified()
+            for name in ("content-type", "content-length"):
+                if name in headers:
+                    del headers[name]
+            await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers["Content-Length"] = str(len(entry.body))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": entry.body})
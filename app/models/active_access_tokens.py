@@ -1,17 +1,22 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Integer, Column, ForeignKey, String, DateTime
+from sqlalchemy import Integer, Column, String, DateTime
 from sqlalchemy.orm import relationship
 
-from app.cores.database import Base
+from app.cores.database import Base, TELEMETRY_TABLE_INFO
 
 
 class ActiveAccessToken(Base):
     __tablename__ = "active_access_tokens"
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), index=True)
-    access_token = Column(String(255), unique=True)
+    # Không có FOREIGN KEY tới users: bảng có thể nằm ở DB telemetry riêng
+    user_id = Column(Integer, index=True)
+    token_digest = Column(String(64), unique=True)
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
 
-    user = relationship("User", back_populates="active_access_tokens")
+    user = relationship(
+        "User", primaryjoin="foreign(ActiveAccessToken.user_id) == User.id", back_populates="active_access_tokens"
+    )
+
+    __table_args__ = {"info": TELEMETRY_TABLE_INFO}
@@ -2,11 +2,14 @@ from datetime import datetime, timezone
 
 from sqlalchemy import Column, Integer, String, DateTime
 
-from app.cores.database import Base
+from app.cores.database import Base, TELEMETRY_TABLE_INFO
 
 
 class BlacklistedToken(Base):
     __tablename__ = "blacklisted_tokens"
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String(500), unique=False, nullable=False)
-    blacklisted_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # SHA-256 (hex) của token thay cho chuỗi JWT gốc
+    token_digest = Column(String(64), nullable=False, index=True)
+    blacklisted_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+    __table_args__ = {"info": TELEMETRY_TABLE_INFO}
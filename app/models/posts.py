@@ -15,7 +15,7 @@ class Post(Base):
     content = Column(String(2000), nullable=False)
 
     # Khóa ngoại tham chiếu đến bảng users (cột id)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     # Thiết lập mối quan hệ với model User (1 User có nhiều Post)
     user = relationship("User", back_populates="posts")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.cores.database import Base
@@ -12,7 +12,12 @@ class Session(Base):
     ip_address = Column(String(255))
     user_agent = Column(String(255))
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
     revoked = Column(Boolean, default=False)
 
     user = relationship("User", back_populates="sessions")
+
+    __table_args__ = (
+        # revoke_all_sessions: WHERE user_id IN (...) AND revoked = false
+        Index("idx_sessions_user_revoked", "user_id", "revoked"),
+    )
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.sql import func
-from app.cores.database import Base
+from app.cores.database import Base, TELEMETRY_TABLE_INFO
 
 class TokenLog(Base):
     __tablename__ = "token_logs"
@@ -11,3 +11,9 @@ class TokenLog(Base):
     user_agent = Column(String(255), nullable=True)
     action = Column(String(255), nullable=False)  # ví dụ: "login", "refresh"
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # get_last_log: WHERE user_id = ? AND action = ? ORDER BY timestamp DESC LIMIT 1
+        Index("idx_token_logs_user_action_time", "user_id", "action", "timestamp"),
+        {"info": TELEMETRY_TABLE_INFO},
+    )
@@ -2,16 +2,17 @@ from datetime import datetime, timezone
 
 from sqlalchemy import Column, Integer, String, DateTime, Index
 
-from app.cores.database import Base
+from app.cores.database import Base, TELEMETRY_TABLE_INFO
 
 
 class TokenUsageLog(Base):
     __tablename__ = "token_usage_log"
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String(500), nullable=False, index=True)
-    requested_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    token_digest = Column(String(64), nullable=False)
+    requested_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
     __table_args__ = (
-        Index("idx_token_time", "token", "requested_at"),
-    )
\ No newline at end of file
+        Index("idx_token_time", "token_digest", "requested_at"),
+        {"info": TELEMETRY_TABLE_INFO},
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String
+
+from app.cores.database import Base
+
+
+class UserNameTrigram(Base):
+    """
+    Chỉ mục trigram của users.search_name (username + fullname đã chuẩn hóa), dùng cho tìm kiếm
+    chuỗi con trong tên user. Được ghi cùng transaction với user (xem UserSearchRepository).
+    """
+    __tablename__ = "user_name_trigrams"
+
+    # Khóa chính (trigram, user_id): tra theo trigram dùng luôn khóa chính, không cần đọc bảng
+    trigram = Column(String(3), primary_key=True)
+    user_id = Column(Integer, primary_key=True, index=True)
@@ -27,9 +27,15 @@ class User(Base):
     gender = Column(Enum(GenderEnum), nullable=False)
     status = Column(Boolean, default=True, nullable=False)
     role = Column(Enum(RoleEnum), default=RoleEnum.user, nullable=False)
+    # Tăng khi block, đổi mật khẩu, đổi role hoặc logout-all: token mang claim "ver" cũ hết hiệu lực
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
+    # username + fullname đã chuẩn hóa cho tìm kiếm (xem app.cores.user_search.search_text)
+    search_name = Column(String(1024), nullable=True)
 
     posts = relationship("Post", back_populates="user")
 
     sessions = relationship("Session", back_populates="user", cascade="all, delete")
 
-    active_access_tokens = relationship("ActiveAccessToken", back_populates="user")
+    active_access_tokens = relationship(
+        "ActiveAccessToken", primaryjoin="User.id == foreign(ActiveAccessToken.user_id)", back_populates="user"
+    )
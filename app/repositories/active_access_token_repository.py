@@ -1,9 +1,10 @@
 from datetime import datetime, timezone
-from os import access
 from typing import List
 
 from sqlalchemy.orm import Session
 
+from app.cores.unit_of_work import commit_or_flush
+from app.repositories.bulk import delete_in_chunks
 from app.models.active_access_tokens import ActiveAccessToken
 from app.schemas.active_access_tokens import ActiveAccessTokenCreate
 
@@ -15,22 +16,25 @@ class ActiveAccessTokenRepository:
     def add(self, token_data: ActiveAccessTokenCreate) -> ActiveAccessToken:
         db_token = ActiveAccessToken(**token_data.model_dump())
         self.db.add(db_token)
-        self.db.commit()
-        self.db.refresh(db_token)
+        commit_or_flush(self.db)
         return db_token
 
     def get_access_tokens_by_user_id(self, user_id: int) -> List[ActiveAccessToken]:
         access_tokens = self.db.query(ActiveAccessToken).filter_by(user_id=user_id).all()
         return access_tokens
 
-    def delete_token(self, token: str) -> bool:
+    def get_digests_by_user_ids(self, user_ids: List[int]) -> List[str]:
+        rows = self.db.query(ActiveAccessToken.token_digest).filter(ActiveAccessToken.user_id.in_(user_ids))
+        return [digest for (digest,) in rows]
+
+    def delete_token(self, token_digest: str) -> bool:
         try:
             deleted_count = (
                 self.db.query(ActiveAccessToken)
-                .filter_by(access_token=token)
+                .filter_by(token_digest=token_digest)
                 .delete(synchronize_session=False)
             )
-            self.db.commit()
+            commit_or_flush(self.db)
             return deleted_count > 0
         except Exception:
             self.db.rollback()
@@ -43,20 +47,22 @@ class ActiveAccessTokenRepository:
                 .filter_by(user_id=user_id)
                 .delete(synchronize_session=False)
             )
-            self.db.commit()
+            commit_or_flush(self.db)
             return deleted_count > 0
         except Exception:
             self.db.rollback()
             return False
 
-    def delete_expired_tokens(self):
-        expired_tokens = (
+    def delete_tokens_by_user_ids(self, user_ids: List[int]) -> int:
+        deleted_count = (
             self.db.query(ActiveAccessToken)
-            .filter(ActiveAccessToken.expires_at < datetime.now(timezone.utc))
-            .all()
+            .filter(ActiveAccessToken.user_id.in_(user_ids))
+            .delete(synchronize_session=False)
         )
-        for token in expired_tokens:
-            self.db.delete(token)
-        self.db.commit()
+        commit_or_flush(self.db)
+        return deleted_count
+
+    def delete_expired_tokens(self) -> int:
+        return delete_in_chunks(self.db, ActiveAccessToken, ActiveAccessToken.expires_at < datetime.now(timezone.utc))
 
 
@@ -1,6 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import List, Tuple
 
+from sqlalchemy import DateTime, insert, literal, select, union_all
 from sqlalchemy.orm import Session
+from app.cores.telemetry_storage import telemetry_storage
+from app.cores.unit_of_work import commit_or_flush
+from app.repositories.bulk import delete_in_chunks
+from app.models.active_access_tokens import ActiveAccessToken
 from app.models.blacklisted_tokens import BlacklistedToken
 from app.schemas.blacklist_token import BlacklistedTokenCreate
 
@@ -8,29 +14,58 @@ from app.schemas.blacklist_token import BlacklistedTokenCreate
 class BlacklistedTokenRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.buckets = telemetry_storage.get("blacklisted_tokens")
 
     def add(self, token_data: BlacklistedTokenCreate) -> BlacklistedToken:
+        if self.buckets:
+            row = {**token_data.model_dump(), "blacklisted_at": datetime.now(timezone.utc)}
+            self.buckets.insert(self.db, [row])
+            commit_or_flush(self.db)
+            return BlacklistedToken(**row)
+
         db_token = BlacklistedToken(**token_data.model_dump())
         self.db.add(db_token)
-        self.db.commit()
-        self.db.refresh(db_token)
+        commit_or_flush(self.db)
         return db_token
 
-    def is_blacklisted(self, token: str) -> bool:
+    def add_from_active_tokens(self, user_ids: List[int], blacklisted_at: datetime) -> int:
+        # INSERT ... SELECT: chép digest của mọi access token đang hoạt động của các user trong một câu lệnh
+        target = self.buckets.ensure(self.buckets.bind(self.db), blacklisted_at) if self.buckets else BlacklistedToken.__table__
+        active_tokens = select(
+            ActiveAccessToken.token_digest,
+            literal(blacklisted_at, DateTime),
+        ).where(ActiveAccessToken.user_id.in_(user_ids))
+        result = self.db.execute(
+            insert(target).from_select(["token_digest", "blacklisted_at"], active_tokens)
+        )
+        commit_or_flush(self.db)
+        return result.rowcount
+
+    def is_blacklisted(self, token_digest: str) -> bool:
+        if self.buckets:
+            return any(
+                self.db.execute(select(table.c.id).where(table.c.token_digest == token_digest).limit(1)).first()
+                for table in self.buckets.tables_newest_first(self.db)
+            )
         # Lọc đúng: filter nhận ColumnElement[bool]
         return (
-            self.db.query(BlacklistedToken)
-            .filter(BlacklistedToken.token == token)
+            self.db.query(BlacklistedToken.id)
+            .filter(BlacklistedToken.token_digest == token_digest)
             .first()
             is not None
         )
 
-    def delete_expired_tokens(self, expire_before: datetime):
-        expired_tokens = (
-            self.db.query(BlacklistedToken)
-            .filter(BlacklistedToken.blacklisted_at < expire_before)
-            .all()
-        )
-        for token in expired_tokens:
-            self.db.delete(token)
-        self.db.commit()
\ No newline at end of file
+    def get_all_digests(self) -> List[Tuple[str, datetime]]:
+        if self.buckets:
+            tables = self.buckets.tables_newest_first(self.db)
+            if not tables:
+                return []
+            return self.db.execute(
+                union_all(*(select(table.c.token_digest, table.c.blacklisted_at) for table in tables))
+            ).all()
+        return self.db.query(BlacklistedToken.token_digest, BlacklistedToken.blacklisted_at).all()
+
+    def delete_expired_tokens(self, expire_before: datetime) -> int:
+        if self.buckets:
+            return self.buckets.drop_before(self.buckets.bind(self.db), expire_before)
+        return delete_in_chunks(self.db, BlacklistedToken, BlacklistedToken.blacklisted_at < expire_before)
@@ -0,0 +1,25 @@
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.cores.config import MAINTENANCE_DELETE_CHUNK_SIZE
+
+
+def delete_in_chunks(db: Session, model, *criteria, chunk_size: int = MAINTENANCE_DELETE_CHUNK_SIZE) -> int:
+    """
+    Xóa các dòng thỏa criteria theo từng lô chunk_size dòng, commit sau mỗi lô. Trả về tổng số dòng đã xóa.
+    MySQL: DELETE ... WHERE ... LIMIT n. DB khác (SQLite, PostgreSQL): DELETE ... WHERE id IN (SELECT id ... LIMIT n).
+    """
+    if db.get_bind(model).dialect.name == "mysql":
+        statement = delete(model).where(*criteria).with_dialect_options(mysql_limit=chunk_size)
+    else:
+        chunk = select(model.id).where(*criteria).limit(chunk_size)
+        statement = delete(model).where(model.id.in_(chunk.scalar_subquery()))
+    statement = statement.execution_options(synchronize_session=False)
+
+    total = 0
+    while True:
+        deleted = db.execute(statement).rowcount
+        db.commit()
+        total += deleted
+        if deleted < chunk_size:
+            return total
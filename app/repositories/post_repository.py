@@ -1,5 +1,6 @@
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
+from app.cores.unit_of_work import commit_or_flush
 from app.models.posts import Post
 from app.models.users import User
 
@@ -29,8 +30,8 @@ class PostRepository:
         Tạo mới bài post trong DB.
         """
         self.db.add(post)
-        self.db.commit()
-        self.db.refresh(post)
+        if commit_or_flush(self.db):
+            self.db.refresh(post)
         return post
 
     def get_posts_by_user_id(self, user_id: int) -> List[Post]:
@@ -56,12 +57,72 @@ class PostRepository:
             .all()
         )
 
+    def get_posts_page(
+        self,
+        limit: int,
+        after_id: Optional[int] = None,
+        offset: Optional[int] = None,
+        user_id: Optional[int] = None,
+        active_users_only: bool = False,
+        title: Optional[str] = None,
+    ) -> List[Post]:
+        """
+        Lấy tối đa limit + 1 bài post theo thứ tự id tăng dần (dòng thừa cho biết còn trang kế).
+        Keyset: id > after_id, đi theo khóa chính nên chi phí không tăng theo độ sâu trang.
+        offset chỉ để tương thích ngược với kiểu phân trang cũ.
+        """
+        query = self.db.query(Post)
+        if active_users_only:
+            query = query.join(User, Post.user_id == User.id).filter(User.status.is_(True))
+        if user_id is not None:
+            query = query.filter(Post.user_id == user_id)
+        if title:
+            query = query.filter(Post.title.contains(title, autoescape=True))
+        if after_id is not None:
+            query = query.filter(Post.id > after_id)
+        query = query.order_by(Post.id)
+        if offset:
+            query = query.offset(offset)
+        return query.limit(limit + 1).all()
+
+    def get_active_posts_by_ids(self, post_ids: List[int]) -> Dict[int, Post]:
+        """
+        Lấy các bài post theo danh sách id, chỉ của user đang hoạt động. Trả về dict id -> Post.
+        """
+        if not post_ids:
+            return {}
+        posts = (
+            self.db.query(Post)
+            .join(User, Post.user_id == User.id)
+            .filter(Post.id.in_(post_ids), User.status.is_(True))
+            .all()
+        )
+        return {post.id: post for post in posts}
+
+    def iter_posts_for_index(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, str]]:
+        """
+        Duyệt (id, title, content) của mọi bài post theo lô keyset, dùng khi dựng lại chỉ mục tìm kiếm.
+        """
+        after_id = 0
+        while True:
+            rows = (
+                self.db.query(Post.id, Post.title, Post.content)
+                .filter(Post.id > after_id)
+                .order_by(Post.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return
+            yield from ((row.id, row.title, row.content) for row in rows)
+            after_id = rows[-1].id
+
     def update_post(self, post: Post) -> Post:
         """
         Commit và refresh post đã được cập nhật thuộc tính bên ngoài.
         """
-        self.db.commit()
-        self.db.refresh(post)
+        if commit_or_flush(self.db):
+            self.db.refresh(post)
         return post
 
 
@@ -70,4 +131,4 @@ class PostRepository:
         Xóa bài post khỏi DB.
         """
         self.db.delete(post)
-        self.db.commit()
+        commit_or_flush(self.db)
@@ -1,50 +1,79 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
+from app.cores.telemetry_storage import telemetry_storage
+from app.cores.unit_of_work import commit_or_flush
 from app.models.token_usage_log import TokenUsageLog
-from app.models.blacklisted_tokens import BlacklistedToken
 from app.models.active_access_tokens import ActiveAccessToken
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+from app.repositories.bulk import delete_in_chunks
+from app.schemas.blacklist_token import BlacklistedTokenCreate
 
 
 class RateLimiterRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.buckets = telemetry_storage.get("token_usage_log")
 
-    def count_token_usage(self, token: str, since: datetime) -> int:
+    def count_token_usage(self, token_digest: str, since: datetime) -> int:
+        if self.buckets:
+            # Chỉ đọc các bucket giao với [since, hiện tại]
+            return sum(
+                self.db.execute(
+                    select(func.count())
+                    .select_from(table)
+                    .where(table.c.token_digest == token_digest, table.c.requested_at >= since)
+                ).scalar_one()
+                for table in self.buckets.tables_between(self.db, since, datetime.now(timezone.utc))
+            )
         return (
             self.db.query(TokenUsageLog)
-            .filter(TokenUsageLog.token == token)
+            .filter(TokenUsageLog.token_digest == token_digest)
             .filter(TokenUsageLog.requested_at >= since)
             .count()
         )
 
-    def log_token_usage(self, token: str, timestamp: datetime):
-        self.db.add(TokenUsageLog(token=token, requested_at=timestamp))
+    def get_usage_times(self, token_digests: set[str], since: datetime) -> dict[str, list[datetime]]:
+        """Thời điểm các request từ since của từng digest, một câu SELECT cho mọi digest (mỗi bucket một câu)."""
+        if self.buckets:
+            tables = self.buckets.tables_between(self.db, since, datetime.now(timezone.utc))
+        else:
+            tables = [TokenUsageLog.__table__]
+        times = {}
+        for table in tables:
+            rows = self.db.execute(
+                select(table.c.token_digest, table.c.requested_at)
+                .where(table.c.token_digest.in_(token_digests), table.c.requested_at >= since)
+            )
+            for token_digest, requested_at in rows:
+                times.setdefault(token_digest, []).append(requested_at)
+        return times
+
+    def log_token_usage(self, token_digest: str, timestamp: datetime):
+        self.bulk_log_token_usage([{"token_digest": token_digest, "requested_at": timestamp}])
+
+    def bulk_log_token_usage(self, rows: list[dict]):
+        # Một câu INSERT nhiều dòng (mỗi bucket một câu) và một lần commit cho cả lô
+        if self.buckets:
+            self.buckets.insert(self.db, rows)
+        else:
+            self.db.execute(insert(TokenUsageLog), rows)
         self.db.commit()
 
-    def blacklist_token(self, token: str):
+    def blacklist_token(self, token_digest: str):
         self.db.query(ActiveAccessToken).filter(
-            ActiveAccessToken.access_token == token
+            ActiveAccessToken.token_digest == token_digest
         ).delete()
 
         # Check nếu đã tồn tại rồi thì khỏi insert
-        exists = self.db.query(BlacklistedToken).filter(
-            BlacklistedToken.token == token
-        ).first()
-
-        if not exists:
-            self.db.add(BlacklistedToken(token=token))
-            self.db.commit()
-
-    def delete_expired_tokens(self, expire_before: datetime):
-        expired_tokens = (
-            self.db.query(TokenUsageLog)
-            .filter(TokenUsageLog.requested_at < expire_before)
-            .all()
-        )
-        print(f"[DEBUG] Tokens to delete: {len(expired_tokens)}")
+        blacklist_repo = BlacklistedTokenRepository(self.db)
+        if not blacklist_repo.is_blacklisted(token_digest):
+            blacklist_repo.add(BlacklistedTokenCreate(token_digest=token_digest))
+        commit_or_flush(self.db)
 
-        for token in expired_tokens:
-            self.db.delete(token)
-        self.db.commit()
\ No newline at end of file
+    def delete_expired_tokens(self, expire_before: datetime) -> int:
+        if self.buckets:
+            return self.buckets.drop_before(self.buckets.bind(self.db), expire_before)
+        return delete_in_chunks(self.db, TokenUsageLog, TokenUsageLog.requested_at < expire_before)
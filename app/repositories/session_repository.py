@@ -1,4 +1,9 @@
+from typing import List
+
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from app.cores.unit_of_work import commit_or_flush
+from app.repositories.bulk import delete_in_chunks
 from app.models.sessions import Session as SessionModel
 from datetime import datetime
 
@@ -19,23 +24,26 @@ class SessionRepository:
     def add_session(self, session_data: SessionCreate) -> SessionModel:
         db_session = SessionModel(**session_data.model_dump())  # ✅ Chuyển Pydantic -> SQLAlchemy
         self.db.add(db_session)
-        self.db.commit()
-        self.db.refresh(db_session)
+        commit_or_flush(self.db)
         return db_session
 
     def revoke_session(self, session: SessionModel):
         session.revoked = True
-        self.db.commit()
+        commit_or_flush(self.db)
 
     def revoke_all_sessions(self, user_id: int):
-        sessions = self.db.query(SessionModel).filter_by(user_id=user_id, revoked=False).all()
-        for s in sessions:
-            s.revoked = True
-        self.db.commit()
-
-    def delete_expired_sessions(self):
-        now = datetime.utcnow()
-        expired_sessions = self.db.query(SessionModel).filter(SessionModel.expires_at < now).all()
-        for s in expired_sessions:
-            self.db.delete(s)
-        self.db.commit()
+        self.revoke_sessions_by_user_ids([user_id])
+
+    def revoke_sessions_by_user_ids(self, user_ids: List[int]) -> int:
+        # Một câu UPDATE thay vì nạp từng session vào ORM
+        result = self.db.execute(
+            update(SessionModel)
+            .where(SessionModel.user_id.in_(user_ids), SessionModel.revoked.is_(False))
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+        commit_or_flush(self.db)
+        return result.rowcount
+
+    def delete_expired_sessions(self) -> int:
+        return delete_in_chunks(self.db, SessionModel, SessionModel.expires_at < datetime.utcnow())
@@ -1,15 +1,26 @@
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from sqlalchemy import text
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from app.cores.telemetry_storage import telemetry_storage
+from app.cores.unit_of_work import commit_or_flush
 from app.models.token_logs import TokenLog
 from app.schemas.token_log import TokenLogCreate
 
 class TokenLogRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.buckets = telemetry_storage.get("token_logs")
 
     def create(self, log: TokenLogCreate) -> TokenLog:
+        if self.buckets:
+            # Thời điểm được gán ở đây (không dùng server_default) để chọn bucket
+            row = {**log.model_dump(), "timestamp": datetime.now(timezone.utc)}
+            self.buckets.insert(self.db, [row])
+            commit_or_flush(self.db)
+            return TokenLog(**row)
+
         db_log = TokenLog(
             user_id=log.user_id,
             username=log.username,
@@ -18,24 +29,54 @@ class TokenLogRepository:
             action=log.action
         )
         self.db.add(db_log)
-        self.db.commit()
-        self.db.refresh(db_log)
+        commit_or_flush(self.db)
         return db_log
 
     def get_paginated(self, skip: int, limit: int) -> List[TokenLog]:
+        if self.buckets:
+            # Giữ thứ tự cũ (cũ nhất trước): bỏ qua nguyên các bucket nằm trọn trong skip
+            logs = []
+            for table in reversed(self.buckets.tables_newest_first(self.db)):
+                if len(logs) >= limit:
+                    break
+                if skip:
+                    size = self.db.execute(select(func.count()).select_from(table)).scalar_one()
+                    if size <= skip:
+                        skip -= size
+                        continue
+                rows = self.db.execute(select(table).order_by(table.c.id).offset(skip).limit(limit - len(logs)))
+                logs.extend(TokenLog(**row._mapping) for row in rows)
+                skip = 0
+            return logs
         return self.db.query(TokenLog).offset(skip).limit(limit).all()
 
-    def get_last_log(self, user_id: int, action: str) -> Optional[TokenLog]:
-        sql = text("""
-            SELECT * FROM token_logs
-            WHERE user_id = :user_id And action = :action
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """)
-        result = self.db.execute(sql, {"user_id": user_id, "action": action}).fetchone()
-        if result:
-            # Nếu muốn trả về đối tượng TokenLog (ORM), bạn có thể map thủ công hoặc tạo đối tượng từ dict
-            return TokenLog(**result._mapping)  # _mapping trả về dict như row
-        return None
+    def get_last_log(self, user_id: int, action: str, since: Optional[datetime] = None) -> Optional[TokenLog]:
+        """Log mới nhất của (user_id, action); nếu có since thì chỉ xét log từ since (UTC) trở đi."""
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if self.buckets:
+            # Bucket mới nhất trước, dừng ở bucket đầu tiên có log; có since thì chỉ đọc các bucket giao với [since, hiện tại]
+            if since is None:
+                tables = self.buckets.tables_newest_first(self.db)
+            else:
+                tables = self.buckets.tables_between(self.db, since, datetime.now(timezone.utc))
+            for table in tables:
+                query = select(table).where(table.c.user_id == user_id, table.c.action == action)
+                if since is not None:
+                    query = query.where(table.c.timestamp >= since)
+                row = self.db.execute(query.order_by(table.c.timestamp.desc()).limit(1)).first()
+                if row:
+                    return TokenLog(**row._mapping)
+            return None
 
+        # Truy vấn ORM để timestamp luôn là datetime (SQL thô trên SQLite trả về chuỗi)
+        query = self.db.query(TokenLog).filter(TokenLog.user_id == user_id, TokenLog.action == action)
+        if since is not None:
+            query = query.filter(TokenLog.timestamp >= since)
+        return query.order_by(TokenLog.timestamp.desc()).first()
 
+    def delete_expired_logs(self, expire_before: datetime) -> int:
+        """Retention của token_logs, chỉ ở chế độ bucketed (chế độ single giữ log như trước)."""
+        if self.buckets:
+            return self.buckets.drop_before(self.buckets.bind(self.db), expire_before)
+        return 0
@@ -1,25 +1,97 @@
+from collections import defaultdict
 from typing import Optional, List
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.cores.count_cache import CountedUser, is_counted, user_count_cache
+from app.cores.post_search import get_post_search_index
+from app.cores.token_versions import token_versions
+from app.cores.unit_of_work import after_commit, commit_or_flush
+from app.cores.user_cache import UserSummary, user_cache
 from app.models.users import User, RoleEnum
 from app.models.posts import Post
+from app.repositories.user_search_repository import UserSearchRepository
 from app.schemas.users import UserCreate, UserRead
 
 
 class UserRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.search = UserSearchRepository(db)
 
     def _commit_and_refresh(self, obj: User):
         try:
-            self.db.commit()
-            self.db.refresh(obj)
+            if commit_or_flush(self.db):
+                self.db.refresh(obj)
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            raise e
+
+    def _invalidate_counts(self, before: Optional[CountedUser], after: Optional[CountedUser]):
+        """
+        Sau khi commit, bỏ các tổng (name, status) trong user_count_cache mà thay đổi của một user làm lệch:
+        before/after là (search_name, status) của user trước/sau thay đổi, None nếu chưa có hoặc đã bị xóa.
+        """
+        def affected(key, _total) -> bool:
+            return is_counted(key, before) != is_counted(key, after)
+
+        after_commit(self.db, lambda: user_count_cache.invalidate_where(affected))
+
+    def _invalidate_summary(self, user_id: int):
+        def invalidate():
+            user_cache.invalidate(user_id)
+            token_versions.discard(user_id)
+
+        after_commit(self.db, invalidate)
+
+    def _load_summary(self, *criteria) -> Optional[UserSummary]:
+        row = self.db.query(User.id, User.username, User.role, User.status, User.token_version).filter(*criteria).first()
+        if row is None:
+            return None
+        return UserSummary(id=row.id, username=row.username, role=row.role, status=row.status,
+                           version=row.token_version)
+
+    def get_summary_by_id(self, user_id: int) -> Optional[UserSummary]:
+        return user_cache.get_or_load(user_id, lambda: self._load_summary(User.id == user_id))
+
+    def get_summary_by_username(self, username: str) -> Optional[UserSummary]:
+        return user_cache.get_or_load_by_username(username, lambda: self._load_summary(User.username == username))
+
+    def get_token_version(self, user_id: int) -> Optional[int]:
+        """token_version hiện tại của user (qua token_versions), None nếu user không tồn tại."""
+        return token_versions.get_or_load(
+            user_id, lambda: self.db.query(User.token_version).filter(User.id == user_id).scalar()
+        )
+
+    def bump_token_versions(self, user_ids: List[int]):
+        """
+        Tăng token_version của các user (một UPDATE): mọi access/refresh token đã cấp cho họ hết hiệu lực.
+        Version mới được ghi vào token_versions sau khi commit.
+        """
+        user_ids = list(set(user_ids))
+        try:
+            self.db.query(User).filter(User.id.in_(user_ids)).update(
+                {User.token_version: User.token_version + 1}, synchronize_session="evaluate"
+            )
+            versions = dict(self.db.query(User.id, User.token_version).filter(User.id.in_(user_ids)).all())
+            commit_or_flush(self.db)
         except SQLAlchemyError as e:
             self.db.rollback()
             raise e
 
+        def publish():
+            for user_id, version in versions.items():
+                user_cache.invalidate(user_id)
+                token_versions.set(user_id, version)
+
+        after_commit(self.db, publish)
+
+    def get_cached_summary(self, user_id: int) -> Optional[UserSummary]:
+        """Chỉ đọc cache, không truy vấn DB."""
+        return user_cache.get(user_id)
+
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         return self.db.get(User, user_id)
 
@@ -31,15 +103,21 @@ class UserRepository:
 
     def create_user(self, user: User) -> UserRead:
         self.db.add(user)
+        self.search.index_user(user)
         self.db.commit()
         self.db.refresh(user)
+        self._invalidate_counts(None, (user.search_name, user.status))
         return user
 
     def get_users_by_role_user(self) -> List[User]:
         return self.db.query(User).filter(User.role == RoleEnum.user).all()
 
     def update_user(self, user: User):
+        old_search_name = user.search_name
+        self.search.index_user(user)
         self._commit_and_refresh(user)
+        self._invalidate_summary(user.id)
+        self._invalidate_counts((old_search_name, user.status), (user.search_name, user.status))
 
     def update_password(self, user: User, new_password_hash: str):
         user.password = new_password_hash
@@ -47,11 +125,14 @@ class UserRepository:
 
     def block_user(self, user: User):
         user.status = False
-        self._commit_and_refresh(user)
+        self.bump_token_versions([user.id])
+        self._invalidate_counts((user.search_name, True), (user.search_name, False))
 
     def unblock_user(self, user: User):
         user.status = True
         self._commit_and_refresh(user)
+        self._invalidate_summary(user.id)
+        self._invalidate_counts((user.search_name, False), (user.search_name, True))
 
     def list_users(self, status: Optional[bool] = None, skip: int = 0, limit: int = 100) -> List[User]:
         query = self.db.query(User)
@@ -60,33 +141,81 @@ class UserRepository:
         return query.offset(skip).limit(limit).all()
 
     def delete_user_and_posts(self, user: User):
+        user_id = user.id
+        counted = (user.search_name, user.status)
         try:
-            self.db.query(Post).filter(Post.user_id == user.id).delete(synchronize_session=False)
+            post_ids = self.db.scalars(select(Post.id).where(Post.user_id == user_id)).all()
+            self.db.query(Post).filter(Post.user_id == user_id).delete(synchronize_session=False)
+            # Gỡ các bài khỏi chỉ mục tìm kiếm trong cùng transaction (memory: sau khi commit)
+            get_post_search_index().remove_posts(self.db, post_ids)
+            self.search.remove_user(user_id)
             self.db.delete(user)
             self.db.commit()
+            self._invalidate_summary(user_id)
+            self._invalidate_counts(counted, None)
         except SQLAlchemyError as e:
             self.db.rollback()
             raise e
 
     def _filter_by_name_and_status(self, query, name: Optional[str], status: Optional[bool]):
         if name:
-            query = query.filter(User.fullname.ilike(f"%{name}%"))
+            query = query.filter(self.search.name_condition(name))
         if status is not None:
             query = query.filter(User.status == status)
         return query
 
     def get_users_with_posts(
             self,
-            skip: int = 0,
             limit: int = 100,
+            after_id: Optional[int] = None,
+            offset: Optional[int] = None,
             name: Optional[str] = None,
             status: Optional[bool] = None,
+            posts_limit: Optional[int] = None,
     ) -> List[User]:
-        query = self.db.query(User).options(joinedload(User.posts))
-        query = self._filter_by_name_and_status(query, name, status)
-        return query.offset(skip).limit(limit).all()
+        """
+        Lấy tối đa limit + 1 user (keyset theo id > after_id, hoặc offset kiểu cũ), sau đó nạp posts
+        của đúng các user đó ở truy vấn thứ hai: selectinload khi không giới hạn, hoặc tối đa
+        posts_limit bài mới nhất mỗi user (row_number() theo user_id).
+        """
+        query = self._filter_by_name_and_status(self.db.query(User), name, status)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        query = query.order_by(User.id)
+        if offset:
+            query = query.offset(offset)
+        if posts_limit is None:
+            query = query.options(selectinload(User.posts))
+
+        users = query.limit(limit + 1).all()
+        if posts_limit is not None and users:
+            self._load_latest_posts(users, posts_limit)
+        return users
+
+    def _load_latest_posts(self, users: List[User], posts_limit: int):
+        ranked = select(
+            Post,
+            func.row_number().over(partition_by=Post.user_id, order_by=Post.id.desc()).label("rank"),
+        ).where(Post.user_id.in_([user.id for user in users])).subquery()
+        ranked_post = aliased(Post, ranked)
+        posts = (
+            self.db.query(ranked_post)
+            .filter(ranked.c.rank <= posts_limit)
+            .order_by(ranked.c.user_id, ranked.c.rank)
+            .all()
+        )
+
+        posts_by_user = defaultdict(list)
+        for post in posts:
+            posts_by_user[post.user_id].append(post)
+        for user in users:
+            # Gán như dữ liệu đã nạp từ DB: không đánh dấu thay đổi, không lazy load lại
+            set_committed_value(user, "posts", posts_by_user[user.id])
 
     def count_users(self, name: Optional[str] = None, status: Optional[bool] = None) -> int:
-        query = self.db.query(func.count(User.id))
-        query = self._filter_by_name_and_status(query, name, status)
-        return query.scalar()
+        """Tổng số user theo bộ lọc, lấy từ user_count_cache nếu có."""
+        def count():
+            query = self.db.query(func.count(User.id))
+            return self._filter_by_name_and_status(query, name, status).scalar()
+
+        return user_count_cache.get_or_load((name, status), count)
@@ -0,0 +1,124 @@
+from typing import List, Optional
+
+from sqlalchemy import and_, case, delete, false, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.cores.config import USER_SEARCH_CANDIDATE_GRAMS
+from app.cores.user_search import (
+    WORD_START, normalize, query_patterns, search_text, trigram_frequencies, trigrams,
+)
+from app.models.user_name_trigrams import UserNameTrigram
+from app.models.users import User
+
+
+class UserSearchRepository:
+    """
+    Tìm user theo username/fullname bằng bảng user_name_trigrams thay cho ILIKE '%name%' (quét toàn bảng).
+    Chỉ các trigram hiếm nhất của truy vấn được dùng để lọc ứng viên (trigram phổ biến như "ngu" có
+    trong rất nhiều user); điều kiện LIKE trên users.search_name của các ứng viên kiểm tra đầy đủ truy vấn.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def index_user(self, user: User):
+        """
+        Cập nhật search_name và trigram của user trong transaction hiện tại (gọi trước khi commit).
+        Không ghi gì nếu username/fullname không đổi.
+        """
+        text = search_text(user.username, user.fullname)
+        if user.search_name == text:
+            return
+        user.search_name = text
+        if user.id is None:
+            self.db.flush()
+        self.db.execute(delete(UserNameTrigram).where(UserNameTrigram.user_id == user.id))
+        rows = [{"trigram": gram, "user_id": user.id} for gram in trigrams(text)]
+        if rows:
+            self.db.execute(insert(UserNameTrigram.__table__), rows)
+
+    def remove_user(self, user_id: int):
+        self.db.execute(delete(UserNameTrigram).where(UserNameTrigram.user_id == user_id))
+
+    def name_condition(self, name: str):
+        """Điều kiện WHERE: mọi từ của name xuất hiện trong username hoặc fullname (xem query_patterns)."""
+        patterns = query_patterns(name)
+        if not patterns:
+            return false()
+        frequencies = trigram_frequencies.get_many(
+            set().union(*(trigrams(pattern) for pattern in patterns)), self._count_trigrams
+        )
+        grams = sorted(frequencies, key=lambda gram: (frequencies[gram], gram))[:USER_SEARCH_CANDIDATE_GRAMS]
+        candidates = (
+            select(UserNameTrigram.user_id)
+            .where(UserNameTrigram.trigram.in_(grams))
+            .group_by(UserNameTrigram.user_id)
+            .having(func.count() == len(grams))
+        )
+        return and_(
+            User.id.in_(candidates),
+            *(User.search_name.contains(pattern, autoescape=True) for pattern in patterns),
+        )
+
+    def _count_trigrams(self, grams: list[str]) -> dict[str, int]:
+        rows = (
+            self.db.query(UserNameTrigram.trigram, func.count())
+            .filter(UserNameTrigram.trigram.in_(grams))
+            .group_by(UserNameTrigram.trigram)
+            .all()
+        )
+        return dict(rows)
+
+    def search(self, name: str, limit: int, offset: int = 0, status: Optional[bool] = None) -> List[User]:
+        """
+        User khớp name, xếp theo độ liên quan: trùng username, rồi mọi từ khớp đầu từ,
+        rồi khớp chuỗi con; cùng mức thì tên ngắn hơn (phần khớp chiếm nhiều hơn) đứng trước.
+        """
+        words = normalize(name)
+        if not words:
+            return []
+        relevance = case(
+            (func.lower(User.username) == name.strip().lower(), 0),
+            (and_(*(User.search_name.contains(WORD_START + word, autoescape=True) for word in words)), 1),
+            else_=2,
+        )
+        query = self.db.query(User).filter(self.name_condition(name))
+        if status is not None:
+            query = query.filter(User.status == status)
+        return (
+            query.order_by(relevance, func.length(User.search_name), User.id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    def index_missing(self, batch_size: int = 1000) -> int:
+        """Đánh chỉ mục các user chưa có search_name (tạo trước khi có chỉ mục), trả về số user."""
+        count = 0
+        after_id = 0
+        while True:
+            users = (
+                self.db.query(User.id, User.username, User.fullname)
+                .filter(User.search_name.is_(None), User.id > after_id)
+                .order_by(User.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not users:
+                return count
+            # User chưa có search_name thì cũng chưa có trigram: cả lô chỉ cần một UPDATE và một INSERT nhiều dòng
+            names = [{"id": user.id, "search_name": search_text(user.username, user.fullname)} for user in users]
+            rows = [{"trigram": gram, "user_id": name["id"]} for name in names for gram in trigrams(name["search_name"])]
+            self.db.execute(update(User), names)
+            if rows:
+                self.db.execute(insert(UserNameTrigram.__table__), rows)
+            self.db.commit()
+            count += len(users)
+            after_id = users[-1].id
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Xóa và dựng lại toàn bộ chỉ mục, trả về số user."""
+        self.db.execute(delete(UserNameTrigram))
+        self.db.query(User).update({User.search_name: None}, synchronize_session=False)
+        self.db.commit()
+        return self.index_missing(batch_size)
@@ -4,7 +4,7 @@ from pydantic import BaseModel
 
 class ActiveAccessTokenCreate(BaseModel):
     user_id : int
-    access_token: str
+    token_digest: str
     expires_at: datetime
 
 class ActiveAccessTokenRead(ActiveAccessTokenCreate):
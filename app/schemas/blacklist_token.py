@@ -2,11 +2,11 @@ from pydantic import BaseModel
 from datetime import datetime
 
 class BlacklistedTokenCreate(BaseModel):
-    token: str
+    token_digest: str
 
 class BlacklistedTokenRead(BaseModel):
     id: int
-    token: str
+    token_digest: str
     blacklisted_at: datetime
 
     class Config:
@@ -8,7 +8,9 @@ from app.schemas.users import UserWithPostsResponse, UserRead
 class PaginationSchema(BaseModel):
     total: int
     limit: int
-    offset: int
+    # None khi trang được lấy bằng cursor
+    offset: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class LinkSchema(BaseModel):
     self: HttpUrl
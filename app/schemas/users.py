@@ -1,6 +1,6 @@
 from typing import List
 
-from pydantic import BaseModel, EmailStr, constr, field_validator, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, constr, field_validator, ConfigDict
 from app.models.users import GenderEnum, RoleEnum
 from app.schemas.posts import PostResponse
 
@@ -92,6 +92,13 @@ class UserWithPostsResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserIdsRequest(BaseModel):
+    """
+    Schema dùng để nhận danh sách ID người dùng cho các thao tác hàng loạt của admin
+    """
+    user_ids: List[int] = Field(min_length=1, max_length=1000)
+
+
 class MessageResponse(BaseModel):
     """
     Schema dùng để trả về thông báo đơn giản
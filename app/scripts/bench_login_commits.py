@@ -0,0 +1,104 @@
+"""
+Đo số lần đăng nhập mỗi giây (phần ghi DB của /auth/login, không tính bcrypt) khi mỗi repository tự commit
+so với khi cả luồng chạy trong một UnitOfWork (một commit).
+
+- sqlite: file SQLite tạm (mỗi commit là một lần fsync).
+- server: cùng file SQLite nhưng mỗi commit chờ thêm --commit-latency-ms, mô phỏng round-trip + fsync
+  của một DB server (MySQL/PostgreSQL) qua mạng.
+
+Chạy: python -m app.scripts.bench_login_commits --logins 500 --commit-latency-ms 2
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import app.models.posts  # noqa: F401  (đăng ký bảng posts cho quan hệ của User)
+from app.api.auth import log_session, safe_log_token_action, save_access_token
+from app.cores import auth
+from app.cores.database import Base
+from app.cores.unit_of_work import UnitOfWork
+from app.models.users import User
+
+
+def fake_request() -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/v1/auth/login", "query_string": b"",
+        "headers": [(b"user-agent", b"bench")], "client": ("127.0.0.1", 1234),
+    })
+
+
+def login_once(db, username: str, request: Request, unit_of_work: bool):
+    user = db.query(User).filter(User.username == username).first()
+    claims = auth.user_claims(user.id, user.username, user.role, user.token_version)
+    access_token = auth.create_access_token(data=claims)
+    refresh_token = auth.create_refresh_token(data=claims)
+
+    if unit_of_work:
+        with UnitOfWork(db):
+            save_access_token(db, access_token, user.id)
+            safe_log_token_action(db, user, "login", request)
+            log_session(db, refresh_token, request, user)
+    else:
+        save_access_token(db, access_token, user.id)
+        safe_log_token_action(db, user, "login", request)
+        log_session(db, refresh_token, request, user)
+
+
+def run(session_factory, username: str, logins: int, unit_of_work: bool) -> float:
+    request = fake_request()
+    start = time.perf_counter()
+    for _ in range(logins):
+        db = session_factory()
+        try:
+            login_once(db, username, request, unit_of_work)
+        finally:
+            db.close()
+    return logins / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--commit-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_login_commits.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    db = session_factory()
+    db.add(User(username=username, email=f"{username}@example.com", password="x", fullname="Bench", gender="other"))
+    db.commit()
+    db.close()
+
+    commits = []
+    latency = {"seconds": 0.0}
+
+    @event.listens_for(engine, "commit")
+    def on_commit(conn):
+        commits.append(1)
+        if latency["seconds"]:
+            time.sleep(latency["seconds"])
+
+    print(f"{'database':<10}{'mode':<20}{'logins/s':>10}{'commits/login':>16}")
+    for database, seconds in (("sqlite", 0.0), ("server", args.commit_latency_ms / 1000)):
+        latency["seconds"] = seconds
+        for mode, unit_of_work in (("commit per repo", False), ("unit of work", True)):
+            commits.clear()
+            rate = run(session_factory, username, args.logins, unit_of_work)
+            print(f"{database:<10}{mode:<20}{rate:>10.0f}{len(commits) / args.logins:>16.1f}")
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Đo chi phí mỗi request của chồng 3 middleware: BaseHTTPMiddleware (cách cũ) so với ASGI thuần (cách mới).
+
+Các middleware trong benchmark chỉ chuyển tiếp request để tách riêng phần overhead của framework
+khỏi chi phí DB/JWT của AuthMiddleware và RateLimiterMiddleware thật.
+
+Chạy: python -m app.scripts.bench_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+
+class LegacyPassThrough(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+class AsgiPassThrough:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+
+
+async def homepage(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(middleware_class=None) -> Starlette:
+    middleware = [Middleware(middleware_class) for _ in range(3)] if middleware_class else []
+    return Starlette(routes=[Route("/", homepage)], middleware=middleware)
+
+
+async def run(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"authorization", b"Bearer bench")],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Khởi động (warm-up) để không tính chi phí lần gọi đầu
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = {
+        "no middleware": asyncio.run(run(build_app(), args.requests)),
+        "3 x BaseHTTPMiddleware": asyncio.run(run(build_app(LegacyPassThrough), args.requests)),
+        "3 x pure ASGI": asyncio.run(run(build_app(AsgiPassThrough), args.requests)),
+    }
+
+    baseline = results["no middleware"]
+    print(f"{'stack':<26}{'us/request':>12}{'overhead (us)':>16}")
+    for name, us in results.items():
+        print(f"{name:<26}{us:>12.2f}{us - baseline:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
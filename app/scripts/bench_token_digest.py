@@ -0,0 +1,94 @@
+"""
+So sánh kích thước index và độ trễ tra cứu giữa cột JWT gốc (String(500))
+và cột digest SHA-256 (String(64)) trên SQLite.
+
+Chạy: python -m app.scripts.bench_token_digest --rows 1000000 --lookups 20000
+"""
+import argparse
+import base64
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from app.cores.auth import token_digest
+
+JWT_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=").decode()
+
+
+def fake_jwt() -> str:
+    # Độ dài tương đương access token thật (sub, exp, jti)
+    payload = base64.urlsafe_b64encode(os.urandom(90)).rstrip(b"=").decode()
+    signature = base64.urlsafe_b64encode(os.urandom(32)).rstrip(b"=").decode()
+    return f"{JWT_HEADER}.{payload}.{signature}"
+
+
+def index_size(conn: sqlite3.Connection, index_name: str) -> int:
+    row = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (index_name,)).fetchone()
+    return row[0] or 0
+
+
+def time_lookups(conn: sqlite3.Connection, sql: str, keys: list) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        conn.execute(sql, (key,)).fetchone()
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_token_digest.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE raw_tokens (id INTEGER PRIMARY KEY, token VARCHAR(500) NOT NULL)")
+    conn.execute("CREATE TABLE digest_tokens (id INTEGER PRIMARY KEY, token_digest VARCHAR(64) NOT NULL)")
+
+    sample = []
+    inserted = 0
+    while inserted < args.rows:
+        size = min(args.batch, args.rows - inserted)
+        tokens = [fake_jwt() for _ in range(size)]
+        conn.executemany("INSERT INTO raw_tokens (token) VALUES (?)", ((t,) for t in tokens))
+        conn.executemany("INSERT INTO digest_tokens (token_digest) VALUES (?)", ((token_digest(t),) for t in tokens))
+        sample.extend(random.sample(tokens, min(len(tokens), args.lookups)))
+        inserted += size
+    conn.commit()
+
+    for name, sql in [
+        ("ix_raw_tokens_token", "CREATE INDEX ix_raw_tokens_token ON raw_tokens (token)"),
+        ("ix_digest_tokens_token_digest", "CREATE INDEX ix_digest_tokens_token_digest ON digest_tokens (token_digest)"),
+    ]:
+        start = time.perf_counter()
+        conn.execute(sql)
+        print(f"build {name}: {time.perf_counter() - start:.2f}s")
+    conn.commit()
+
+    keys = random.sample(sample, min(len(sample), args.lookups))
+    raw_us = time_lookups(conn, "SELECT id FROM raw_tokens WHERE token = ?", keys)
+    digest_keys = [token_digest(k) for k in keys]
+    digest_us = time_lookups(conn, "SELECT id FROM digest_tokens WHERE token_digest = ?", digest_keys)
+    hash_start = time.perf_counter()
+    for k in keys:
+        token_digest(k)
+    hash_us = (time.perf_counter() - hash_start) / len(keys) * 1e6
+
+    raw_size = index_size(conn, "ix_raw_tokens_token")
+    digest_size = index_size(conn, "ix_digest_tokens_token_digest")
+
+    print(f"rows: {args.rows:,}  lookups: {len(keys):,}")
+    print(f"{'column':<22}{'index size (MiB)':>18}{'lookup (us)':>14}")
+    print(f"{'token String(500)':<22}{raw_size / 2**20:>18.1f}{raw_us:>14.2f}")
+    print(f"{'token_digest (64)':<22}{digest_size / 2**20:>18.1f}{digest_us + hash_us:>14.2f}")
+    print(f"(digest lookup includes {hash_us:.2f}us SHA-256 per token)")
+
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+So sánh lọc user theo tên bằng ILIKE '%name%' (quét toàn bảng users) với chỉ mục trigram
+(UserSearchRepository.name_condition) trên một DB SQLite tạm với số user lớn.
+
+Với mỗi truy vấn đo: COUNT(*) (tổng của /admin/users-with-posts), một trang 10 user theo id
+và trang đầu của /admin/users/search (xếp theo độ liên quan).
+
+Chạy: python -m app.scripts.bench_user_search --users 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.cores.database import Base
+from app.models import active_access_tokens, posts, sessions  # noqa: F401 (đăng ký mọi model có quan hệ với User)
+from app.models.user_name_trigrams import UserNameTrigram
+from app.models.users import GenderEnum, User
+from app.repositories.user_search_repository import UserSearchRepository
+
+FAMILY = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô", "Dương", "Lý"]
+MIDDLE = ["Văn", "Thị", "Đức", "Minh", "Ngọc", "Thanh", "Quốc", "Hữu", "Gia", "Bảo"]
+GIVEN = ["An", "Anh", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hằng", "Hiếu", "Hoa", "Hùng", "Khánh", "Lan",
+         "Linh", "Long", "Mai", "Nam", "Nga", "Phúc", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Trung", "Tú", "Tuấn"]
+
+# (mô tả, chuỗi tìm): từ hiếm, họ phổ biến, tiền tố ngắn, chuỗi con giữa từ, nhiều từ, username gần như duy nhất
+QUERIES = [
+    ("rare substring", "4242"),
+    ("common family name", "Nguyễn"),
+    ("short prefix", "ng"),
+    ("mid-word substring", "uan"),
+    ("two words", "Thảo Lê"),
+    ("username", "user000777"),
+]
+
+
+def populate(session, count: int, batch: int):
+    random.seed(42)
+    inserted = 0
+    while inserted < count:
+        size = min(batch, count - inserted)
+        rows = []
+        for i in range(inserted, inserted + size):
+            fullname = f"{random.choice(FAMILY)} {random.choice(MIDDLE)} {random.choice(GIVEN)}"
+            rows.append({"username": f"user{i:06d}", "email": f"user{i:06d}@example.com", "password": "x",
+                         "fullname": fullname, "gender": GenderEnum.other, "status": True})
+        session.execute(insert(User), rows)
+        session.commit()
+        inserted += size
+
+
+def timed(run, repeat: int) -> tuple[float, object]:
+    result = run()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_user_search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[User.__table__, UserNameTrigram.__table__])
+    session = sessionmaker(bind=engine)()
+    repo = UserSearchRepository(session)
+
+    start = time.perf_counter()
+    populate(session, args.users, args.batch)
+    print(f"Inserted {args.users} users in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    repo.index_missing(args.batch)
+    trigram_rows = session.query(func.count()).select_from(UserNameTrigram).scalar()
+    print(f"Indexed in {time.perf_counter() - start:.1f}s ({trigram_rows} trigram rows, "
+          f"{trigram_rows / args.users:.1f} per user), DB size {os.path.getsize(path) / 2**20:.0f} MiB\n")
+
+    print(f"{'query':<20} {'q':<12} {'matches':>8} {'ilike count':>12} {'index count':>12} "
+          f"{'ilike page':>11} {'index page':>11} {'ranked':>8}  (ms)")
+    for label, q in QUERIES:
+        ilike = User.fullname.ilike(f"%{q}%") | User.username.ilike(f"%{q}%")
+        indexed = repo.name_condition(q)
+        ilike_count_ms, ilike_total = timed(
+            lambda: session.query(func.count(User.id)).filter(ilike).scalar(), args.repeat)
+        index_count_ms, index_total = timed(
+            lambda: session.query(func.count(User.id)).filter(indexed).scalar(), args.repeat)
+        ilike_page_ms, _ = timed(
+            lambda: session.query(User.id).filter(ilike).order_by(User.id).limit(10).all(), args.repeat)
+        index_page_ms, _ = timed(
+            lambda: session.query(User.id).filter(indexed).order_by(User.id).limit(10).all(), args.repeat)
+        ranked_ms, _ = timed(lambda: repo.search(q, 10), args.repeat)
+        # ILIKE phân biệt dấu nên số kết quả có thể ít hơn chỉ mục (bỏ dấu)
+        print(f"{label:<20} {q:<12} {index_total:>8} {ilike_count_ms:>12.1f} {index_count_ms:>12.1f} "
+              f"{ilike_page_ms:>11.1f} {index_page_ms:>11.1f} {ranked_ms:>8.1f}"
+              + ("" if ilike_total == index_total else f"  (ilike matches {ilike_total})"))
+
+    session.close()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Đo thời gian kiểm tra mật khẩu bcrypt trên máy hiện tại và chọn cost (BCRYPT_ROUNDS)
+lớn nhất mà thời gian verify vẫn không vượt quá mục tiêu.
+
+Chạy: python -m app.scripts.calibrate_bcrypt --target-ms 250
+"""
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+
+def measure_verify_ms(rounds: int, samples: int) -> float:
+    hashed = bcrypt.using(rounds=rounds).hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int) -> int:
+    chosen = MIN_ROUNDS
+    print(f"{'rounds':>6}{'verify (ms)':>14}")
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure_verify_ms(rounds, samples)
+        print(f"{rounds:>6}{elapsed:>14.1f}")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Thời gian verify mục tiêu (ms)")
+    parser.add_argument("--samples", type=int, default=3, help="Số lần đo cho mỗi cost")
+    args = parser.parse_args()
+
+    rounds = calibrate(args.target_ms, args.samples)
+    print(f"\nBCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Chạy EXPLAIN cho truy vấn nóng của từng repository và báo lỗi (exit code 1) nếu có truy vấn phải quét toàn bảng.
+Câu lệnh được bắt (before_cursor_execute) khi gọi chính các phương thức repository, trong transaction được rollback.
+
+- SQLite: EXPLAIN QUERY PLAN, dòng "SCAN <bảng>" là quét toàn bảng (SEARCH ... USING INDEX là dùng index).
+- MySQL: EXPLAIN, cột type = ALL là quét toàn bảng. Nên chạy trên DB có dữ liệu thật,
+  với bảng gần như rỗng optimizer có thể chọn quét bảng dù có index.
+
+Chạy: python -m app.scripts.explain_hot_queries [--database-url sqlite:///...]
+Không truyền --database-url thì kiểm tra trên một DB SQLite tạm tạo từ các model.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.cores.config import POST_SEARCH_BACKEND
+from app.cores.count_cache import user_count_cache
+from app.cores.database import Base
+from app.cores.post_search import Fts5PostIndex, create_post_search_index
+from app.cores.telemetry_storage import telemetry_storage
+from app.cores.token_versions import token_versions
+from app.cores.user_cache import user_cache
+from app.cores.user_search import trigram_frequencies
+from app.models.posts import Post
+from app.models.users import GenderEnum, User
+from app.repositories.active_access_token_repository import ActiveAccessTokenRepository
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+from app.repositories.post_repository import PostRepository
+from app.repositories.rate_limiter_repository import RateLimiterRepository
+from app.repositories.session_repository import SessionRepository
+from app.repositories.token_log_repository import TokenLogRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.user_search_repository import UserSearchRepository
+
+# Cache trong process mà các repository đi qua: xóa trước và sau mỗi lần gọi để phương thức thật sự truy vấn DB
+CACHES = (user_cache, token_versions, user_count_cache, trigram_frequencies)
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE")
+# Đọc catalog để liệt kê bucket telemetry: chỉ chạy khi làm mới danh sách bucket, không phải mỗi request
+CATALOG = ("sqlite_master", "information_schema")
+
+
+def hot_queries(engine):
+    """
+    Trả về ([(tên, hàm nhận Session)], chỉ mục tìm kiếm post); mỗi hàm gọi đúng phương thức repository mà
+    request/maintenance dùng. Câu lệnh được bắt lúc chạy nên EXPLAIN luôn khớp với SQL thật
+    (kể cả bucket telemetry, keyset, FTS5).
+    """
+    now = datetime.now(timezone.utc)
+    digest = "0" * 64
+    queries = [
+        ("UserRepository.get_user_by_username", lambda db: UserRepository(db).get_user_by_username("nguyen")),
+        ("UserRepository.get_summary_by_username", lambda db: UserRepository(db).get_summary_by_username("nguyen")),
+        ("UserRepository.get_token_version", lambda db: UserRepository(db).get_token_version(1)),
+        ("UserRepository.get_users_with_posts (keyset, selectinload posts)",
+         lambda db: UserRepository(db).get_users_with_posts(limit=10, after_id=0)),
+        ("UserRepository.get_users_with_posts (posts_limit, row_number)",
+         lambda db: UserRepository(db).get_users_with_posts(limit=10, after_id=0, posts_limit=3)),
+        ("UserRepository.get_users_with_posts (name, status)",
+         lambda db: UserRepository(db).get_users_with_posts(limit=10, after_id=0, name="nguyen", status=True)),
+        ("UserRepository.count_users", lambda db: UserRepository(db).count_users(name="nguyen", status=True)),
+        ("UserSearchRepository.search", lambda db: UserSearchRepository(db).search("nguyen", limit=10)),
+        ("TokenLogRepository.get_last_log",
+         lambda db: TokenLogRepository(db).get_last_log(1, "login", since=now - timedelta(minutes=10))),
+        ("BlacklistedTokenRepository.is_blacklisted", lambda db: BlacklistedTokenRepository(db).is_blacklisted(digest)),
+        ("SessionRepository.get_by_refresh_token", lambda db: SessionRepository(db).get_by_refresh_token("token")),
+        ("SessionRepository.revoke_sessions_by_user_ids",
+         lambda db: SessionRepository(db).revoke_sessions_by_user_ids([1, 2])),
+        ("SessionRepository.delete_expired_sessions", lambda db: SessionRepository(db).delete_expired_sessions()),
+        ("ActiveAccessTokenRepository.get_digests_by_user_ids",
+         lambda db: ActiveAccessTokenRepository(db).get_digests_by_user_ids([1, 2])),
+        ("ActiveAccessTokenRepository.delete_token", lambda db: ActiveAccessTokenRepository(db).delete_token(digest)),
+        ("ActiveAccessTokenRepository.delete_expired_tokens",
+         lambda db: ActiveAccessTokenRepository(db).delete_expired_tokens()),
+        ("RateLimiterRepository.count_token_usage",
+         lambda db: RateLimiterRepository(db).count_token_usage(digest, now - timedelta(seconds=60))),
+        ("RateLimiterRepository.get_usage_times",
+         lambda db: RateLimiterRepository(db).get_usage_times({digest}, now - timedelta(seconds=60))),
+        ("PostRepository.get_post_by_id", lambda db: PostRepository(db).get_post_by_id(1)),
+        ("PostRepository.get_posts_by_user_id", lambda db: PostRepository(db).get_posts_by_user_id(1)),
+        ("PostRepository.get_posts_page (user)", lambda db: PostRepository(db).get_posts_page(50, after_id=0, user_id=1)),
+        ("PostRepository.get_posts_page (global)", lambda db: PostRepository(db).get_posts_page(50, after_id=0)),
+        ("PostRepository.get_posts_page (active users)",
+         lambda db: PostRepository(db).get_posts_page(50, after_id=0, active_users_only=True)),
+        ("PostRepository.get_active_posts_by_ids", lambda db: PostRepository(db).get_active_posts_by_ids([1, 2])),
+    ]
+
+    if not telemetry_storage.bucketed:
+        # Chế độ bucketed: retention là DROP TABLE các bucket cũ (ngoài transaction), không có truy vấn để EXPLAIN
+        queries += [
+            ("BlacklistedTokenRepository.delete_expired_tokens",
+             lambda db: BlacklistedTokenRepository(db).delete_expired_tokens(now)),
+            ("RateLimiterRepository.delete_expired_tokens",
+             lambda db: RateLimiterRepository(db).delete_expired_tokens(now)),
+        ]
+
+    index = create_post_search_index(POST_SEARCH_BACKEND, engine)
+    if isinstance(index, Fts5PostIndex):
+        # Backend memory không chạy SQL nên không có gì để EXPLAIN
+        queries.append(("Fts5PostIndex.search", lambda db: index.search(db, "token", 10, after=(1.0, 1))))
+    return queries, index
+
+
+def seed_sample_rows(db: Session):
+    """DB rỗng (DB tạm): thêm một user có post để các truy vấn nạp posts (selectin, row_number) thật sự chạy."""
+    if db.query(User.id).first() is not None:
+        return
+    user = User(username="nguyen", email="nguyen@example.com", password="x", fullname="Nguyen Van A",
+                gender=GenderEnum.other)
+    db.add(user)
+    UserSearchRepository(db).index_user(user)
+    db.add(Post(title="token", content="refresh token", user_id=user.id))
+    db.flush()
+
+
+def capture(connection, db: Session, call) -> list:
+    """Gọi call(db) và trả về [(câu lệnh, tham số)] của các SELECT/UPDATE/DELETE đã chạy trên connection."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(EXPLAINED):
+            return
+        if not any(catalog in statement.lower() for catalog in CATALOG):
+            statements.append((statement, parameters))
+
+    for cache in CACHES:
+        cache.clear()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        call(db)
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+        for cache in CACHES:
+            cache.clear()
+    return statements
+
+
+def full_scans(connection, statement: str, parameters) -> tuple[list, list]:
+    """Trả về (các dòng kế hoạch, các dòng là quét toàn bảng)."""
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plan = [row[-1] for row in rows]
+        # Subquery (vd. row_number() của _load_latest_posts) được dựng thành co-routine/bảng tạm: quét chúng không phải quét bảng
+        derived = {detail.split(" ", 1)[1] for detail in plan if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+        return plan, [detail for detail in plan if is_sqlite_full_scan(detail, derived)]
+
+    if dialect == "mysql":
+        result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        rows = [dict(zip(result.keys(), row)) for row in result]
+        plan = [f"{row['table']}: type={row['type']} key={row['key']}" for row in rows]
+        return plan, [line for line, row in zip(plan, rows) if row["type"] == "ALL"]
+
+    raise SystemExit(f"Unsupported dialect for EXPLAIN check: {dialect}")
+
+
+def is_sqlite_full_scan(detail: str, derived: set) -> bool:
+    if not detail.startswith("SCAN ") or "CONSTANT ROW" in detail:
+        return False
+    if detail[len("SCAN "):].split(" ", 1)[0] in derived:
+        return False
+    # Bảng ảo FTS5: "VIRTUAL TABLE INDEX 0:M..." là tra theo MATCH, "INDEX 0:" trống là đọc toàn bộ
+    if " VIRTUAL TABLE INDEX " in detail:
+        return detail.rstrip().endswith(":")
+    return True
+
+
+def check(engine) -> list:
+    """
+    Chạy từng truy vấn nóng trong một transaction được rollback (không ghi gì vào DB), EXPLAIN các câu lệnh
+    đã chạy và in kế hoạch. Trả về danh sách (tên truy vấn, các dòng quét toàn bảng hoặc lỗi).
+    """
+    failures = []
+    queries, index = hot_queries(engine)
+    # Chế độ bucketed: get_last_log/delete_expired_tokens đi qua các bảng bucket như khi chạy thật
+    telemetry_storage.ensure_buckets(engine)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        db = Session(bind=connection, join_transaction_mode="rollback_only")
+        try:
+            seed_sample_rows(db)
+            if isinstance(index, Fts5PostIndex):
+                index.load(db, [])
+            for name, call in queries:
+                statements = capture(connection, db, call)
+                if not statements:
+                    print(f"[NO QUERY] {name}")
+                    failures.append((name, ["no statement executed"]))
+                    continue
+                scans = []
+                plan = []
+                for statement, parameters in statements:
+                    lines, statement_scans = full_scans(connection, statement, parameters)
+                    plan.extend(lines)
+                    scans.extend(statement_scans)
+                status = "FULL SCAN" if scans else "ok"
+                print(f"[{status}] {name}")
+                for line in plan:
+                    print(f"    {line}")
+                if scans:
+                    failures.append((name, scans))
+        finally:
+            db.close()
+            transaction.rollback()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="DB cần kiểm tra (mặc định: SQLite tạm tạo từ model)")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "explain_hot_queries.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+
+    failures = check(engine)
+    engine.dispose()
+
+    if failures:
+        print(f"\n{len(failures)} hot queries do a full table scan: {', '.join(name for name, _ in failures)}")
+        sys.exit(1)
+    print("\nAll hot queries use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Chuyển các bảng token đang lưu JWT gốc sang cột digest SHA-256 (String(64)).
+
+Mỗi bảng cũ được đổi tên thành <table>_legacy, bảng mới được tạo từ model hiện tại,
+dữ liệu được chép theo lô (tính digest trong Python vì SQLite không có SHA-256),
+sau đó bảng cũ bị xóa. Bảng đã có cột digest sẽ được bỏ qua nên có thể chạy lại an toàn.
+
+Revision 0001 (alembic upgrade head) gọi migrate_table cho mọi bảng nên DB cũ không cần chạy script này;
+chỉ dùng khi chưa áp dụng Alembic: python -m app.scripts.migrate_token_digests
+"""
+from typing import Optional
+
+from sqlalchemy import String, inspect, select, table, column, text
+
+from app.cores.auth import token_digest
+from app.cores.database import engine
+from app.models import posts, sessions, users  # noqa: F401 - đăng ký các bảng được tham chiếu bởi khóa ngoại
+from app.models.active_access_tokens import ActiveAccessToken
+from app.models.blacklisted_tokens import BlacklistedToken
+from app.models.token_usage_log import TokenUsageLog
+
+BATCH_SIZE = 5000
+
+# model -> (cột JWT cũ, các cột khác được giữ nguyên, digest có unique không)
+MIGRATIONS = [
+    (BlacklistedToken, "token", ["id", "blacklisted_at"], False),
+    (TokenUsageLog, "token", ["id", "requested_at"], False),
+    (ActiveAccessToken, "access_token", ["id", "user_id", "created_at", "expires_at"], True),
+]
+
+
+def migrate_table(conn, model, old_column: str, keep_columns: list[str], unique: bool) -> Optional[int]:
+    """Trả về số dòng đã chuyển, hoặc None nếu bảng chưa tồn tại hay đã có cột digest."""
+    name = model.__tablename__
+    inspector = inspect(conn)
+    if not inspector.has_table(name):
+        return None
+    if "token_digest" in [c["name"] for c in inspector.get_columns(name)]:
+        return None
+
+    legacy_name = f"{name}_legacy"
+    # Tên index phải được giải phóng trước khi tạo bảng mới
+    for index in inspector.get_indexes(name):
+        conn.execute(text(f"DROP INDEX {index['name']}" + (f" ON {name}" if conn.dialect.name == "mysql" else "")))
+    conn.execute(text(f"ALTER TABLE {name} RENAME TO {legacy_name}"))
+    model.__table__.create(conn)
+
+    # Dùng kiểu của model để các dialect như SQLite trả về datetime thay vì chuỗi
+    legacy = table(
+        legacy_name,
+        *[column(c, model.__table__.c[c].type) for c in keep_columns],
+        column(old_column, String()),
+    )
+
+    seen = set()
+    migrated = 0
+    last_id = 0
+    while True:
+        # Phân trang theo id thay vì giữ cursor mở trong lúc insert
+        rows = conn.execute(
+            select(legacy).where(legacy.c.id > last_id).order_by(legacy.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        batch = []
+        for row in rows:
+            values = dict(row._mapping)
+            digest = token_digest(values.pop(old_column))
+            if unique:
+                if digest in seen:
+                    continue
+                seen.add(digest)
+            batch.append({**values, "token_digest": digest})
+        if batch:
+            conn.execute(model.__table__.insert(), batch)
+            migrated += len(batch)
+
+    conn.execute(text(f"DROP TABLE {legacy_name}"))
+    return migrated
+
+
+def main():
+    with engine.begin() as conn:
+        for model, old_column, keep_columns, unique in MIGRATIONS:
+            migrated = migrate_table(conn, model, old_column, keep_columns, unique)
+            name = model.__tablename__
+            print(f"{name}: nothing to migrate" if migrated is None else f"{name}: migrated {migrated} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Dựng lại chỉ mục tìm kiếm bài viết (/posts/search) từ bảng posts.
+
+- fts5: xóa và ghi lại bảng ảo posts_fts trong DB SQLite (tạo bảng nếu chưa có).
+- memory: chỉ mục nằm trong bộ nhớ của từng process và được nạp lại mỗi khi app khởi động,
+  lệnh này chỉ kiểm tra việc dựng chỉ mục và in số bài.
+
+Chạy: python -m app.scripts.rebuild_post_search_index
+"""
+import argparse
+import time
+
+from app.cores.database import SessionLocal
+from app.cores.post_search import get_post_search_index
+from app.models import active_access_tokens, posts, sessions, users  # noqa: F401 (đăng ký mọi model có quan hệ với User)
+from app.services.post_service import PostService
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        count = PostService(db).rebuild_search_index()
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"Indexed {count} posts with backend={get_post_search_index().backend} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Dựng lại chỉ mục tìm kiếm user (users.search_name và bảng user_name_trigrams) từ bảng users.
+Dùng sau khi đổi cách chuẩn hóa tên (app.cores.user_search) hoặc khi nghi chỉ mục bị lệch.
+Khi khởi động app chỉ bổ sung chỉ mục cho các user chưa có search_name.
+
+Chạy: python -m app.scripts.rebuild_user_search_index
+"""
+import argparse
+import time
+
+from app.cores.database import SessionLocal
+from app.models import active_access_tokens, posts, sessions, users  # noqa: F401 (đăng ký mọi model có quan hệ với User)
+from app.repositories.user_search_repository import UserSearchRepository
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        count = UserSearchRepository(db).rebuild()
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"Indexed {count} users in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from typing import List
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from app.cores.auth import token_digest
 from app.models.active_access_tokens import ActiveAccessToken
 from app.repositories.active_access_token_repository import ActiveAccessTokenRepository
 from app.schemas.active_access_tokens import ActiveAccessTokenCreate
@@ -20,14 +21,12 @@ class ActiveAccessTokenService:
         return self.repo.get_access_tokens_by_user_id(user_id)
 
     def delete_token(self, token: str) -> MessageResponse:
+        """Token không còn trong bảng (đã bị dọn khi hết hạn, logout-all...) thì không có gì để xóa, không phải lỗi."""
         try:
-            deleted = self.repo.delete_token(token)
-            if deleted:
-                return MessageResponse(detail="Token deleted successfully")
-            else:
-                raise HTTPException(status_code=404, detail="Token not found")
-        except Exception as e:
+            deleted = self.repo.delete_token(token_digest(token))
+        except Exception:
             raise HTTPException(status_code=400, detail="Deletion failed")
+        return MessageResponse(detail="Token deleted successfully" if deleted else "Token not found")
 
     def delete_tokens_by_user_id(self, user_id: int) -> MessageResponse:
         try:
@@ -39,5 +38,5 @@ class ActiveAccessTokenService:
         except Exception as e:
             raise HTTPException(status_code=400, detail="Deletion failed")
 
-    def cleanup_expired_tokens(self):
-        self.repo.delete_expired_tokens()
\ No newline at end of file
+    def cleanup_expired_tokens(self) -> int:
+        return self.repo.delete_expired_tokens()
\ No newline at end of file
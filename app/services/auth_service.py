@@ -1,5 +1,16 @@
+from datetime import datetime, timezone
+from typing import List
+
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from app.cores.blacklist_index import blacklist_index
+from app.cores.response_cache import USERS_LIST, invalidate_after_commit
+from app.cores.token_cache import token_cache
+from app.cores.unit_of_work import UnitOfWork, after_commit
+from app.repositories.active_access_token_repository import ActiveAccessTokenRepository
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+from app.repositories.session_repository import SessionRepository
 from app.repositories.user_repository import UserRepository
 from app.schemas.users import UserCreate, UserRead
 from app.models.users import User
@@ -7,9 +18,16 @@ from app.cores import auth
 
 class AuthService:
     def __init__(self, db: Session):
+        self.db = db
         self.repo = UserRepository(db)
 
-    def register_user(self, user_data: UserCreate) -> UserRead:
+    async def register_user(self, user_data: UserCreate) -> UserRead:
+        """Truy vấn DB chạy trên thread pool, bcrypt chạy trên hash_pool và được chờ trên event loop."""
+        await run_in_threadpool(self.check_user_available, user_data)
+        hashed_password = await auth.get_password_hash(user_data.password)
+        return await run_in_threadpool(self.create_user, user_data, hashed_password)
+
+    def check_user_available(self, user_data: UserCreate):
         # Kiểm tra username đã tồn tại
         if self.repo.get_user_by_username(user_data.username):
             raise HTTPException(
@@ -24,8 +42,7 @@ class AuthService:
                 detail="Email already exists"
             )
 
-        # Băm mật khẩu và tạo user mới
-        hashed_password = auth.get_password_hash(user_data.password)
+    def create_user(self, user_data: UserCreate, hashed_password: str) -> UserRead:
         new_user = User(
             username=user_data.username,
             password=hashed_password,
@@ -34,4 +51,34 @@ class AuthService:
             gender=user_data.gender
         )
 
-        return self.repo.create_user(new_user)
+        created = self.repo.create_user(new_user)
+        invalidate_after_commit(self.db, USERS_LIST)
+        return created
+
+    def logout_all(self, user_ids: List[int]) -> int:
+        """
+        Đăng xuất các user khỏi mọi thiết bị trong một transaction:
+        blacklist toàn bộ access token đang hoạt động (INSERT ... SELECT), thu hồi mọi session (một UPDATE),
+        xóa access token (một DELETE) và tăng token_version. Trả về số access token bị thu hồi.
+        """
+        user_ids = list(set(user_ids))
+        blacklisted_at = datetime.now(timezone.utc)
+        token_repo = ActiveAccessTokenRepository(self.db)
+
+        with UnitOfWork(self.db):
+            BlacklistedTokenRepository(self.db).add_from_active_tokens(user_ids, blacklisted_at)
+            # Đọc sau INSERT ... SELECT, trong cùng transaction, để index khớp với các dòng vừa ghi
+            digests = token_repo.get_digests_by_user_ids(user_ids)
+            SessionRepository(self.db).revoke_sessions_by_user_ids(user_ids)
+            token_repo.delete_tokens_by_user_ids(user_ids)
+            self.repo.bump_token_versions(user_ids)
+
+            def publish():
+                for digest in digests:
+                    blacklist_index.add(digest, blacklisted_at)
+                for user_id in user_ids:
+                    token_cache.invalidate_user(user_id)
+
+            after_commit(self.db, publish)
+
+        return len(digests)
@@ -2,6 +2,10 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.orm import Session
 
+from app.cores.auth import token_digest
+from app.cores.blacklist_index import blacklist_index
+from app.cores.token_cache import token_cache
+from app.cores.unit_of_work import after_commit
 from app.schemas.blacklist_token import BlacklistedTokenCreate
 from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
 
@@ -11,14 +15,44 @@ class BlacklistTokenService:
         self.repo = BlacklistedTokenRepository(db)
 
     def blacklist_token(self, token: str):
-        token_data = BlacklistedTokenCreate(token=token)
-        return self.repo.add(token_data)
+        return self.blacklist_digest(token_digest(token))
 
-    def is_token_blacklisted(self, token: str) -> bool:
-        return self.repo.is_blacklisted(token)
+    def blacklist_digest(self, digest: str):
+        token_data = BlacklistedTokenCreate(token_digest=digest)
+        blacklisted = self.repo.add(token_data)
+        blacklisted_at = blacklisted.blacklisted_at
+
+        def publish():
+            blacklist_index.add(digest, blacklisted_at)
+            token_cache.invalidate_digest(digest)
 
-    def cleanup_expired_tokens(self, expire_minutes):
+        after_commit(self.repo.db, publish)
+        return blacklisted
+
+    def is_token_blacklisted(self, token: str) -> bool:
+        digest = token_digest(token)
+        if not blacklist_index.loaded:
+            return self.repo.is_blacklisted(digest)
+
+        if not blacklist_index.might_contain(digest):
+            return False
+        if blacklist_index.contains(digest):
+            return True
+
+        # Bloom filter báo trúng nhưng không có trong index: hỏi lại DB
+        revoked = self.repo.is_blacklisted(digest)
+        blacklist_index.record_db_fallback(revoked)
+        if revoked:
+            blacklist_index.add(digest)
+        return revoked
+
+    def load_index(self):
+        blacklist_index.reload(self.repo.get_all_digests)
+
+    def cleanup_expired_tokens(self, expire_minutes) -> int:
         expire_time = datetime.now(timezone.utc) - timedelta(minutes=expire_minutes)
         # Xóa tất cả token blacklist có blacklisted_at < expire_time
-        self.repo.delete_expired_tokens(expire_time)
+        deleted = self.repo.delete_expired_tokens(expire_time)
+        blacklist_index.prune(expire_time)
+        return deleted
 
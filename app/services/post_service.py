@@ -1,11 +1,16 @@
 # app/services/post_service.py
-from typing import List
+from typing import List, Optional
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from app.cores.pagination import Page, decode_cursor, encode_cursor, page_from_rows
+from app.cores.post_search import get_post_search_index
+from app.cores.response_cache import POSTS_LIST, invalidate_after_commit, post_tag
+from app.cores.unit_of_work import UnitOfWork
+from app.cores.user_cache import UserSummary
 from app.repositories.post_repository import PostRepository
+from app.repositories.user_repository import UserRepository
 from app.schemas.posts import PostCreate, PostUpdate, MessageResponse
 from app.models.posts import Post
-from app.models.users import User
 
 class PostService:
     def __init__(self, db: Session):
@@ -13,14 +18,16 @@ class PostService:
         Khởi tạo PostService với một phiên làm việc database.
         Tạo một instance PostRepository để tương tác với DB.
         """
+        self.db = db
         self.repository = PostRepository(db)
+        self.users = UserRepository(db)
 
-    def _get_user_and_check_status(self, user_id: int) -> User:
+    def _get_user_and_check_status(self, user_id: int) -> UserSummary:
         """
-        Lấy user theo user_id và kiểm tra trạng thái hoạt động.
+        Lấy user theo user_id (qua user_cache) và kiểm tra trạng thái hoạt động.
         Nếu không tìm thấy hoặc user bị block, raise HTTPException.
         """
-        user = self.repository.get_user_by_id(user_id)
+        user = self.users.get_summary_by_id(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         if not user.status:
@@ -35,7 +42,12 @@ class PostService:
         self._get_user_and_check_status(user_id)
 
         new_post = Post(**post_data.dict(), user_id=user_id)
-        return self.repository.create_post(new_post)
+        # Bài post và chỉ mục tìm kiếm được ghi trong cùng một transaction
+        with UnitOfWork(self.db):
+            self.repository.create_post(new_post)
+            get_post_search_index().index_post(self.db, new_post.id, new_post.title, new_post.content)
+            invalidate_after_commit(self.db, POSTS_LIST)
+        return new_post
 
     def get_posts_by_user_id(self, user_id: int) -> List[Post]:
         """
@@ -45,6 +57,69 @@ class PostService:
         self._get_user_and_check_status(user_id)
         return self.repository.get_posts_by_user_id(user_id)
 
+    def get_posts_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        offset: Optional[int] = None,
+        user_id: Optional[int] = None,
+        active_users_only: bool = False,
+        title: Optional[str] = None,
+    ) -> Page:
+        """
+        Lấy một trang bài post (keyset theo id). Có user_id thì kiểm tra trạng thái user trước.
+        cursor và offset không dùng cùng lúc; cursor hỏng trả về 400.
+        """
+        if cursor is not None and offset:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+        after_id = None
+        if cursor is not None:
+            after_id = decode_cursor(cursor, "id")["id"]
+            if not isinstance(after_id, int):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        if user_id is not None:
+            self._get_user_and_check_status(user_id)
+
+        rows = self.repository.get_posts_page(
+            limit, after_id=after_id, offset=offset, user_id=user_id,
+            active_users_only=active_users_only, title=title,
+        )
+        return page_from_rows(rows, limit, lambda post: encode_cursor(id=post.id))
+
+    def search_posts(self, query: str, limit: int, cursor: Optional[str] = None) -> Page:
+        """
+        Tìm bài post theo full-text, xếp theo độ liên quan (score giảm dần, rồi id).
+        Bài của user bị block bị bỏ qua; khi đó lấy thêm kết quả từ chỉ mục cho đủ limit + 1.
+        """
+        after = None
+        if cursor is not None:
+            position = decode_cursor(cursor, "score", "id")
+            if not isinstance(position["score"], (int, float)) or not isinstance(position["id"], int):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            after = (position["score"], position["id"])
+
+        hits = []
+        while len(hits) <= limit:
+            batch = get_post_search_index().search(self.db, query, limit + 1, after)
+            posts = self.repository.get_active_posts_by_ids([post_id for post_id, _ in batch])
+            hits.extend((posts[post_id], score) for post_id, score in batch if post_id in posts)
+            if len(batch) <= limit:
+                break
+            post_id, score = batch[-1]
+            after = (score, post_id)
+
+        page = page_from_rows(hits, limit, lambda hit: encode_cursor(score=hit[1], id=hit[0].id))
+        return Page(items=[post for post, _ in page.items], next_cursor=page.next_cursor)
+
+    def rebuild_search_index(self) -> int:
+        """
+        Dựng lại chỉ mục tìm kiếm từ bảng posts, trả về số bài đã đánh chỉ mục.
+        """
+        return get_post_search_index().rebuild(self.db, self.repository.iter_posts_for_index())
+
+    def load_search_index(self):
+        get_post_search_index().load(self.db, self.repository.iter_posts_for_index())
+
     def get_post_by_id(self, post_id: int) -> Post:
         """
         Lấy bài post theo post_id.
@@ -86,8 +161,11 @@ class PostService:
         post.title = post_update.title
         post.content = post_update.content
 
-        # Gọi repository commit và refresh
-        self.repository.update_post(post)
+        # Gọi repository commit, cập nhật chỉ mục tìm kiếm trong cùng transaction
+        with UnitOfWork(self.db):
+            self.repository.update_post(post)
+            get_post_search_index().index_post(self.db, post.id, post.title, post.content)
+            invalidate_after_commit(self.db, POSTS_LIST, post_tag(post.id))
 
         return MessageResponse(detail="Post updated")
 
@@ -104,6 +182,9 @@ class PostService:
         if post.user_id != user_id:
             raise HTTPException(status_code=403, detail="Forbidden")
 
-        self.repository.delete_post(post)
+        with UnitOfWork(self.db):
+            self.repository.delete_post(post)
+            get_post_search_index().remove_post(self.db, post_id)
+            invalidate_after_commit(self.db, POSTS_LIST, post_tag(post_id))
 
         return MessageResponse(detail="Post deleted")
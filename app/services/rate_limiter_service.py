@@ -2,6 +2,10 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.orm import Session
 
+from app.cores.auth import token_digest
+from app.cores.blacklist_index import blacklist_index
+from app.cores.token_cache import token_cache
+from app.cores.unit_of_work import after_commit
 from app.repositories.rate_limiter_repository import RateLimiterRepository
 
 
@@ -13,14 +17,29 @@ class RateLimiterService:
         now = datetime.now(timezone.utc)
         period_start = now - timedelta(seconds=period_seconds)
 
-        count = self.repo.count_token_usage(token, period_start)
-        self.repo.log_token_usage(token, now)
+        digest = token_digest(token)
+        count = self.repo.count_token_usage(digest, period_start)
+        self.repo.log_token_usage(digest, now)
 
         return count >= max_requests
 
+    def get_usage_times(self, digests: set[str], since: datetime) -> dict[str, list[datetime]]:
+        return self.repo.get_usage_times(digests, since)
+
+    def log_token_usage_batch(self, events: list[tuple[str, datetime]]):
+        rows = [{"token_digest": digest, "requested_at": requested_at} for digest, requested_at in events]
+        self.repo.bulk_log_token_usage(rows)
+
     def blacklist_token(self, token: str):
-        self.repo.blacklist_token(token)
+        digest = token_digest(token)
+        self.repo.blacklist_token(digest)
+
+        def publish():
+            blacklist_index.add(digest)
+            token_cache.invalidate_digest(digest)
+
+        after_commit(self.repo.db, publish)
 
-    def cleanup_expired_tokens(self, expire_minutes: int):
+    def cleanup_expired_tokens(self, expire_minutes: int) -> int:
         expire_time = datetime.now(timezone.utc) - timedelta(minutes=expire_minutes)
-        self.repo.delete_expired_tokens(expire_time)
\ No newline at end of file
+        return self.repo.delete_expired_tokens(expire_time)
\ No newline at end of file
@@ -37,5 +37,5 @@ class SessionService:
     def revoke_all_sessions(self, user_id: int):
         self.repo.revoke_all_sessions(user_id)
 
-    def cleanup_expired_sessions(self):
-        self.repo.delete_expired_sessions()
\ No newline at end of file
+    def cleanup_expired_sessions(self) -> int:
+        return self.repo.delete_expired_sessions()
\ No newline at end of file
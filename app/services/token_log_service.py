@@ -1,9 +1,10 @@
-from datetime import datetime, timedelta
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
-from app.cores.config import SUSPICIOUS_LOGIN_TIME_WINDOW, SUSPICIOUS_REFRESH_TIME_WINDOW
+from app.cores.activity_detector import LastSeen, activity_detector
+from app.cores.unit_of_work import after_commit
 from app.schemas.token_log import TokenLogCreate, TokenLogResponse
 from app.repositories.token_log_repository import TokenLogRepository
 
@@ -12,30 +13,28 @@ class TokenLogService:
         self.repo = TokenLogRepository(db)
 
     def log_token_request(self, log_create: TokenLogCreate):
-        return self.repo.create(log_create)
+        log = self.repo.create(log_create)
+        if log_create.user_id is not None:
+            after_commit(self.repo.db, lambda: activity_detector.record(
+                log_create.user_id, log_create.action, log_create.ip_address, log_create.user_agent
+            ))
+        return log
+
+    def cleanup_expired_logs(self, retention_days: int) -> int:
+        return self.repo.delete_expired_logs(datetime.now(timezone.utc) - timedelta(days=retention_days))
 
     def get_paginated (self, skip: int = 0, limit: int = 200) -> List[TokenLogResponse]:
         return self.repo.get_paginated(skip, limit)
 
     def is_suspicious(self, user_id: int, current_ip: str, current_agent: str, action: str) -> bool:
-        last_log = self.repo.get_last_log(user_id, action)
+        return activity_detector.is_suspicious(
+            user_id, action, current_ip, current_agent, lambda: self._load_last_seen(user_id, action)
+        )
+
+    def _load_last_seen(self, user_id: int, action: str) -> Optional[LastSeen]:
+        lookback = activity_detector.lookback(action)
+        since = activity_detector.clock() - lookback if lookback is not None else None
+        last_log = self.repo.get_last_log(user_id, action, since)
         if not last_log:
-            return False
-
-        ip_changed = last_log.ip_address != current_ip
-        agent_changed = last_log.user_agent != current_agent
-        time_diff = datetime.utcnow() - last_log.timestamp
-
-        if action == "login":
-            return self._is_login_suspicious(ip_changed, agent_changed, time_diff)
-        elif action == "refresh":
-            return self._is_refresh_suspicious(time_diff)
-        return False
-
-    def _is_login_suspicious(self, ip_changed: bool, agent_changed: bool, time_diff: timedelta) -> bool:
-        if (ip_changed or agent_changed) and time_diff < SUSPICIOUS_LOGIN_TIME_WINDOW:
-            return True
-        return False
-
-    def _is_refresh_suspicious(self, time_diff: timedelta) -> bool:
-        return time_diff < SUSPICIOUS_REFRESH_TIME_WINDOW
+            return None
+        return LastSeen(last_log.ip_address, last_log.user_agent, last_log.timestamp.replace(tzinfo=None))
@@ -1,18 +1,33 @@
 from typing import Optional
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from app.cores import auth
+from app.cores.response_cache import USERS_LIST, USER_STATUS, invalidate_after_commit, user_tag
+from app.cores.pagination import decode_cursor, encode_cursor, page_from_rows
+from app.cores.token_cache import token_cache
+from app.cores.unit_of_work import UnitOfWork
 from app.repositories.user_repository import UserRepository
 from app.schemas.users import UserUpdateRequest, PasswordChangeRequest, MessageResponse
 from app.models.users import User
 
 class UserService:
     def __init__(self, db: Session):
+        self.db = db
         self.repo = UserRepository(db)
 
+    def _invalidate_cached_user(self, user_id: int, status_changed: bool = False):
+        # Block/unblock/xóa user còn làm thay đổi danh sách và chi tiết bài post của user đó
+        tags = [USERS_LIST, user_tag(user_id)] + ([USER_STATUS] if status_changed else [])
+        invalidate_after_commit(self.db, *tags)
+
     def get_user_by_id(self, user_id: int) -> User:
+        # User đã biết là bị block thì trả 403 ngay, không cần truy vấn DB
+        summary = self.repo.get_cached_summary(user_id)
+        if summary is not None and not summary.status:
+            raise HTTPException(status_code=403, detail="User blocked")
         user = self.repo.get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -44,33 +59,50 @@ class UserService:
         user.gender = update_data.gender
 
         self.repo.update_user(user)
+        self._invalidate_cached_user(user_id)
         return user
 
-    def update_user_password(self, user_id: int, data: PasswordChangeRequest) -> MessageResponse:
-        user = self.repo.get_user_by_id(user_id)
+    async def update_user_password(self, user_id: int, data: PasswordChangeRequest) -> MessageResponse:
+        """Truy vấn DB chạy trên thread pool, bcrypt chạy trên hash_pool và được chờ trên event loop."""
+        user = await run_in_threadpool(self.repo.get_user_by_id, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if not auth.verify_password(data.password_old, user.password):
+        if not await auth.verify_password(data.password_old, user.password):
             raise HTTPException(status_code=400, detail="Old password is incorrect")
 
-        new_password_hash = auth.get_password_hash(data.password)
-        self.repo.update_password(user, new_password_hash)
-
+        new_password_hash = await auth.get_password_hash(data.password)
+        await run_in_threadpool(self._save_password, user, new_password_hash)
         return MessageResponse(detail="Password updated successfully")
 
+    def _save_password(self, user: User, new_password_hash: str):
+        # Đổi mật khẩu thu hồi mọi token đã cấp (kể cả token của request này)
+        with UnitOfWork(self.db):
+            self.repo.update_password(user, new_password_hash)
+            self.repo.bump_token_versions([user.id])
+        token_cache.invalidate_user(user.id)
+
     def block_user(self, user_id: int) -> MessageResponse:
         user = self.repo.get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         self.repo.block_user(user)
+        token_cache.invalidate_user(user.id)
+        self._invalidate_cached_user(user.id, status_changed=True)
         return MessageResponse(detail="User blocked successfully")
 
     def list_users(self, status: bool | None = None) -> list[User]:
         return self.repo.list_users(status)
 
     # Admin-specific services
+    def search_users(self, query: str, limit: int, offset: int = 0, status: Optional[bool] = None) -> list[User]:
+        return self.repo.search.search(query, limit, offset, status)
+
+    def index_missing_users(self) -> int:
+        """Đánh chỉ mục tìm kiếm cho các user chưa có (vd. tạo trước khi nâng cấp), gọi khi khởi động."""
+        return self.repo.search.index_missing()
+
     def get_user_by_id_for_admin(self, user_id: int) -> User:
         user = self.repo.get_user_by_id(user_id)
         if not user:
@@ -82,6 +114,8 @@ class UserService:
         if not user.status:
             return MessageResponse(detail="User was already blocked")
         self.repo.block_user(user)
+        token_cache.invalidate_user(user.id)
+        self._invalidate_cached_user(user.id, status_changed=True)
         return MessageResponse(detail="User blocked successfully")
 
     def unblock_user_for_admin(self, user_id: int) -> MessageResponse:
@@ -89,6 +123,7 @@ class UserService:
         if user.status:
             return MessageResponse(detail="User was already unblocked")
         self.repo.unblock_user(user)
+        self._invalidate_cached_user(user.id, status_changed=True)
         return MessageResponse(detail="User unblocked successfully")
 
     def delete_user(self, user_id: int) -> MessageResponse:
@@ -98,31 +133,46 @@ class UserService:
                 raise HTTPException(status_code=404, detail="User not found")
 
             self.repo.delete_user_and_posts(user)
+            token_cache.invalidate_user(user_id)
+            self._invalidate_cached_user(user_id, status_changed=True)
 
             return MessageResponse(detail="User and their posts deleted successfully")
 
         except SQLAlchemyError:
             raise HTTPException(status_code=500, detail="An error occurred while deleting the user")
 
-    def get_users_with_posts_paginated(self, page: int, limit: int, name: Optional[str] = None, status: Optional[bool] = None):
-        skip = (page - 1) * limit
-        users = self.repo.get_users_with_posts(skip, limit, name, status)
+    def get_users_with_posts_paginated(
+        self,
+        page: int,
+        limit: int,
+        name: Optional[str] = None,
+        status: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        posts_limit: Optional[int] = None,
+    ) -> dict:
+        """
+        Trang user kèm posts cho admin. Có cursor thì phân trang keyset (bỏ qua page), ngược lại dùng page.
+        Link tới các trang do API dựng từ URL của request (xem pagination.next_cursor).
+        """
+        after_id, skip = None, (page - 1) * limit
+        if cursor is not None:
+            after_id = decode_cursor(cursor, "id")["id"]
+            if not isinstance(after_id, int):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            skip = None
+
+        users = self.repo.get_users_with_posts(limit, after_id, skip, name, status, posts_limit)
+        result = page_from_rows(users, limit, lambda user: encode_cursor(id=user.id))
         total = self.repo.count_users(name, status)
 
-        last_page = (total - 1) // limit + 1
-
         return {
             "status_code": 200,
             "message": "Success",
-            "data": users,
+            "data": result.items,
             "pagination": {
                 "total": total,
                 "limit": limit,
-                "offset": skip
+                "offset": skip,
+                "next_cursor": result.next_cursor,
             },
-            "link": {
-                "self": f"http://127.0.0.1:8000/api/v1/admins/users-with-posts?page={page}&limit={limit}",
-                "next": f"http://127.0.0.1:8000/api/v1/admins/users-with-posts?page={page + 1}&limit={limit}" if page < last_page else None,
-                "last": f"http://127.0.0.1:8000/api/v1/admins/users-with-posts?page={last_page}&limit={limit}"
-            }
-        }
\ No newline at end of file
+        }
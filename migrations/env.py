@@ -0,0 +1,79 @@
+import re
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.cores.database import Base, TELEMETRY_TABLE_INFO, engine, is_telemetry_table, telemetry_engine
+# Import mọi model để Base.metadata có đủ bảng cho --autogenerate
+from app.models import (  # noqa: F401
+    active_access_tokens, blacklisted_tokens, posts, sessions, token_logs, token_usage_log, user_name_trigrams, users,
+)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Bucket của bảng telemetry (vd. token_logs_20250101) do job bảo trì tạo/xóa, không thuộc về migration
+BUCKET_TABLE_NAME = re.compile(
+    rf"^({'|'.join(t.name for t in target_metadata.sorted_tables if is_telemetry_table(t))})_\d{{8,10}}$"
+)
+
+
+def migration_targets():
+    """
+    (engine, bind_key) cần migrate. Mặc định một DB chứa mọi bảng (bind_key None); nếu
+    TELEMETRY_DATABASE_CONNECTION trỏ tới DB khác thì chuỗi revision chạy trên cả hai engine,
+    mỗi DB có bảng alembic_version riêng và revision chỉ thao tác bảng của engine đó (xem helpers.on_current_bind).
+    Revision mới sinh bằng --autogenerate cần kiểm tra on_current_bind cho từng bảng nó thao tác.
+    """
+    if telemetry_engine is engine:
+        return [(engine, None)]
+    return [(engine, "main"), (telemetry_engine, TELEMETRY_TABLE_INFO["bind_key"])]
+
+
+def include_object_for(bind_key):
+    def include_object(obj, name, type_, reflected, compare_to):
+        if type_ != "table":
+            return True
+        if BUCKET_TABLE_NAME.match(name):
+            return False
+        table = target_metadata.tables.get(name)
+        if bind_key is None or table is None:
+            return True
+        return is_telemetry_table(table) == (bind_key == TELEMETRY_TABLE_INFO["bind_key"])
+    return include_object
+
+
+def run_migrations_offline():
+    for target_engine, bind_key in migration_targets():
+        context.configure(
+            url=target_engine.url.render_as_string(hide_password=False),
+            target_metadata=target_metadata,
+            literal_binds=True,
+            dialect_opts={"paramstyle": "named"},
+            include_object=include_object_for(bind_key),
+            bind_key=bind_key,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+def run_migrations_online():
+    for target_engine, bind_key in migration_targets():
+        with target_engine.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                include_object=include_object_for(bind_key),
+                bind_key=bind_key,
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
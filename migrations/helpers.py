@@ -0,0 +1,17 @@
+"""Hàm dùng chung cho các revision trong migrations/versions."""
+from alembic import op
+
+from app.cores.database import Base, TELEMETRY_TABLE_INFO, is_telemetry_table
+
+
+def on_current_bind(table_name: str) -> bool:
+    """
+    Bảng table_name có nằm trên DB đang được migrate không. Khi TELEMETRY_DATABASE_CONNECTION trỏ tới DB riêng,
+    env.py chạy chuỗi revision trên từng engine (bind_key "main" / "telemetry"); mỗi lần chỉ thao tác bảng của engine đó.
+    """
+    bind_key = op.get_context().opts.get("bind_key")
+    if bind_key is None:
+        return True
+    table = Base.metadata.tables.get(table_name)
+    telemetry = table is not None and is_telemetry_table(table)
+    return telemetry == (bind_key == TELEMETRY_TABLE_INFO["bind_key"])
@@ -0,0 +1,123 @@
+"""baseline schema
+
+Schema trước khi có Alembic (trước đây được tạo bằng Base.metadata.create_all).
+Bảng đã tồn tại được giữ nguyên, nên có thể chạy trên DB cũ rồi tiếp tục các revision sau.
+Bảng token của DB cũ còn lưu JWT gốc (cột token / access_token) được chuyển sang cột token_digest
+(SHA-256) trước, bằng app.scripts.migrate_token_digests.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.scripts.migrate_token_digests import MIGRATIONS as TOKEN_DIGEST_MIGRATIONS, migrate_table
+from migrations.helpers import on_current_bind
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns, indexes=()):
+    if not on_current_bind(name) or sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade():
+    for model, old_column, keep_columns, unique in TOKEN_DIGEST_MIGRATIONS:
+        if on_current_bind(model.__tablename__):
+            migrate_table(op.get_bind(), model, old_column, keep_columns, unique)
+
+    _create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(255)),
+        sa.Column("email", sa.String(255)),
+        sa.Column("password", sa.String(255), nullable=False),
+        sa.Column("fullname", sa.String(255), nullable=False),
+        sa.Column("gender", sa.Enum("male", "female", "other", name="genderenum"), nullable=False),
+        sa.Column("status", sa.Boolean(), nullable=False),
+        sa.Column("role", sa.Enum("admin", "user", name="roleenum"), nullable=False),
+        indexes=[
+            ("ix_users_id", ["id"], False),
+            ("ix_users_username", ["username"], True),
+            ("ix_users_email", ["email"], True),
+        ],
+    )
+    _create_table(
+        "posts",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("content", sa.String(2000), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        indexes=[("ix_posts_id", ["id"], False)],
+    )
+    _create_table(
+        "sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("refresh_token", sa.String(255), nullable=False, unique=True),
+        sa.Column("ip_address", sa.String(255)),
+        sa.Column("user_agent", sa.String(255)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("expires_at", sa.DateTime()),
+        sa.Column("revoked", sa.Boolean()),
+        indexes=[("ix_sessions_id", ["id"], False)],
+    )
+    _create_table(
+        "token_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("username", sa.String(255), nullable=True),
+        sa.Column("ip_address", sa.String(255), nullable=False),
+        sa.Column("user_agent", sa.String(255), nullable=True),
+        sa.Column("action", sa.String(255), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        indexes=[("ix_token_logs_id", ["id"], False), ("ix_token_logs_user_id", ["user_id"], False)],
+    )
+    _create_table(
+        "blacklisted_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("token_digest", sa.String(64), nullable=False),
+        sa.Column("blacklisted_at", sa.DateTime()),
+        indexes=[
+            ("ix_blacklisted_tokens_id", ["id"], False),
+            ("ix_blacklisted_tokens_token_digest", ["token_digest"], False),
+        ],
+    )
+    _create_table(
+        "active_access_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        # FOREIGN KEY chỉ tạo được khi users cùng DB (0003 bỏ nó đi)
+        sa.Column("user_id", sa.Integer(), *([sa.ForeignKey("users.id")] if on_current_bind("users") else [])),
+        sa.Column("token_digest", sa.String(64), unique=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("expires_at", sa.DateTime()),
+        indexes=[("ix_active_access_tokens_user_id", ["user_id"], False)],
+    )
+    _create_table(
+        "token_usage_log",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("token_digest", sa.String(64), nullable=False),
+        sa.Column("requested_at", sa.DateTime()),
+        indexes=[
+            ("ix_token_usage_log_id", ["id"], False),
+            ("idx_token_time", ["token_digest", "requested_at"], False),
+        ],
+    )
+
+
+def downgrade():
+    for name in (
+        "token_usage_log", "active_access_tokens", "blacklisted_tokens",
+        "token_logs", "sessions", "posts", "users",
+    ):
+        if on_current_bind(name):
+            op.drop_table(name)
@@ -0,0 +1,54 @@
+"""indexes for hot auth queries
+
+Chỉ mục cho các truy vấn chạy trên mỗi login/refresh/logout và các job dọn dẹp.
+Kiểm tra bằng: python -m app.scripts.explain_hot_queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import on_current_bind
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # TokenLogRepository.get_last_log
+    ("idx_token_logs_user_action_time", "token_logs", ["user_id", "action", "timestamp"]),
+    # SessionRepository.revoke_sessions_by_user_ids / delete_expired_sessions
+    ("idx_sessions_user_revoked", "sessions", ["user_id", "revoked"]),
+    ("ix_sessions_expires_at", "sessions", ["expires_at"]),
+    # ActiveAccessTokenRepository.delete_expired_tokens
+    ("ix_active_access_tokens_expires_at", "active_access_tokens", ["expires_at"]),
+    # PostRepository.get_posts_by_user_id
+    ("ix_posts_user_id", "posts", ["user_id"]),
+    # BlacklistedTokenRepository.delete_expired_tokens
+    ("ix_blacklisted_tokens_blacklisted_at", "blacklisted_tokens", ["blacklisted_at"]),
+    # RateLimiterRepository.delete_expired_tokens
+    ("ix_token_usage_log_requested_at", "token_usage_log", ["requested_at"]),
+]
+
+
+def _existing_indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        if not on_current_bind(table):
+            continue
+        # DB được tạo bằng create_all sau khi model khai báo index thì đã có sẵn
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        if on_current_bind(table) and name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
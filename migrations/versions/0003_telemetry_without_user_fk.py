@@ -0,0 +1,55 @@
+"""drop active_access_tokens.user_id foreign key
+
+active_access_tokens là bảng telemetry, có thể chuyển sang DB riêng (TELEMETRY_DATABASE_CONNECTION)
+nên không thể giữ FOREIGN KEY tới users. Cột user_id và index vẫn giữ nguyên.
+SQLite không hỗ trợ ALTER TABLE DROP CONSTRAINT nên bảng được tạo lại bằng batch_alter_table;
+FOREIGN KEY không có tên trên SQLite nên được đặt tên qua naming_convention để có thể xóa.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import on_current_bind
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+FK_NAME = "fk_active_access_tokens_user_id"
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s"}
+
+
+def _user_foreign_keys() -> list:
+    return [
+        foreign_key
+        for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys("active_access_tokens")
+        if foreign_key["referred_table"] == "users"
+    ]
+
+
+def upgrade():
+    if not on_current_bind("active_access_tokens"):
+        return
+    foreign_keys = _user_foreign_keys()
+    if not foreign_keys:
+        return
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("active_access_tokens", naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(FK_NAME, type_="foreignkey")
+        return
+    for foreign_key in foreign_keys:
+        if foreign_key["name"]:
+            op.drop_constraint(foreign_key["name"], "active_access_tokens", type_="foreignkey")
+
+
+def downgrade():
+    # FOREIGN KEY chỉ tạo lại được khi users cùng DB với active_access_tokens
+    if not (on_current_bind("active_access_tokens") and on_current_bind("users")) or _user_foreign_keys():
+        return
+    with op.batch_alter_table("active_access_tokens") as batch_op:
+        batch_op.create_foreign_key(FK_NAME, "users", ["user_id"], ["id"])
@@ -0,0 +1,36 @@
+"""add users.token_version
+
+Access token mang claim "ver" = users.token_version; tăng cột này (block, đổi mật khẩu, logout-all)
+làm mọi token đã cấp cho user hết hiệu lực. Token cũ không có claim "ver" được coi như ver = 0.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import on_current_bind
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not on_current_bind("users"):
+        return
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    if "token_version" in columns:
+        return
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("token_version", sa.Integer(), server_default="0", nullable=False))
+
+
+def downgrade():
+    if not on_current_bind("users"):
+        return
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("token_version")
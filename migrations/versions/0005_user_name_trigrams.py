@@ -0,0 +1,46 @@
+"""trigram index for admin user name search
+
+Thêm users.search_name (username + fullname đã chuẩn hóa) và bảng user_name_trigrams,
+thay cho ILIKE '%name%' quét toàn bảng users. Các user đã có được đánh chỉ mục khi app khởi động
+(UserService.index_missing_users) hoặc bằng: python -m app.scripts.rebuild_user_search_index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import on_current_bind
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not on_current_bind("users"):
+        return
+    inspector = sa.inspect(op.get_bind())
+    if "search_name" not in {column["name"] for column in inspector.get_columns("users")}:
+        with op.batch_alter_table("users") as batch_op:
+            batch_op.add_column(sa.Column("search_name", sa.String(1024), nullable=True))
+
+    if not inspector.has_table("user_name_trigrams"):
+        op.create_table(
+            "user_name_trigrams",
+            sa.Column("trigram", sa.String(3), primary_key=True),
+            sa.Column("user_id", sa.Integer(), primary_key=True),
+        )
+        op.create_index("ix_user_name_trigrams_user_id", "user_name_trigrams", ["user_id"])
+
+
+def downgrade():
+    if not on_current_bind("users"):
+        return
+    op.drop_index("ix_user_name_trigrams_user_id", table_name="user_name_trigrams")
+    op.drop_table("user_name_trigrams")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("search_name")
@@ -0,0 +1,88 @@
+import uuid
+from typing import Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.cores.database import SessionLocal, engine
+from app.main import app
+from app.models.users import RoleEnum, User
+
+PASSWORD = "testpassword"
+
+# Client riêng của các fixture; test cần cookie (vd. refresh token) thì truyền client của mình vào login_user
+client = TestClient(app, base_url="https://testserver")
+
+
+@pytest.fixture(scope="session")
+def register_user():
+    """Factory: đăng ký user mới (username ngẫu nhiên theo prefix nếu không truyền), trả về (id, username)."""
+    def register(prefix: str = "user", fullname: str = "Test User", role: RoleEnum = RoleEnum.user,
+                 username: Optional[str] = None) -> tuple[int, str]:
+        username = username or f"{prefix}_{uuid.uuid4().hex[:8]}"
+        response = client.post("/api/v1/auth/register", json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": PASSWORD,
+            "fullname": fullname,
+            "gender": "other"
+        })
+        assert response.status_code == 200
+        user_id = response.json()["data"]["id"]
+        if role != RoleEnum.user:
+            # API không cho tự đăng ký admin nên ghi thẳng vào DB, trước khi đăng nhập để token mang role mới
+            db = SessionLocal()
+            try:
+                db.query(User).filter(User.id == user_id).update({User.role: role})
+                db.commit()
+            finally:
+                db.close()
+        return user_id, username
+
+    return register
+
+
+@pytest.fixture(scope="session")
+def login_user():
+    """Factory: đăng nhập bằng mật khẩu mặc định, trả về phần data của response (access_token, id, ...)."""
+    def login(username: str, via: TestClient = client) -> dict:
+        response = via.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD})
+        assert response.status_code == 200
+        return response.json()["data"]
+
+    return login
+
+
+@pytest.fixture(scope="session")
+def auth_headers(register_user, login_user):
+    """Factory: đăng ký và đăng nhập một user mới, trả về header Authorization của user đó."""
+    def headers(prefix: str = "user", fullname: str = "Test User", role: RoleEnum = RoleEnum.user) -> dict:
+        _, username = register_user(prefix, fullname, role)
+        return {"Authorization": f"Bearer {login_user(username)['access_token']}"}
+
+    return headers
+
+
+def record_statements(keep=lambda statement: True):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if keep(statement):
+            executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def statements():
+    """Các câu SQL chạy trên engine của app trong lúc test."""
+    yield from record_statements()
+
+
+@pytest.fixture
+def writes():
+    """Chỉ các câu INSERT/UPDATE/DELETE chạy trên engine của app trong lúc test."""
+    yield from record_statements(lambda statement: statement.lstrip().split(" ", 1)[0] in ("INSERT", "UPDATE", "DELETE"))
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from app.cores.activity_detector import (
+    LastSeen, LoginLocationChangeRule, NewDeviceRule, RapidRefreshRule, SuspiciousActivityDetector,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 1, 12, 0, 0)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+class Loader:
+    def __init__(self, last=None):
+        self.last = last
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.last
+
+
+def test_seeds_from_db_once_then_uses_memory():
+    clock = FakeClock()
+    detector = SuspiciousActivityDetector(clock=clock)
+    loader = Loader(LastSeen("1.1.1.1", "firefox", clock.now - timedelta(minutes=1)))
+
+    assert detector.is_suspicious(1, "login", "2.2.2.2", "firefox", loader) is True
+    detector.record(1, "login", "2.2.2.2", "firefox")
+    clock.advance(minutes=5)
+    assert detector.is_suspicious(1, "login", "3.3.3.3", "firefox", loader) is False
+
+    assert loader.calls == 1
+
+
+def test_login_from_same_device_is_not_suspicious():
+    clock = FakeClock()
+    detector = SuspiciousActivityDetector(clock=clock)
+    detector.record(1, "login", "1.1.1.1", "firefox")
+
+    clock.advance(seconds=5)
+    assert detector.is_suspicious(1, "login", "1.1.1.1", "firefox", Loader()) is False
+    assert detector.is_suspicious(1, "login", "1.1.1.1", "chrome", Loader()) is True
+
+
+def test_rapid_refresh_is_suspicious():
+    clock = FakeClock()
+    detector = SuspiciousActivityDetector(clock=clock)
+
+    assert detector.is_suspicious(1, "refresh", "1.1.1.1", "firefox", Loader()) is False
+    detector.record(1, "refresh", "1.1.1.1", "firefox")
+    clock.advance(seconds=3)
+    assert detector.is_suspicious(1, "refresh", "1.1.1.1", "firefox", Loader()) is True
+    clock.advance(seconds=30)
+    assert detector.is_suspicious(1, "refresh", "1.1.1.1", "firefox", Loader()) is False
+
+
+def test_untracked_actions_skip_db_and_memory():
+    detector = SuspiciousActivityDetector()
+    loader = Loader()
+
+    assert detector.is_suspicious(1, "login failed", "1.1.1.1", "firefox", loader) is False
+    detector.record(1, "login failed", "1.1.1.1", "firefox")
+
+    assert loader.calls == 0
+    assert detector.stats()["users"] == 0
+
+
+def test_custom_rule_uses_device_history():
+    clock = FakeClock()
+    detector = SuspiciousActivityDetector(rules=[NewDeviceRule()], clock=clock)
+    detector.record(1, "login", "1.1.1.1", "firefox")
+
+    assert detector.is_suspicious(1, "login", "1.1.1.1", "firefox", Loader()) is False
+    assert detector.is_suspicious(1, "login", "9.9.9.9", "curl", Loader()) is True
+
+
+def test_lru_bounds_users():
+    detector = SuspiciousActivityDetector(max_users=2)
+    for user_id in range(3):
+        detector.record(user_id, "login", "1.1.1.1", "firefox")
+
+    stats = detector.stats()
+    assert stats["users"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_lookback_is_the_widest_window_of_the_action_rules():
+    detector = SuspiciousActivityDetector(rules=[LoginLocationChangeRule(timedelta(minutes=2)), RapidRefreshRule()])
+    assert detector.lookback("login") == timedelta(minutes=2)
+    assert detector.lookback("logout") is None
+
+    # NewDeviceRule cần cả lịch sử thiết bị nên không giới hạn
+    detector.add_rule(NewDeviceRule())
+    assert detector.lookback("login") is None
@@ -0,0 +1,99 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.cores.count_cache import user_count_cache
+from app.cores.database import SessionLocal
+from app.main import app
+from app.models.posts import Post
+from app.models.users import GenderEnum, RoleEnum, User
+from app.repositories.user_repository import UserRepository
+from app.repositories.user_search_repository import UserSearchRepository
+
+client = TestClient(app)
+URL = "/api/v1/admin/users-with-posts"
+
+
+def create_users(fullname: str, count: int, posts_per_user: int) -> list[int]:
+    db = SessionLocal()
+    try:
+        users = []
+        for _ in range(count):
+            username = f"uwp_{uuid.uuid4().hex[:8]}"
+            user = User(username=username, email=f"{username}@example.com", password="x",
+                        fullname=fullname, gender=GenderEnum.other)
+            db.add(user)
+            users.append(user)
+        db.flush()
+        for user in users:
+            UserSearchRepository(db).index_user(user)
+            db.add_all(Post(title=f"post {i}", content="content", user_id=user.id) for i in range(posts_per_user))
+        db.commit()
+        return [user.id for user in users]
+    finally:
+        db.close()
+
+
+def test_keyset_pages_with_capped_posts_and_request_links(auth_headers):
+    name = f"Keyset {uuid.uuid4().hex[:8]}"
+    user_ids = create_users(name, count=5, posts_per_user=4)
+    headers = auth_headers("uwpa", "Users With Posts Admin", RoleEnum.admin)
+
+    first = client.get(URL, params={"name": name, "limit": 2, "posts_limit": 3}, headers=headers).json()
+    assert [user["id"] for user in first["data"]] == user_ids[:2]
+    assert first["pagination"]["total"] == 5
+    assert all(len(user["posts"]) == 3 for user in first["data"])
+    # Bài mới nhất trước
+    assert [post["title"] for post in first["data"][0]["posts"]] == ["post 3", "post 2", "post 1"]
+
+    assert first["link"]["self"].startswith(f"http://testserver{URL}?")
+    assert "page=3" in first["link"]["last"]
+    next_url = first["link"]["next"]
+    assert next_url.startswith(f"http://testserver{URL}?") and "cursor=" in next_url
+
+    second = client.get(next_url, headers=headers).json()
+    assert [user["id"] for user in second["data"]] == user_ids[2:4]
+    assert second["pagination"]["offset"] is None
+    assert all(len(user["posts"]) == 3 for user in second["data"])
+
+    third = client.get(second["link"]["next"], headers=headers).json()
+    assert [user["id"] for user in third["data"]] == user_ids[4:]
+    assert third["link"]["next"] is None
+
+    uncapped = client.get(URL, params={"name": name, "limit": 1}, headers=headers).json()
+    assert len(uncapped["data"][0]["posts"]) == 4
+
+
+def test_total_is_cached_until_users_change(auth_headers, register_user, statements):
+    name = f"Count {uuid.uuid4().hex[:8]}"
+    create_users(name, count=2, posts_per_user=1)
+    headers = auth_headers("uwpa", "Users With Posts Admin", RoleEnum.admin)
+    params = {"name": name, "limit": 1}
+    assert client.get(URL, params=params, headers=headers).json()["pagination"]["total"] == 2
+
+    statements.clear()
+    assert client.get(URL, params=params, headers=headers).json()["pagination"]["total"] == 2
+    assert not [s for s in statements if s.lower().startswith("select count(")]
+
+    register_user("uwp", name)
+    assert client.get(URL, params=params, headers=headers).json()["pagination"]["total"] == 3
+
+
+def test_blocking_a_user_invalidates_only_the_totals_it_changes():
+    blocked_name = f"Blocked {uuid.uuid4().hex[:8]}"
+    other_name = f"Other {uuid.uuid4().hex[:8]}"
+    blocked_id, _ = create_users(blocked_name, count=2, posts_per_user=0)
+    create_users(other_name, count=1, posts_per_user=0)
+    keys = [(blocked_name, None), (blocked_name, True), (blocked_name, False), (other_name, None), (other_name, True)]
+    db = SessionLocal()
+    try:
+        repo = UserRepository(db)
+        assert [repo.count_users(name, status) for name, status in keys] == [2, 2, 0, 1, 1]
+
+        repo.block_user(repo.get_user_by_id(blocked_id))
+
+        # Chỉ các tổng lọc theo status của tên bị ảnh hưởng bị bỏ; tổng không lọc status và tên khác vẫn giữ
+        assert [user_count_cache.get(key) for key in keys] == [2, None, None, 1, 1]
+        assert [repo.count_users(name, status) for name, status in keys] == [2, 1, 1, 1, 1]
+    finally:
+        db.close()
@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cores import auth
+from app.cores.token_cache import token_cache
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def get_token(auth_headers):
+    return auth_headers("qc", "Query Count")["Authorization"]
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    original = auth.decode_token
+
+    def counting_decode(token):
+        calls.append(token)
+        return original(token)
+
+    monkeypatch.setattr(auth, "decode_token", counting_decode)
+    return calls
+
+
+def user_lookups(executed):
+    return [s for s in executed if "FROM users" in s]
+
+
+def test_authenticated_request_decodes_and_loads_user_once(get_token, statements, decode_calls):
+    token_cache.clear()
+
+    response = client.get("/api/v1/posts/", headers={"Authorization": get_token})
+
+    assert response.status_code == 200
+    assert len(decode_calls) == 1
+    assert len(user_lookups(statements)) == 1
+
+
+def test_cached_token_skips_decode_and_user_lookup(get_token, statements, decode_calls):
+    client.get("/api/v1/posts/", headers={"Authorization": get_token})
+    statements.clear()
+    decode_calls.clear()
+
+    response = client.get("/api/v1/posts/", headers={"Authorization": get_token})
+
+    assert response.status_code == 200
+    assert len(decode_calls) == 0
+    assert len(user_lookups(statements)) == 0
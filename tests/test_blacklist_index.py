@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from app.cores.auth import token_digest
+from app.cores.blacklist_index import BlacklistIndex
+
+
+def test_index_answers_membership():
+    index = BlacklistIndex(capacity=1000, error_rate=0.01)
+    revoked = token_digest("revoked-token")
+    index.load([(revoked, datetime.now(timezone.utc))])
+
+    assert index.loaded
+    assert index.might_contain(revoked)
+    assert index.contains(revoked)
+    assert not index.contains(token_digest("valid-token"))
+
+
+def test_false_positive_rate_stays_near_target():
+    index = BlacklistIndex(capacity=1000, error_rate=0.01)
+    index.load((token_digest(f"revoked-{i}"), None) for i in range(1000))
+
+    false_positives = sum(index.might_contain(token_digest(f"valid-{i}")) for i in range(10000))
+    assert false_positives / 10000 < 0.03
+    assert index.stats()["estimated_false_positive_rate"] < 0.03
+
+
+def test_prune_drops_expired_entries():
+    index = BlacklistIndex(capacity=1000, error_rate=0.01)
+    now = datetime.now(timezone.utc)
+    old, recent = token_digest("old"), token_digest("recent")
+    index.load([(old, now - timedelta(hours=1)), (recent, now)])
+
+    assert index.prune(now - timedelta(minutes=30)) == 1
+    assert not index.contains(old)
+    assert index.contains(recent)
+
+
+def test_reload_keeps_digests_added_while_reading():
+    index = BlacklistIndex(capacity=1000, error_rate=0.01)
+    stored, dropped, revoked = token_digest("stored"), token_digest("dropped"), token_digest("revoked")
+    index.load([(dropped, None)])
+
+    def fetch():
+        # Token bị thu hồi và commit sau khi bản đọc DB đã bắt đầu
+        index.add(revoked)
+        return [(stored, None)]
+
+    index.reload(fetch)
+
+    assert index.contains(stored) and index.contains(revoked)
+    assert not index.contains(dropped)
+    index.reload(lambda: [])
+    assert not index.contains(revoked)
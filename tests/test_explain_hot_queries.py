@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from app.cores.database import Base
+from app.models.posts import Post
+from app.models.users import User
+from app.scripts import explain_hot_queries
+from app.scripts.explain_hot_queries import check
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'explain.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_hot_queries_use_indexes(engine):
+    assert check(engine) == []
+
+
+def test_check_runs_in_a_rolled_back_transaction(engine):
+    check(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(User)).scalar_one() == 0
+        assert connection.execute(select(func.count()).select_from(Post)).scalar_one() == 0
+
+
+def test_check_reports_full_scans_and_queries_that_run_nothing(monkeypatch, engine):
+    queries = [
+        ("unindexed", lambda db: db.query(User).filter(User.fullname == "x").all()),
+        ("cached", lambda db: None),
+    ]
+    monkeypatch.setattr(explain_hot_queries, "hot_queries", lambda bind: (queries, None))
+
+    failures = dict(check(engine))
+
+    assert failures["unindexed"] == ["SCAN users"]
+    assert failures["cached"] == ["no statement executed"]
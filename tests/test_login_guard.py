@@ -0,0 +1,59 @@
+from app.cores.login_guard import LoginAttemptLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(clock):
+    return LoginAttemptLimiter(
+        max_failures_per_username=3,
+        max_failures_per_ip=10,
+        backoff_base=1,
+        backoff_max=60,
+        failure_window=900,
+        clock=clock,
+    )
+
+
+def test_username_blocked_with_exponential_backoff():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    for _ in range(2):
+        limiter.record_failure("1.1.1.1", "alice")
+    assert limiter.retry_after("1.1.1.1", "alice") == 0
+
+    limiter.record_failure("1.1.1.1", "alice")
+    assert limiter.retry_after("1.1.1.1", "alice") == 1
+
+    clock.now += 1
+    limiter.record_failure("1.1.1.1", "alice")
+    assert limiter.retry_after("1.1.1.1", "alice") == 2
+    assert limiter.retry_after("2.2.2.2", "bob") == 0
+
+
+def test_ip_blocked_across_usernames():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    for i in range(10):
+        limiter.record_failure("1.1.1.1", f"user{i}")
+
+    assert limiter.retry_after("1.1.1.1", "someone") > 0
+    assert limiter.retry_after("2.2.2.2", "someone") == 0
+
+
+def test_success_resets_username_counter():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    limiter.record_failure("1.1.1.1", "alice")
+    limiter.record_failure("1.1.1.1", "alice")
+    limiter.record_success("1.1.1.1", "alice")
+
+    assert limiter.record_failure("1.1.1.1", "alice") == 1
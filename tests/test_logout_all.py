@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+
+from app.cores.database import SessionLocal
+from app.main import app
+from app.models.sessions import Session as SessionModel
+from app.models.users import RoleEnum
+
+client = TestClient(app, base_url="https://testserver")
+
+
+def bearer(data: dict) -> str:
+    return f"Bearer {data['access_token']}"
+
+
+def open_sessions(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(SessionModel).filter_by(user_id=user_id, revoked=False).count()
+    finally:
+        db.close()
+
+
+def test_logout_all_uses_one_statement_per_table(register_user, login_user, writes):
+    user_id, username = register_user("lo", "Logout All")
+    tokens = [bearer(login_user(username)) for _ in range(3)]
+    writes.clear()
+
+    response = client.post("/api/v1/auth/logout-all", headers={"Authorization": tokens[0]})
+
+    assert response.status_code == 200
+    # blacklisted_tokens, sessions, active_access_tokens và users.token_version
+    assert len(writes) == 4
+    assert open_sessions(user_id) == 0
+    for token in tokens:
+        assert client.get("/api/v1/users/me", headers={"Authorization": token}).status_code == 401
+
+
+def test_admin_logs_out_several_users(register_user, login_user):
+    _, admin_name = register_user("lo", "Logout All", RoleEnum.admin)
+    admin_token = bearer(login_user(admin_name))
+    first_id, first_name = register_user("lo", "Logout All")
+    second_id, second_name = register_user("lo", "Logout All")
+    first_token = bearer(login_user(first_name))
+    second_tokens = [bearer(login_user(second_name)) for _ in range(2)]
+
+    response = client.post(
+        "/api/v1/admin/users/logout",
+        json={"user_ids": [first_id, second_id]},
+        headers={"Authorization": admin_token},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["detail"] == "Revoked 3 access tokens of 2 users"
+    assert open_sessions(first_id) == open_sessions(second_id) == 0
+    for token in [first_token, *second_tokens]:
+        assert client.get("/api/v1/users/me", headers={"Authorization": token}).status_code == 401
+    assert client.get("/api/v1/users/me", headers={"Authorization": admin_token}).status_code == 200
+
+
+def test_admin_logout_requires_user_ids(register_user, login_user):
+    _, admin_name = register_user("lo", "Logout All", RoleEnum.admin)
+    response = client.post(
+        "/api/v1/admin/users/logout",
+        json={"user_ids": []},
+        headers={"Authorization": bearer(login_user(admin_name))},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.cores.database import SessionLocal
+from app.cores.maintenance import MaintenanceScheduler
+from app.models.token_usage_log import TokenUsageLog
+from app.repositories.bulk import delete_in_chunks
+
+
+def insert_usage(digest: str, ages_minutes: list[int]):
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        db.add_all(TokenUsageLog(token_digest=digest, requested_at=now - timedelta(minutes=age)) for age in ages_minutes)
+        db.commit()
+    finally:
+        db.close()
+
+
+def count_usage(digest: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(TokenUsageLog).filter(TokenUsageLog.token_digest == digest).count()
+    finally:
+        db.close()
+
+
+def test_delete_in_chunks_deletes_in_bounded_batches(statements):
+    digest = uuid.uuid4().hex
+    insert_usage(digest, [10, 10, 10, 10, 10, 0])
+    db = SessionLocal()
+    try:
+        expire_before = datetime.now(timezone.utc) - timedelta(minutes=1)
+        deleted = delete_in_chunks(
+            db, TokenUsageLog,
+            TokenUsageLog.token_digest == digest, TokenUsageLog.requested_at < expire_before,
+            chunk_size=2,
+        )
+    finally:
+        db.close()
+
+    assert deleted == 5
+    assert len([s for s in statements if s.startswith("DELETE")]) == 3
+    assert count_usage(digest) == 1
+
+
+def test_run_job_records_metrics():
+    scheduler = MaintenanceScheduler()
+    scheduler.add_job("ok", lambda db: 3, interval_seconds=60)
+    scheduler.add_job("broken", lambda db: 1 / 0, interval_seconds=60)
+
+    assert scheduler.run_job("ok") == 3
+    assert scheduler.run_job("ok") == 3
+    assert scheduler.run_job("broken") == 0
+
+    stats = scheduler.stats()
+    assert stats["ok"]["runs"] == 2
+    assert stats["ok"]["rows_purged"] == 6
+    assert stats["ok"]["last_error"] is None
+    assert stats["broken"]["failures"] == 1
+    assert "ZeroDivisionError" in stats["broken"]["last_error"]
+
+
+def test_jobs_run_off_the_event_loop():
+    async def scenario():
+        job_threads = []
+        scheduler = MaintenanceScheduler()
+
+        def job(db):
+            job_threads.append(threading.get_ident())
+            return 0
+
+        scheduler.add_job("fast", job, interval_seconds=0.01)
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        return threading.get_ident(), job_threads, scheduler.stats()["fast"]["runs"]
+
+    loop_thread, job_threads, runs = asyncio.run(scenario())
+
+    assert runs >= 2
+    assert job_threads and loop_thread not in job_threads
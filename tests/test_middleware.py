@@ -0,0 +1,213 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.cores.auth import token_digest
+from app.cores.database import SessionLocal
+from app.cores.rate_limiter_engine import RateLimiterEngine
+from app.cores.token_cache import token_cache
+from app.main import app
+from app.middleware import access_log
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.auth_middleware import AuthMiddleware
+from app.middleware.rate_limiter import RateLimiterMiddleware
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+
+client = TestClient(app, base_url="https://testserver")
+
+
+async def echo(request: Request):
+    # Trả về những gì middleware đã gắn vào scope["state"]
+    state = request.scope.get("state", {})
+    principal = state.get("principal")
+    return JSONResponse({
+        "user": state.get("user"),
+        "principal_id": principal.id if principal else None,
+    })
+
+
+async def fail(request: Request):
+    raise RuntimeError("boom")
+
+
+def echo_app() -> Starlette:
+    methods = ["GET", "POST", "OPTIONS"]
+    routes = [
+        Route("/api/v1/auth/login", echo, methods=methods),
+        Route("/api/v1/users/me", echo, methods=methods),
+        Route("/fail", fail),
+    ]
+    return Starlette(routes=routes)
+
+
+class FakeEngine(RateLimiterEngine):
+    def __init__(self, limited: bool = False, error: Exception = None):
+        self.limited = limited
+        self.error = error
+        self.calls = []
+
+    def is_rate_limited(self, token: str, max_requests: int, period_seconds: int) -> bool:
+        self.calls.append((token, max_requests, period_seconds))
+        if self.error is not None:
+            raise self.error
+        return self.limited
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message: str):
+        self.messages.append(message)
+
+
+def wrap(middleware_cls, **options) -> TestClient:
+    return TestClient(middleware_cls(echo_app(), **options), base_url="https://testserver", raise_server_exceptions=False)
+
+
+@pytest.fixture
+def access_token(register_user, login_user):
+    _, username = register_user("mw", "Middleware")
+    # Đăng nhập qua client của module để logout có cookie refresh token
+    return username, login_user(username, via=client)["access_token"]
+
+
+def test_auth_skips_excluded_paths():
+    auth_client = wrap(AuthMiddleware)
+
+    response = auth_client.post("/api/v1/auth/login")
+
+    assert response.status_code == 200
+    assert response.json() == {"user": None, "principal_id": None}
+
+
+def test_auth_lets_options_through_without_token():
+    auth_client = wrap(AuthMiddleware)
+
+    response = auth_client.options("/api/v1/users/me")
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Basic abc"}, {"Authorization": "bearer abc"}])
+def test_auth_rejects_missing_or_invalid_header_with_json_401(headers):
+    auth_client = wrap(AuthMiddleware)
+
+    response = auth_client.get("/api/v1/users/me", headers=headers)
+
+    assert response.status_code == 401
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"detail": "Missing or invalid Authorization header"}
+
+
+def test_auth_rejects_invalid_token_with_json_401():
+    auth_client = wrap(AuthMiddleware)
+
+    response = auth_client.get("/api/v1/users/me", headers={"Authorization": "Bearer not-a-jwt"})
+
+    assert response.status_code == 401
+    assert response.headers["content-type"] == "application/json"
+    assert "detail" in response.json()
+
+
+def test_auth_propagates_principal_via_scope_state(access_token):
+    username, token = access_token
+    token_cache.invalidate_token(token)
+    auth_client = wrap(AuthMiddleware)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Lần đầu xác thực qua DB, lần sau lấy principal từ token_cache
+    first = auth_client.get("/api/v1/users/me", headers=headers)
+    assert token_cache.get(token) is not None
+    second = auth_client.get("/api/v1/users/me", headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["user"] == username
+    assert first.json()["principal_id"] is not None
+    assert second.json() == first.json()
+
+
+def test_auth_rejects_revoked_token(access_token):
+    _, token = access_token
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+
+    response = wrap(AuthMiddleware).get("/api/v1/users/me", headers=headers)
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Token has been revoked"}
+
+
+def test_rate_limiter_passes_requests_without_bearer_token():
+    engine = FakeEngine(limited=True)
+    limiter_client = wrap(RateLimiterMiddleware, max_requests=1, period_seconds=10, engine=engine)
+
+    response = limiter_client.get("/api/v1/users/me")
+
+    assert response.status_code == 200
+    assert engine.calls == []
+
+
+def test_rate_limiter_passes_requests_under_the_limit():
+    engine = FakeEngine(limited=False)
+    limiter_client = wrap(RateLimiterMiddleware, max_requests=5, period_seconds=10, engine=engine)
+
+    response = limiter_client.get("/api/v1/users/me", headers={"Authorization": "Bearer tok"})
+
+    assert response.status_code == 200
+    assert engine.calls == [("tok", 5, 10)]
+
+
+def test_rate_limiter_returns_429_and_blacklists_token():
+    token = f"rl-{uuid.uuid4().hex}"
+    engine = FakeEngine(limited=True)
+    limiter_client = wrap(RateLimiterMiddleware, max_requests=1, period_seconds=10, engine=engine)
+
+    response = limiter_client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 429
+    assert response.json() == {"message": "Too many requests, token has been blacklisted."}
+    db = SessionLocal()
+    try:
+        assert BlacklistedTokenRepository(db).is_blacklisted(token_digest(token))
+    finally:
+        db.close()
+
+
+def test_rate_limiter_engine_error_returns_json_500():
+    engine = FakeEngine(error=RuntimeError("engine down"))
+    limiter_client = wrap(RateLimiterMiddleware, max_requests=1, period_seconds=10, engine=engine)
+
+    response = limiter_client.get("/api/v1/users/me", headers={"Authorization": "Bearer tok"})
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal middleware error: engine down"}
+
+
+def test_access_log_records_status_and_path(monkeypatch):
+    logger = FakeLogger()
+    monkeypatch.setattr(access_log, "logger", logger)
+    log_client = wrap(AccessLogMiddleware)
+
+    assert log_client.get("/api/v1/users/me").status_code == 200
+    assert log_client.get("/missing").status_code == 404
+
+    assert len(logger.messages) == 2
+    assert logger.messages[0].startswith("GET /api/v1/users/me status=200 ")
+    assert logger.messages[1].startswith("GET /missing status=404 ")
+
+
+def test_access_log_records_500_when_app_raises(monkeypatch):
+    logger = FakeLogger()
+    monkeypatch.setattr(access_log, "logger", logger)
+    log_client = wrap(AccessLogMiddleware)
+
+    assert log_client.get("/fail").status_code == 500
+
+    assert len(logger.messages) == 1
+    assert logger.messages[0].startswith("GET /fail status=500 ")
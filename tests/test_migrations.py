@@ -0,0 +1,155 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, insert, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from app.cores import database
+from app.cores.auth import token_digest
+from app.repositories.active_access_token_repository import ActiveAccessTokenRepository
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+
+MIGRATIONS = Path(__file__).resolve().parents[1] / "migrations"
+
+
+@pytest.fixture
+def alembic_config():
+    # Không đọc alembic.ini để env.py không gọi fileConfig (ghi đè cấu hình logging của app)
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS))
+    return config
+
+
+@pytest.fixture
+def single_engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "telemetry_engine", engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def split_engines(monkeypatch, tmp_path):
+    main = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    telemetry = create_engine(f"sqlite:///{tmp_path / 'telemetry.db'}")
+    monkeypatch.setattr(database, "engine", main)
+    monkeypatch.setattr(database, "telemetry_engine", telemetry)
+    yield main, telemetry
+    main.dispose()
+    telemetry.dispose()
+
+
+def test_upgrade_drops_active_token_user_fk_on_sqlite(alembic_config, single_engine):
+    command.upgrade(alembic_config, "0002")
+    assert inspect(single_engine).get_foreign_keys("active_access_tokens")
+
+    command.upgrade(alembic_config, "head")
+    assert inspect(single_engine).get_foreign_keys("active_access_tokens") == []
+    assert "ix_active_access_tokens_user_id" in {
+        index["name"] for index in inspect(single_engine).get_indexes("active_access_tokens")
+    }
+
+    command.downgrade(alembic_config, "0002")
+    assert inspect(single_engine).get_foreign_keys("active_access_tokens")
+
+
+def test_telemetry_revisions_run_on_telemetry_engine(alembic_config, split_engines):
+    main, telemetry = split_engines
+
+    command.upgrade(alembic_config, "head")
+
+    telemetry_tables = {"token_logs", "token_usage_log", "blacklisted_tokens", "active_access_tokens"}
+    main_tables = set(inspect(main).get_table_names())
+    assert {"users", "posts", "sessions", "alembic_version"} <= main_tables
+    assert not telemetry_tables & main_tables
+    assert set(inspect(telemetry).get_table_names()) == telemetry_tables | {"alembic_version"}
+    assert inspect(telemetry).get_foreign_keys("active_access_tokens") == []
+    assert "idx_token_logs_user_action_time" in {
+        index["name"] for index in inspect(telemetry).get_indexes("token_logs")
+    }
+
+    command.downgrade(alembic_config, "base")
+    assert set(inspect(main).get_table_names()) == {"alembic_version"}
+    assert set(inspect(telemetry).get_table_names()) == {"alembic_version"}
+
+
+
+def run_alembic(*args, env):
+    # Process riêng: Base.metadata chỉ có các model mà env.py import (trong pytest mọi model đã được import sẵn)
+    return subprocess.run(
+        [sys.executable, "-m", "alembic", *args], cwd=MIGRATIONS.parent, env={**os.environ, **env},
+        capture_output=True, text=True, timeout=120,
+    )
+
+
+@pytest.mark.parametrize("separate_telemetry_db", [False, True])
+def test_upgrade_head_matches_models(tmp_path, separate_telemetry_db):
+    env = {
+        "DATABASE_CONNECTION": f"sqlite:///{tmp_path / 'main.db'}",
+        "TELEMETRY_DATABASE_CONNECTION": f"sqlite:///{tmp_path / 'telemetry.db'}" if separate_telemetry_db else "",
+    }
+
+    upgrade = run_alembic("upgrade", "head", env=env)
+    assert upgrade.returncode == 0, upgrade.stderr
+    check = run_alembic("check", env=env)
+    assert check.returncode == 0, check.stderr
+    assert "No new upgrade operations detected" in check.stdout
+
+
+def test_upgrade_converts_legacy_jwt_columns_to_digests(alembic_config, single_engine):
+    # Schema trước khi lưu digest: bảng token giữ JWT gốc
+    legacy = MetaData()
+    blacklisted = Table(
+        "blacklisted_tokens", legacy,
+        Column("id", Integer, primary_key=True), Column("token", String(500), nullable=False),
+        Column("blacklisted_at", DateTime),
+    )
+    usage = Table(
+        "token_usage_log", legacy,
+        Column("id", Integer, primary_key=True), Column("token", String(500), nullable=False, index=True),
+        Column("requested_at", DateTime),
+    )
+    active = Table(
+        "active_access_tokens", legacy,
+        Column("id", Integer, primary_key=True), Column("user_id", Integer, index=True),
+        Column("access_token", String(255), unique=True), Column("created_at", DateTime),
+        Column("expires_at", DateTime),
+    )
+    legacy.create_all(single_engine)
+    now = datetime.utcnow()
+    with single_engine.begin() as connection:
+        connection.execute(insert(blacklisted), [{"token": "jwt-revoked", "blacklisted_at": now}])
+        connection.execute(insert(usage), [{"token": "jwt-a", "requested_at": now}] * 3)
+        connection.execute(insert(active), [
+            {"user_id": 1, "access_token": "jwt-a", "created_at": now, "expires_at": now + timedelta(minutes=30)},
+        ])
+
+    command.upgrade(alembic_config, "head")
+    command.check(alembic_config)
+
+    for name, old_column in (
+        ("blacklisted_tokens", "token"), ("token_usage_log", "token"), ("active_access_tokens", "access_token"),
+    ):
+        columns = {column["name"] for column in inspect(single_engine).get_columns(name)}
+        assert "token_digest" in columns and old_column not in columns
+    assert not [name for name in inspect(single_engine).get_table_names() if name.endswith("_legacy")]
+
+    with single_engine.connect() as connection:
+        digests = connection.execute(select(Table("token_usage_log", MetaData(), autoload_with=connection).c.token_digest))
+        assert [digest for (digest,) in digests] == [token_digest("jwt-a")] * 3
+
+    db = sessionmaker(bind=single_engine)()
+    try:
+        assert BlacklistedTokenRepository(db).is_blacklisted(token_digest("jwt-revoked"))
+        assert not BlacklistedTokenRepository(db).is_blacklisted(token_digest("jwt-a"))
+        assert ActiveAccessTokenRepository(db).get_digests_by_user_ids([1]) == [token_digest("jwt-a")]
+        assert ActiveAccessTokenRepository(db).delete_token(token_digest("jwt-a")) is True
+    finally:
+        db.close()
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.cores import auth
+from app.cores.password_hasher import PasswordHashPool
+from app.main import app
+
+client = TestClient(app, base_url="https://testserver")
+
+
+def add(a, b):
+    return a + b
+
+
+@pytest.fixture
+def pool():
+    pool = PasswordHashPool(kind="thread", workers=1, queue_limit=0)
+    yield pool
+    pool.shutdown()
+
+
+def test_run_returns_result_and_records_metrics(pool):
+    assert asyncio.run(pool.run("hash", add, 1, 2)) == 3
+    assert asyncio.run(pool.run("hash", add, 2, 2)) == 4
+
+    stats = pool.stats()
+    assert stats["kind"] == "thread" and stats["workers"] == 1 and stats["queue_limit"] == 0
+    assert stats["operations"]["hash"]["count"] == 2
+    assert stats["operations"]["hash"]["rejected"] == 0
+    assert stats["operations"]["hash"]["max_ms"] >= stats["operations"]["hash"]["avg_ms"] >= 0
+
+
+def test_waiting_for_the_pool_does_not_block_the_event_loop(pool):
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.create_task(pool.run("verify", release.wait, 5))
+        await asyncio.sleep(0.05)
+        # Event loop vẫn chạy trong lúc tác vụ bcrypt (giả) đang chờ trên pool
+        assert not task.done()
+        release.set()
+        return await task
+
+    assert asyncio.run(asyncio.wait_for(scenario(), timeout=5)) is True
+
+
+def test_full_pool_rejects_with_503_and_retry_after(pool):
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.create_task(pool.run("verify", release.wait, 5))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(HTTPException) as exc_info:
+                await pool.run("verify", add, 1, 1)
+        finally:
+            release.set()
+            await task
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "1"}
+    verify_stats = pool.stats()["operations"]["verify"]
+    assert verify_stats["count"] == 1
+    assert verify_stats["rejected"] == 1
+    # Slot được trả lại sau khi tác vụ xong
+    assert asyncio.run(pool.run("verify", add, 1, 1)) == 2
+
+
+def test_login_returns_503_when_hash_pool_is_full(monkeypatch, pool, register_user, login_user):
+    _, username = register_user("hp", "Hash Pool")
+
+    monkeypatch.setattr(auth, "hash_pool", pool)
+    assert pool._slots.acquire(blocking=False)
+    try:
+        response = client.post("/api/v1/auth/login", data={"username": username, "password": "testpassword"})
+    finally:
+        pool._slots.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert pool.stats()["operations"]["verify"]["rejected"] == 1
+
+    login_user(username)
+    assert pool.stats()["operations"]["verify"]["count"] == 1
@@ -0,0 +1,63 @@
+import pytest
+from passlib.hash import bcrypt
+
+from app.cores.config import BCRYPT_ROUNDS
+from app.cores.database import SessionLocal
+from app.models.users import User
+
+# Mật khẩu register_user/login_user dùng
+PASSWORD = "testpassword"
+
+
+def rounds(password_hash: str) -> int:
+    # $2b$<cost>$<salt + checksum>
+    return int(password_hash.split("$")[2])
+
+
+def stored_hash(username: str) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(User.password).filter(User.username == username).scalar()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def username(register_user):
+    return register_user("rh", "Rehash")[1]
+
+
+def set_hash(username: str, password_hash: str):
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.username == username).update({User.password: password_hash})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_register_hashes_with_configured_cost(username):
+    assert rounds(stored_hash(username)) == BCRYPT_ROUNDS
+
+
+@pytest.mark.parametrize("cost", [max(4, BCRYPT_ROUNDS - 2), BCRYPT_ROUNDS + 1])
+def test_login_rehashes_hash_with_other_cost(username, login_user, cost):
+    old_hash = bcrypt.using(rounds=cost).hash(PASSWORD)
+    set_hash(username, old_hash)
+
+    login_user(username)
+
+    new_hash = stored_hash(username)
+    assert new_hash != old_hash
+    assert rounds(new_hash) == BCRYPT_ROUNDS
+    assert bcrypt.verify(PASSWORD, new_hash)
+    # Hash mới vẫn đăng nhập được
+    login_user(username)
+
+
+def test_login_keeps_hash_with_configured_cost(username, login_user):
+    current_hash = stored_hash(username)
+
+    login_user(username)
+
+    assert stored_hash(username) == current_hash
@@ -0,0 +1,156 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.cores import post_search
+from app.cores.post_search import Fts5PostIndex, InvertedPostIndex, get_post_search_index, tokenize
+from app.cores.database import SessionLocal
+from app.main import app
+from app.services.user_service import UserService
+
+client = TestClient(app)
+
+POSTS = [
+    (1, "Bảo mật JWT", "cách xoay vòng refresh token"),
+    (2, "Rate limit", "giới hạn số request theo token"),
+    (3, "Nhật ký", "ghi log token và refresh token định kỳ"),
+    (4, "Refresh token", "token token token"),
+]
+
+
+@pytest.fixture(params=["memory", "fts5"])
+def index(request, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    db = sessionmaker(bind=engine)()
+    index = InvertedPostIndex() if request.param == "memory" else Fts5PostIndex()
+    index.rebuild(db, POSTS)
+    yield index, db
+    db.close()
+    engine.dispose()
+
+
+def test_import_does_not_open_a_db_connection(tmp_path):
+    # Process riêng: trong pytest app.main đã được import và lifespan đã chọn backend
+    code = (
+        "from sqlalchemy import event\n"
+        "from app.cores.database import engine\n"
+        "connections = []\n"
+        "event.listen(engine, 'connect', lambda *args: connections.append(args))\n"
+        "from app.cores import post_search\n"
+        "assert post_search._post_search_index is None and connections == []\n"
+        "assert post_search.get_post_search_index().backend in ('fts5', 'memory') and connections\n"
+    )
+    env = {**os.environ, "DATABASE_CONNECTION": f"sqlite:///{tmp_path / 'lazy.db'}", "POST_SEARCH_BACKEND": "auto"}
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def test_backend_is_selected_once_on_first_use(monkeypatch):
+    calls = []
+
+    def create(backend, bind):
+        calls.append(backend)
+        return InvertedPostIndex()
+
+    monkeypatch.setattr(post_search, "_post_search_index", None)
+    monkeypatch.setattr(post_search, "create_post_search_index", create)
+
+    index = get_post_search_index()
+
+    assert get_post_search_index() is index
+    assert calls == [post_search.POST_SEARCH_BACKEND]
+
+
+def test_tokenize_folds_case_and_diacritics():
+    assert tokenize("Bảo MẬT, JWT!") == ["bao", "mat", "jwt"]
+
+
+def test_search_requires_every_term_and_ranks_title_matches_first(index):
+    index, db = index
+    ranked = [post_id for post_id, _ in index.search(db, "refresh token", 10)]
+    assert ranked[0] == 4
+    assert sorted(ranked) == [1, 3, 4]
+    assert index.search(db, "bao mat", 10)[0][0] == 1
+    assert index.search(db, "token kubernetes", 10) == []
+    assert index.search(db, '" OR * NEAR(', 10) == []
+
+
+def test_keyset_pages_do_not_overlap(index):
+    index, db = index
+    first = index.search(db, "token", 2)
+    post_id, score = first[-1]
+    second = index.search(db, "token", 2, after=(score, post_id))
+
+    assert [hit[0] for hit in first + second] == [hit[0] for hit in index.search(db, "token", 10)]
+    assert len(first + second) == 4
+
+
+def test_incremental_update_and_remove(index):
+    index, db = index
+    index.index_post(db, 2, "Rate limit", "bucket theo ip")
+    index.remove_post(db, 3)
+    db.commit()
+
+    assert [post_id for post_id, _ in index.search(db, "token", 10)] == [4, 1]
+    assert [post_id for post_id, _ in index.search(db, "bucket", 10)] == [2]
+
+
+def test_remove_posts_drops_every_id(index):
+    index, db = index
+    index.remove_posts(db, [1, 4])
+    db.commit()
+
+    assert [post_id for post_id, _ in index.search(db, "token", 10)] == [3, 2]
+    assert [post_id for post_id, _ in index.search(db, "refresh", 10)] == [3]
+
+
+def test_search_endpoint_follows_post_changes(auth_headers):
+    headers = auth_headers("ps", "Search Author")
+    word = f"kw{uuid.uuid4().hex[:10]}"
+
+    ids = [
+        client.post("/api/v1/posts/", json={"title": f"{word} {i}", "content": "search content"}, headers=headers).json()["id"]
+        for i in range(3)
+    ]
+    client.put(f"/api/v1/posts/{ids[0]}", json={"title": "renamed", "content": "nothing here"}, headers=headers)
+    client.delete(f"/api/v1/posts/{ids[1]}", headers=headers)
+
+    response = client.get(f"/api/v1/posts/search?q={word}&limit=1", headers=headers)
+    assert response.status_code == 200
+    assert [post["id"] for post in response.json()] == [ids[2]]
+    assert "X-Next-Cursor" not in response.headers
+    assert client.get("/api/v1/posts/search?q=x&cursor=bad", headers=headers).status_code == 400
+
+
+def test_deleting_user_removes_their_posts_from_the_index(register_user, login_user, auth_headers):
+    author_id, author = register_user("pd", "Search Author")
+    author_headers = {"Authorization": f"Bearer {login_user(author)['access_token']}"}
+    reader_headers = auth_headers("pr", "Search Reader")
+    word = f"kw{uuid.uuid4().hex[:10]}"
+    ids = [
+        client.post("/api/v1/posts/", json={"title": f"{word} {i}", "content": "search content"}, headers=author_headers).json()["id"]
+        for i in range(2)
+    ]
+    assert len(client.get(f"/api/v1/posts/search?q={word}", headers=reader_headers).json()) == 2
+
+    db = SessionLocal()
+    try:
+        UserService(db).delete_user(author_id)
+        assert get_post_search_index().search(db, word, 10) == []
+        if isinstance(get_post_search_index(), Fts5PostIndex):
+            rows = db.execute(
+                text("SELECT rowid FROM posts_fts WHERE rowid IN (:a, :b)"), {"a": ids[0], "b": ids[1]}
+            ).all()
+            assert rows == []
+    finally:
+        db.close()
+
+    response = client.get(f"/api/v1/posts/search?q={word}", headers=reader_headers)
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def author(register_user, login_user):
+    user_id, username = register_user("pg", "Paging Author")
+    headers = {"Authorization": f"Bearer {login_user(username)['access_token']}"}
+    post_ids = []
+    for i in range(5):
+        title = f"keyset post {i}" if i % 2 else f"other post {i}"
+        response = client.post("/api/v1/posts/", json={"title": title, "content": "paging content"}, headers=headers)
+        assert response.status_code == 200
+        post_ids.append(response.json()["id"])
+    return username, user_id, post_ids
+
+
+@pytest.fixture
+def headers(author, login_user):
+    # Mỗi test dùng token riêng để không chạm giới hạn rate limit theo token
+    return {"Authorization": f"Bearer {login_user(author[0])['access_token']}"}
+
+
+def test_cursor_walks_all_pages(author, headers):
+    _, _, post_ids = author
+    seen, url, pages = [], "/api/v1/posts/me?limit=2", 0
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen.extend(post["id"] for post in response.json())
+        pages += 1
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor:
+            assert 'rel="next"' in response.headers["Link"]
+            url = f"/api/v1/posts/me?limit=2&cursor={next_cursor}"
+        else:
+            url = None
+
+    assert seen == post_ids
+    assert pages == 3
+
+
+def test_offset_and_filters_still_work(author, headers):
+    _, user_id, post_ids = author
+
+    response = client.get(f"/api/v1/posts/users/{user_id}?offset=3&limit=10", headers=headers)
+    assert [post["id"] for post in response.json()] == post_ids[3:]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/api/v1/posts/me?title=keyset", headers=headers)
+    assert [post["id"] for post in response.json()] == [post_ids[1], post_ids[3]]
+
+
+def test_invalid_paging_parameters_are_rejected(headers):
+    assert client.get("/api/v1/posts/me?cursor=not-a-cursor", headers=headers).status_code == 400
+    assert client.get("/api/v1/posts/me?cursor=eyJpZCI6MX0&offset=2", headers=headers).status_code == 400
+    assert client.get("/api/v1/posts/?limit=1000", headers=headers).status_code == 422
@@ -0,0 +1,46 @@
+from app.cores.rate_limiter_engine import MemoryRateLimiterEngine
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_memory_engine_limits_after_max_requests():
+    engine = MemoryRateLimiterEngine(max_keys=10, clock=FakeClock())
+
+    results = [engine.is_rate_limited("token-a", 10, 10) for _ in range(11)]
+
+    assert results[:10] == [False] * 10
+    assert results[10] is True
+    assert engine.is_rate_limited("token-b", 10, 10) is False
+
+
+def test_memory_engine_window_slides():
+    clock = FakeClock()
+    engine = MemoryRateLimiterEngine(max_keys=10, clock=clock)
+    for _ in range(10):
+        engine.is_rate_limited("token-a", 10, 10)
+
+    # Nửa cửa sổ sau: vẫn còn khoảng 5 request được tính
+    clock.now += 15
+    assert engine.is_rate_limited("token-a", 10, 10) is False
+
+    clock.now += 20
+    assert engine.is_rate_limited("token-a", 10, 10) is False
+
+
+def test_memory_engine_evicts_idle_and_excess_keys():
+    clock = FakeClock()
+    engine = MemoryRateLimiterEngine(max_keys=2, clock=clock)
+    engine.is_rate_limited("token-a", 10, 10)
+    engine.is_rate_limited("token-b", 10, 10)
+    engine.is_rate_limited("token-c", 10, 10)
+    assert engine.stats()["keys"] == 2
+
+    clock.now += 100
+    engine.is_rate_limited("token-d", 10, 10)
+    assert engine.stats()["keys"] == 1
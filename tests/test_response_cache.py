@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+
+from app.cores.response_cache import CachedResponse, ResponseCache, make_etag
+from app.main import app
+from app.middleware.response_cache import etag_matches
+
+client = TestClient(app)
+
+
+def entry(body: bytes, *tags: str) -> CachedResponse:
+    return CachedResponse(status=200, headers=[], body=body, etag=make_etag(body), tags=frozenset(tags))
+
+
+def test_invalidate_removes_only_tagged_entries():
+    cache = ResponseCache(max_entries=10)
+    cache.put("/a", entry(b"a", "posts:list"), 60, cache.versions(["posts:list"]))
+    cache.put("/b", entry(b"b", "post:1"), 60, cache.versions(["post:1"]))
+
+    cache.invalidate("post:1")
+
+    assert cache.get("/a").body == b"a"
+    assert cache.get("/b") is None
+
+
+def test_response_built_before_invalidation_is_not_stored():
+    cache = ResponseCache(max_entries=10)
+    versions = cache.versions(["post:1"])
+    cache.invalidate("post:1")
+
+    assert not cache.put("/b", entry(b"stale", "post:1"), 60, versions)
+    assert cache.get("/b") is None
+    assert cache.stats()["stale_skips"] == 1
+
+
+def test_etag_matching():
+    etag = make_etag(b"body")
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+
+
+def test_conditional_get_and_invalidation_on_update(auth_headers, statements):
+    headers = auth_headers("rc", "Response Cache")
+    post = client.post("/api/v1/posts/", json={"title": "cached", "content": "first body"}, headers=headers).json()
+    url = f"/api/v1/posts/{post['id']}"
+
+    first = client.get(url, headers=headers)
+    assert first.headers["X-Cache"] == "MISS"
+    etag = first.headers["ETag"]
+
+    statements.clear()
+    revalidated = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert not [s for s in statements if "FROM posts" in s]
+
+    client.put(url, json={"title": "cached", "content": "second body"}, headers=headers)
+    updated = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["content"] == "second body"
+    assert updated.headers["ETag"] != etag
+
+
+def test_blocking_user_invalidates_user_and_post_reads(auth_headers):
+    headers = auth_headers("rc", "Response Cache")
+    post = client.post("/api/v1/posts/", json={"title": "owner", "content": "will be blocked"}, headers=headers).json()
+    user_id = post["user_id"]
+    reader = auth_headers("rc", "Response Cache")
+
+    assert client.get(f"/api/v1/users/{user_id}", headers=reader).status_code == 200
+    assert client.get(f"/api/v1/posts/{post['id']}", headers=reader).status_code == 200
+    assert client.get(f"/api/v1/posts/{post['id']}", headers=reader).headers["X-Cache"] == "HIT"
+
+    assert client.delete("/api/v1/users/me", headers=headers).status_code == 200
+
+    assert client.get(f"/api/v1/users/{user_id}", headers=reader).status_code == 403
+    assert client.get(f"/api/v1/posts/{post['id']}", headers=reader).status_code == 403
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, insert, inspect, select
+
+from app.cores import database
+from app.cores.database import RoutingSession, create_all_tables
+from app.cores.telemetry_storage import BucketedTable
+from app.models import active_access_tokens, posts, sessions  # noqa: F401 (đăng ký mọi model)
+from app.models.blacklisted_tokens import BlacklistedToken
+from app.models.token_logs import TokenLog
+from app.models.token_usage_log import TokenUsageLog
+from app.models.users import GenderEnum, User
+from app.repositories.bulk import delete_in_chunks
+
+
+@pytest.fixture
+def engines(monkeypatch, tmp_path):
+    main = create_engine(f"sqlite:///{tmp_path / 'main.db'}", connect_args={"timeout": 0.2})
+    telemetry = create_engine(f"sqlite:///{tmp_path / 'telemetry.db'}", connect_args={"timeout": 0.2})
+    monkeypatch.setattr(database, "engine", main)
+    monkeypatch.setattr(database, "telemetry_engine", telemetry)
+    create_all_tables()
+    yield main, telemetry
+    main.dispose()
+    telemetry.dispose()
+
+
+def test_tables_are_created_on_their_own_engine(engines):
+    main, telemetry = engines
+
+    assert {"users", "posts", "sessions"} <= set(inspect(main).get_table_names())
+    assert not {"token_logs", "token_usage_log"} & set(inspect(main).get_table_names())
+    assert set(inspect(telemetry).get_table_names()) == {
+        "token_logs", "token_usage_log", "blacklisted_tokens", "active_access_tokens",
+    }
+
+
+def test_session_routes_orm_and_core_statements(engines):
+    main, telemetry = engines
+    db = RoutingSession(bind=main)
+    try:
+        db.add(User(username="alice", email="a@example.com", password="x", fullname="Alice", gender=GenderEnum.other))
+        db.add(TokenLog(user_id=1, username="alice", ip_address="127.0.0.1", action="login"))
+        db.execute(insert(TokenUsageLog), [{"token_digest": "a", "requested_at": datetime.utcnow()}])
+        db.commit()
+
+        assert db.query(User).count() == 1
+        assert db.query(TokenLog).count() == 1
+        assert db.execute(select(func.count()).select_from(TokenUsageLog)).scalar_one() == 1
+        assert delete_in_chunks(db, TokenUsageLog, TokenUsageLog.token_digest == "a") == 1
+    finally:
+        db.close()
+
+    with telemetry.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(TokenLog.__table__)).scalar_one() == 1
+
+
+def test_bucket_tables_follow_the_base_table(engines):
+    main, telemetry = engines
+    db = RoutingSession(bind=main)
+    try:
+        buckets = BucketedTable(BlacklistedToken.__table__, "blacklisted_at", "hour")
+        buckets.insert(db, [{"token_digest": "d", "blacklisted_at": datetime.utcnow()}])
+        db.commit()
+        assert buckets.bind(db) is telemetry
+    finally:
+        db.close()
+
+    assert any(name.startswith("blacklisted_tokens_") for name in inspect(telemetry).get_table_names())
+    assert not any(name.startswith("blacklisted_tokens_") for name in inspect(main).get_table_names())
+
+
+def test_telemetry_writes_do_not_lock_the_main_database(engines):
+    main, telemetry = engines
+    telemetry_db = RoutingSession(bind=main)
+    db = RoutingSession(bind=main)
+    try:
+        # Transaction ghi đang mở trên DB telemetry giữ khóa ghi của file telemetry.db
+        telemetry_db.execute(insert(TokenUsageLog), [{"token_digest": "a", "requested_at": datetime.utcnow()}])
+
+        db.add(User(username="bob", email="b@example.com", password="x", fullname="Bob", gender=GenderEnum.other))
+        db.commit()
+        assert db.query(User).filter(User.username == "bob").count() == 1
+    finally:
+        telemetry_db.rollback()
+        telemetry_db.close()
+        db.close()
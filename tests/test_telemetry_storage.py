@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.cores.database import Base
+from app.cores.telemetry_storage import TelemetryStorage
+from app.models import active_access_tokens, posts, sessions, users  # noqa: F401 (đăng ký mọi model)
+from app.repositories import blacklist_token_repository, rate_limiter_repository, token_log_repository
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+from app.repositories.rate_limiter_repository import RateLimiterRepository
+from app.repositories.token_log_repository import TokenLogRepository
+from app.schemas.blacklist_token import BlacklistedTokenCreate
+from app.schemas.token_log import TokenLogCreate
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'telemetry.db'}")
+    Base.metadata.create_all(engine)
+    storage = TelemetryStorage(mode="bucketed", granularity={
+        "token_usage_log": "hour", "blacklisted_tokens": "hour", "token_logs": "day",
+    })
+    for module in (blacklist_token_repository, rate_limiter_repository, token_log_repository):
+        monkeypatch.setattr(module, "telemetry_storage", storage)
+    db = sessionmaker(bind=engine)()
+    yield storage, db, engine
+    db.close()
+    engine.dispose()
+
+
+def table_names(engine, prefix):
+    return sorted(name for name in inspect(engine).get_table_names() if name.startswith(prefix + "_"))
+
+
+def test_usage_is_written_to_hourly_buckets_and_counted_across_them(storage):
+    storage, db, engine = storage
+    now = datetime.utcnow()
+    repo = RateLimiterRepository(db)
+    repo.bulk_log_token_usage([
+        {"token_digest": "a", "requested_at": now - timedelta(hours=1)},
+        {"token_digest": "a", "requested_at": now},
+        {"token_digest": "a", "requested_at": now - timedelta(hours=5)},
+        {"token_digest": "b", "requested_at": now},
+    ])
+
+    assert len(table_names(engine, "token_usage_log")) == 3
+    assert inspect(engine).get_table_names().count("token_usage_log") == 1
+    assert repo.count_token_usage("a", now - timedelta(hours=2)) == 2
+    assert repo.count_token_usage("a", now - timedelta(hours=6)) == 3
+
+
+def test_bucket_indexes_get_unique_names(storage):
+    storage, db, engine = storage
+    now = datetime.utcnow()
+    storage.ensure_buckets(engine, now)
+
+    names = [
+        index["name"]
+        for table in table_names(engine, "token_logs")
+        for index in inspect(engine).get_indexes(table)
+    ]
+    suffix = storage.tables["token_logs"].bucket_start(now).strftime("%Y%m%d")
+    assert len(table_names(engine, "token_logs")) == 2
+    assert f"idx_token_logs_user_action_time_{suffix}" in names
+    assert len(names) == len(set(names))
+
+
+def test_drop_before_removes_whole_expired_buckets(storage):
+    storage, db, engine = storage
+    now = datetime.utcnow()
+    repo = RateLimiterRepository(db)
+    repo.bulk_log_token_usage([
+        {"token_digest": "a", "requested_at": now - timedelta(hours=3)},
+        {"token_digest": "a", "requested_at": now},
+    ])
+
+    assert repo.delete_expired_tokens(now - timedelta(hours=1)) == 1
+    assert len(table_names(engine, "token_usage_log")) == 1
+    assert repo.count_token_usage("a", now - timedelta(hours=4)) == 1
+
+
+def test_blacklist_and_token_logs_read_from_buckets(storage):
+    storage, db, engine = storage
+    blacklist = BlacklistedTokenRepository(db)
+    blacklist.add(BlacklistedTokenCreate(token_digest="revoked"))
+    assert blacklist.is_blacklisted("revoked")
+    assert not blacklist.is_blacklisted("other")
+    assert [digest for digest, _ in blacklist.get_all_digests()] == ["revoked"]
+
+    logs = TokenLogRepository(db)
+    for action in ("login", "refresh", "login"):
+        logs.create(TokenLogCreate(user_id=1, username="alice", ip_address="1.1.1.1", user_agent="ua", action=action))
+
+    last = logs.get_last_log(1, "login")
+    assert last is not None and isinstance(last.timestamp, datetime)
+    assert logs.get_last_log(2, "login") is None
+    assert [log.action for log in logs.get_paginated(skip=1, limit=5)] == ["refresh", "login"]
+    assert logs.delete_expired_logs(datetime.utcnow() - timedelta(days=90)) == 0
+
+
+def test_last_log_only_reads_buckets_inside_since(storage):
+    storage, db, engine = storage
+    now = datetime.utcnow()
+    buckets = storage.tables["token_logs"]
+    # Một log cũ ở mỗi ngày trong 30 ngày trước, không có log nào trong khoảng since
+    buckets.insert(db, [
+        {"user_id": 1, "username": "alice", "ip_address": "1.1.1.1", "action": "login",
+         "timestamp": now - timedelta(days=day)}
+        for day in range(1, 31)
+    ])
+    db.commit()
+    logs = TokenLogRepository(db)
+    assert logs.get_last_log(1, "login").timestamp.date() == (now - timedelta(days=1)).date()
+
+    selects = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "token_logs_" in statement:
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert logs.get_last_log(1, "login", since=now - timedelta(minutes=2)) is None
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    # Chỉ bucket của hôm nay (nếu có) và hôm qua khi since vắt qua nửa đêm, thay vì cả 30 bucket
+    assert len(selects) <= 2
+
+    logs.create(TokenLogCreate(user_id=1, username="alice", ip_address="2.2.2.2", user_agent="ua", action="login"))
+    last = logs.get_last_log(1, "login", since=now - timedelta(minutes=2))
+    assert last is not None and last.ip_address == "2.2.2.2"
@@ -0,0 +1,52 @@
+import time
+
+from app.cores.auth_utils import Principal
+from app.cores.token_cache import VerifiedTokenCache
+from app.models.users import RoleEnum
+
+PRINCIPAL = Principal(id=1, username="testuser", role=RoleEnum.user, status=True)
+
+
+def test_cache_hit_and_miss_counters():
+    cache = VerifiedTokenCache(max_size=10, ttl_seconds=60)
+    assert cache.get("token-a") is None
+
+    cache.set("token-a", PRINCIPAL)
+    assert cache.get("token-a") == PRINCIPAL
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_respects_token_exp():
+    cache = VerifiedTokenCache(max_size=10, ttl_seconds=60)
+    cache.set("token-a", PRINCIPAL, exp=time.time() - 1)
+    assert cache.get("token-a") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2, ttl_seconds=60)
+    cache.set("token-a", PRINCIPAL)
+    cache.set("token-b", PRINCIPAL)
+    cache.get("token-a")
+    cache.set("token-c", PRINCIPAL)
+
+    assert cache.get("token-b") is None
+    assert cache.get("token-a") == PRINCIPAL
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_token_and_user():
+    cache = VerifiedTokenCache(max_size=10, ttl_seconds=60)
+    other = Principal(id=2, username="other", role=RoleEnum.user, status=True)
+    cache.set("token-a", PRINCIPAL)
+    cache.set("token-b", PRINCIPAL)
+    cache.set("token-c", other)
+
+    cache.invalidate_token("token-a")
+    assert cache.get("token-a") is None
+
+    cache.invalidate_user(PRINCIPAL.id)
+    assert cache.get("token-b") is None
+    assert cache.get("token-c") == other
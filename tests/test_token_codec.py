@@ -0,0 +1,91 @@
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from jose import ExpiredSignatureError, JWTError
+
+from app.cores.token_codec import CODECS, _b64encode, create_token_codec
+
+SECRET = "test-secret-0123456789abcdefghijkl"
+
+
+def available_backends():
+    backends = []
+    for name in CODECS:
+        try:
+            create_token_codec(name, SECRET, "HS256")
+        except RuntimeError:
+            continue
+        backends.append(name)
+    return backends
+
+
+BACKENDS = available_backends()
+
+
+@pytest.mark.parametrize("encoder", BACKENDS)
+@pytest.mark.parametrize("decoder", BACKENDS)
+def test_backends_are_interchangeable(encoder, decoder):
+    claims = {"sub": "alice", "jti": "abc", "exp": datetime.now(UTC) + timedelta(minutes=5)}
+    token = create_token_codec(encoder, SECRET, "HS256").encode(claims)
+
+    payload = create_token_codec(decoder, SECRET, "HS256").decode(token)
+
+    assert payload["sub"] == "alice"
+    assert payload["jti"] == "abc"
+    assert payload["exp"] == int(claims["exp"].timestamp())
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_expired_token_raises_expired_signature(backend):
+    codec = create_token_codec(backend, SECRET, "HS256")
+    token = codec.encode({"sub": "alice", "exp": datetime.now(UTC) - timedelta(minutes=1)})
+
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(token)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_wrong_secret_and_garbage_raise_jwt_error(backend):
+    token = create_token_codec(backend, "other-secret-0123456789abcdefghijk", "HS256").encode({"sub": "alice"})
+    codec = create_token_codec(backend, SECRET, "HS256")
+
+    with pytest.raises(JWTError):
+        codec.decode(token)
+    with pytest.raises(JWTError):
+        codec.decode("not-a-token")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_algorithm_outside_allowed_set_is_rejected(backend):
+    token = create_token_codec("jose", SECRET, "HS512").encode({"sub": "alice"})
+
+    with pytest.raises(JWTError):
+        create_token_codec(backend, SECRET, "HS256").decode(token)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_token_codec("nope", SECRET, "HS256")
+
+
+def signed_token(header, payload) -> str:
+    signing_input = _b64encode(json.dumps(header).encode()) + b"." + _b64encode(json.dumps(payload).encode())
+    signature = hmac.new(SECRET.encode(), signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64encode(signature)).decode()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("token", [
+    "W10.e30.AAAA",  # header "[]"
+    "e30.W10.AAAA",  # payload "[]"
+    "MQ.MQ.AAAA",  # header và payload là số
+    signed_token({"alg": "HS256", "typ": "JWT"}, ["alice"]),
+    signed_token({"alg": "HS256", "typ": "JWT"}, "alice"),
+    signed_token(["HS256"], {"sub": "alice"}),
+])
+def test_non_object_header_or_payload_raises_jwt_error(backend, token):
+    with pytest.raises(JWTError):
+        create_token_codec(backend, SECRET, "HS256").decode(token)
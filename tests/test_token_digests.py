@@ -0,0 +1,70 @@
+import hashlib
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cores.auth import token_digest
+from app.cores.database import SessionLocal
+from app.main import app
+from app.models.active_access_tokens import ActiveAccessToken
+from app.models.blacklisted_tokens import BlacklistedToken
+from app.models.token_usage_log import TokenUsageLog
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+from app.services.rate_limiter_service import RateLimiterService
+
+client = TestClient(app, base_url="https://testserver")
+
+
+@pytest.fixture
+def access_token(register_user, login_user):
+    # Đăng nhập qua client của module để logout có cookie refresh token
+    return login_user(register_user("dg", "Digest")[1], via=client)["access_token"]
+
+
+def test_token_digest_is_sha256_hex():
+    assert token_digest("abc") == hashlib.sha256(b"abc").hexdigest()
+    assert len(token_digest("abc")) == 64
+
+
+def test_login_stores_only_the_access_token_digest(access_token):
+    db = SessionLocal()
+    try:
+        rows = db.query(ActiveAccessToken).filter(ActiveAccessToken.token_digest == token_digest(access_token)).all()
+        assert len(rows) == 1
+        assert access_token not in {row.token_digest for row in db.query(ActiveAccessToken)}
+    finally:
+        db.close()
+
+    response = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+
+
+def test_logout_blacklists_the_digest(access_token):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = client.post("/api/v1/auth/logout", headers=headers)
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        digest = token_digest(access_token)
+        assert BlacklistedTokenRepository(db).is_blacklisted(digest)
+        assert db.query(BlacklistedToken).filter(BlacklistedToken.token_digest == access_token).count() == 0
+        assert db.query(ActiveAccessToken).filter(ActiveAccessToken.token_digest == digest).count() == 0
+    finally:
+        db.close()
+
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 401
+
+
+def test_sql_rate_limiter_logs_and_counts_digests():
+    token = f"raw-token-{uuid.uuid4().hex}"
+    db = SessionLocal()
+    try:
+        service = RateLimiterService(db)
+        assert [service.is_rate_limited(token, 2, 10) for _ in range(3)] == [False, False, True]
+        assert db.query(TokenUsageLog).filter(TokenUsageLog.token_digest == token_digest(token)).count() == 3
+        assert db.query(TokenUsageLog).filter(TokenUsageLog.token_digest == token).count() == 0
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+
+from app.cores import auth
+from app.cores.token_cache import token_cache
+from app.cores.token_versions import TokenVersionTable, token_versions
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_load_racing_with_bump_is_not_stored():
+    table = TokenVersionTable(max_size=10, ttl_seconds=60)
+
+    def loader():
+        # token_version được tăng trong lúc đang đọc giá trị cũ
+        table.set(1, 1)
+        return 0
+
+    assert table.get_or_load(1, loader) == 0
+    assert table.get(1) == 1
+    assert table.stats()["stale_skips"] == 1
+    assert table.stats()["bumps"] == 1
+
+    table.discard(1)
+    assert table.get(1) is None
+
+
+def test_token_claims_authorize_without_reading_users(register_user, login_user, statements):
+    _, username = register_user("tv", "Token Version")
+    data = login_user(username)
+    token = data["access_token"]
+    claims = auth.decode_token(token)
+    assert (claims["uid"], claims["role"], claims["ver"]) == (data["id"], "user", 0)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    token_cache.clear()
+    statements.clear()
+
+    response = client.get("/api/v1/posts/", headers=headers)
+
+    assert response.status_code == 200
+    assert not [s for s in statements if "FROM users" in s]
+
+
+def test_password_change_revokes_issued_tokens(register_user, login_user):
+    _, username = register_user("tv", "Token Version")
+    data = login_user(username)
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+    legacy = auth.create_access_token(data={"sub": username})
+    assert client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {legacy}"}).status_code == 200
+
+    response = client.patch("/api/v1/users/me/change-password", headers=headers, json={
+        "password_old": "testpassword",
+        "password": "newpassword",
+        "password_confirmation": "newpassword",
+    })
+    assert response.status_code == 200
+    assert token_versions.get(data["id"]) == 1
+
+    for token in (data["access_token"], legacy):
+        response = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token has been revoked"
+
+    response = client.post("/api/v1/auth/login", data={"username": username, "password": "newpassword"})
+    assert auth.decode_token(response.json()["data"]["access_token"])["ver"] == 1
@@ -0,0 +1,111 @@
+from app.cores.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 2
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=1)
+
+    clock.now = 5
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_get_or_load_caches_only_non_none_values():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    calls = []
+
+    def loader(value):
+        def load():
+            calls.append(value)
+            return value
+        return load
+
+    assert cache.get_or_load("missing", loader(None)) is None
+    assert cache.get_or_load("missing", loader(None)) is None
+    assert cache.get_or_load("a", loader(1)) == 1
+    assert cache.get_or_load("a", loader(2)) == 1
+    assert calls == [None, None, 1]
+
+
+def test_load_racing_with_a_write_is_not_stored():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+
+    def invalidated_while_loading():
+        cache.invalidate("a")
+        return "stale"
+
+    def set_while_loading():
+        cache.set("b", "new")
+        return "old"
+
+    assert cache.get_or_load("a", invalidated_while_loading) == "stale"
+    assert cache.get("a") is None
+    assert cache.get_or_load("b", set_while_loading) == "old"
+    assert cache.get("b") == "new"
+    assert cache.stats()["stale_skips"] == 2
+
+
+def test_invalidate_where_removes_matching_entries():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    assert cache.invalidate_where(lambda key, value: value in ("A", "C")) == 2
+
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.get("b") == "B"
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_subclass_hooks_track_every_removal():
+    class Indexed(TTLCache):
+        def __init__(self):
+            super().__init__(max_size=2, ttl_seconds=60)
+            self.index = {}
+
+        def _on_store(self, key, value):
+            self.index[value] = key
+
+        def _on_remove(self, key, value):
+            del self.index[value]
+
+    cache = Indexed()
+    cache.set(1, "a")
+    cache.set(1, "b")
+    cache.set(2, "c")
+    cache.set(3, "d")
+    assert cache.index == {"c": 2, "d": 3}
+
+    cache.invalidate(2)
+    cache.clear()
+    assert cache.index == {}
@@ -0,0 +1,196 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.cores.auth import token_digest
+from app.cores.blacklist_index import blacklist_index
+from app.cores.database import SessionLocal, engine
+from app.cores.unit_of_work import UnitOfWork, after_commit, commit_or_flush, savepoint
+from app.main import app
+from app.models.active_access_tokens import ActiveAccessToken
+from app.models.sessions import Session
+from app.models.token_logs import TokenLog
+from app.models.users import User
+from app.repositories.blacklist_token_repository import BlacklistedTokenRepository
+from app.repositories.token_log_repository import TokenLogRepository
+from app.services.rate_limiter_service import RateLimiterService
+
+client = TestClient(app, base_url="https://testserver")
+
+
+@pytest.fixture
+def commits():
+    committed = []
+
+    def on_commit(conn):
+        committed.append(conn)
+
+    event.listen(engine, "commit", on_commit)
+    yield committed
+    event.remove(engine, "commit", on_commit)
+
+
+@pytest.fixture
+def username(register_user):
+    return register_user("uow", "Unit Of Work")[1]
+
+
+@pytest.fixture
+def login(login_user):
+    # Đăng nhập qua client của module để các request refresh sau đó gửi kèm cookie refresh token
+    return lambda username: login_user(username, via=client)["access_token"]
+
+
+def test_login_refresh_and_logout_commit_once(username, commits, login):
+    access_token = login(username)
+    assert len(commits) == 1
+
+    commits.clear()
+    response = client.post("/api/v1/auth/refresh")
+    assert response.status_code == 200
+    assert len(commits) == 1
+
+    commits.clear()
+    response = client.post("/api/v1/auth/logout", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert len(commits) == 1
+
+
+def test_login_and_refresh_are_not_flagged_against_their_own_log(username, login):
+    login(username)
+    login(username)
+    response = client.post("/api/v1/auth/refresh")
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        actions = [log.action for log in db.query(TokenLog).filter(TokenLog.username == username)]
+    finally:
+        db.close()
+    assert actions == ["login", "login", "refresh"]
+
+
+def test_unit_of_work_commits_once_and_defers_callbacks(commits):
+    db = SessionLocal()
+    published = []
+    try:
+        with UnitOfWork(db):
+            db.add(TokenLog(ip_address="127.0.0.1", action="uow test"))
+            assert commit_or_flush(db) is False
+            with UnitOfWork(db):
+                db.add(TokenLog(ip_address="127.0.0.1", action="uow test"))
+                commit_or_flush(db)
+            after_commit(db, lambda: published.append(True))
+            assert commits == [] and published == []
+        assert len(commits) == 1
+        assert published == [True]
+    finally:
+        db.close()
+
+
+def test_unit_of_work_rolls_back_on_error():
+    db = SessionLocal()
+    marker = f"uow rollback {uuid.uuid4().hex}"
+    published = []
+    try:
+        with pytest.raises(RuntimeError):
+            with UnitOfWork(db):
+                db.add(TokenLog(ip_address="127.0.0.1", action=marker))
+                commit_or_flush(db)
+                after_commit(db, lambda: published.append(True))
+                raise RuntimeError("boom")
+        assert db.query(TokenLog).filter(TokenLog.action == marker).count() == 0
+        assert published == []
+    finally:
+        db.close()
+
+
+def test_rate_limiter_blacklist_reaches_the_index_only_after_commit():
+    committed, rolled_back = f"rl-{uuid.uuid4().hex}", f"rl-{uuid.uuid4().hex}"
+    db = SessionLocal()
+    try:
+        with UnitOfWork(db):
+            RateLimiterService(db).blacklist_token(committed)
+            assert not blacklist_index.contains(token_digest(committed))
+        assert blacklist_index.contains(token_digest(committed))
+
+        with pytest.raises(RuntimeError):
+            with UnitOfWork(db):
+                RateLimiterService(db).blacklist_token(rolled_back)
+                raise RuntimeError("boom")
+        assert not blacklist_index.contains(token_digest(rolled_back))
+        assert not BlacklistedTokenRepository(db).is_blacklisted(token_digest(rolled_back))
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def failing_token_log(monkeypatch):
+    # Log vi phạm NOT NULL: lỗi chỉ xuất hiện khi flush, giữa transaction của login/refresh
+    def create(self, log_create):
+        self.db.add(TokenLog(ip_address=None, action=log_create.action))
+        commit_or_flush(self.db)
+
+    monkeypatch.setattr(TokenLogRepository, "create", create)
+
+
+def test_login_and_refresh_succeed_when_log_write_fails(username, failing_token_log, login):
+    access_token = login(username)
+    response = client.post("/api/v1/auth/refresh")
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).one()
+        assert db.query(ActiveAccessToken).filter(ActiveAccessToken.user_id == user.id).count() == 2
+        assert db.query(ActiveAccessToken).filter(
+            ActiveAccessToken.token_digest == token_digest(access_token)
+        ).count() == 1
+        assert db.query(Session).filter(Session.user_id == user.id).count() == 1
+        assert db.query(TokenLog).filter(TokenLog.username == username).count() == 0
+    finally:
+        db.close()
+
+
+def test_logout_succeeds_when_access_token_row_is_missing(username, login):
+    access_token = login(username)
+    db = SessionLocal()
+    try:
+        db.query(ActiveAccessToken).filter(ActiveAccessToken.token_digest == token_digest(access_token)).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/api/v1/auth/logout", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).one()
+        assert db.query(Session).filter(Session.user_id == user.id, Session.revoked.is_(False)).count() == 0
+        assert BlacklistedTokenRepository(db).is_blacklisted(token_digest(access_token))
+    finally:
+        db.close()
+
+
+def test_savepoint_discards_only_its_own_changes_and_callbacks():
+    db = SessionLocal()
+    kept, discarded = f"uow kept {uuid.uuid4().hex}", f"uow discarded {uuid.uuid4().hex}"
+    published = []
+    try:
+        with UnitOfWork(db):
+            db.add(TokenLog(ip_address="127.0.0.1", action=kept))
+            commit_or_flush(db)
+            after_commit(db, lambda: published.append(kept))
+            with pytest.raises(RuntimeError):
+                with savepoint(db):
+                    db.add(TokenLog(ip_address="127.0.0.1", action=discarded))
+                    commit_or_flush(db)
+                    after_commit(db, lambda: published.append(discarded))
+                    raise RuntimeError("boom")
+        assert db.query(TokenLog).filter(TokenLog.action.in_([kept, discarded])).count() == 1
+        assert published == [kept]
+    finally:
+        db.close()
@@ -0,0 +1,258 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.cores.database import Base
+from app.cores.rate_limiter_engine import BufferedSQLRateLimiterEngine, create_rate_limiter_engine
+from app.cores.usage_log_buffer import TokenUsageBuffer
+from app.models.token_usage_log import TokenUsageLog
+from app.services.rate_limiter_service import RateLimiterService
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[TokenUsageLog.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine)
+
+
+@pytest.fixture
+def statements(db_engine):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(db_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def stored_rows(db_engine) -> int:
+    with db_engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(TokenUsageLog)).scalar_one()
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def block_after_commit(monkeypatch):
+    committed = threading.Event()
+    release = threading.Event()
+    log_batch = RateLimiterService.log_token_usage_batch
+
+    def slow_log_batch(self, events):
+        log_batch(self, events)
+        committed.set()
+        release.wait(5)
+
+    monkeypatch.setattr(RateLimiterService, "log_token_usage_batch", slow_log_batch)
+    return committed, release
+
+
+def test_flushes_when_queue_reaches_flush_size(session_factory, db_engine):
+    buffer = TokenUsageBuffer(flush_size=3, flush_interval=60, session_factory=session_factory)
+    buffer.start()
+    try:
+        now = datetime.now(timezone.utc)
+        buffer.record("a", now)
+        buffer.record("a", now)
+        time.sleep(0.1)
+        assert stored_rows(db_engine) == 0
+
+        buffer.record("b", now)
+        wait_until(lambda: buffer.stats()["flushes"] == 1)
+        assert stored_rows(db_engine) == 3
+        assert buffer.stats()["queue_depth"] == 0
+    finally:
+        buffer.stop()
+
+
+def test_flushes_after_interval(session_factory, db_engine):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=0.05, session_factory=session_factory)
+    buffer.start()
+    try:
+        buffer.record("a", datetime.now(timezone.utc))
+        wait_until(lambda: stored_rows(db_engine) == 1)
+    finally:
+        buffer.stop()
+
+
+def test_stop_drains_remaining_events(session_factory, db_engine):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    buffer.start()
+    now = datetime.now(timezone.utc)
+    for _ in range(5):
+        buffer.record("a", now)
+
+    buffer.stop()
+
+    assert stored_rows(db_engine) == 5
+    assert buffer.stats()["queue_depth"] == 0
+
+
+def test_count_is_exact_while_flush_is_in_flight(monkeypatch, session_factory):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=10)
+    assert buffer.count("a", since) == 0
+    for _ in range(3):
+        buffer.record("a", now)
+
+    committed, release = block_after_commit(monkeypatch)
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    assert committed.wait(5)
+
+    # Lô đã commit nhưng flush chưa xong: không bị đếm cả trong DB lẫn trong lô đang ghi
+    buffer.record("a", now)
+    assert buffer.count("a", since) == 4
+
+    release.set()
+    flusher.join()
+    assert buffer.count("a", since) == 4
+    buffer.flush()
+    assert buffer.count("a", since) == 4
+
+
+def test_count_reads_db_once_per_digest(session_factory, statements):
+    # Request đã ghi trước đó (vd. worker khác)
+    db = session_factory()
+    now = datetime.now(timezone.utc)
+    RateLimiterService(db).log_token_usage_batch([("a", now - timedelta(seconds=1)), ("a", now - timedelta(minutes=5))])
+    db.close()
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    since = now - timedelta(seconds=10)
+    statements.clear()
+
+    assert buffer.count("a", since) == 1
+    for _ in range(5):
+        buffer.record("a", now)
+        buffer.count("a", since)
+
+    assert len(statements) == 1
+    assert buffer.count("a", since) == 6
+    assert buffer.stats()["seeds"] == 1
+
+
+def test_flush_reloads_usage_written_by_other_workers(session_factory):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=10)
+    assert buffer.count("a", since) == 0
+    buffer.record("a", now)
+
+    db = session_factory()
+    RateLimiterService(db).log_token_usage_batch([("a", now), ("a", now)])
+    db.close()
+    assert buffer.count("a", since) == 1
+
+    buffer.flush()
+    assert buffer.count("a", since) == 3
+
+
+def test_sql_buffered_engine_limits_without_querying_per_request(session_factory, statements):
+    engine = create_rate_limiter_engine("sql_buffered")
+    assert isinstance(engine, BufferedSQLRateLimiterEngine)
+    engine.buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    statements.clear()
+
+    results = [engine.is_rate_limited("token-a", 10, 10) for _ in range(11)]
+
+    assert results[:10] == [False] * 10
+    assert results[10] is True
+    assert len(statements) == 1
+
+    engine.buffer.flush()
+    assert engine.is_rate_limited("token-a", 10, 10) is True
+    assert engine.is_rate_limited("token-b", 10, 10) is False
+    assert engine.stats()["backend"] == "sql_buffered"
+
+
+def test_seed_does_not_wait_for_a_running_flush(monkeypatch, session_factory):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    now = datetime.now(timezone.utc)
+    buffer.record("a", now)
+    committed, release = block_after_commit(monkeypatch)
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    assert committed.wait(5)
+
+    try:
+        start = time.monotonic()
+        assert buffer.count("b", now - timedelta(seconds=10)) == 0
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+        flusher.join()
+
+
+def test_seed_during_flush_of_the_same_digest_does_not_double_count(monkeypatch, session_factory):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory)
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=10)
+    for _ in range(3):
+        buffer.record("a", now)
+    committed, release = block_after_commit(monkeypatch)
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    assert committed.wait(5)
+
+    # Lô đã commit nhưng còn trong _in_flight: kết quả đọc không được lưu, không đếm hai lần
+    buffer.seed("a", since)
+    assert buffer.needs_seed("a")
+    assert buffer.count("a", since, load=False) == 3
+
+    release.set()
+    flusher.join()
+    assert not buffer.needs_seed("a")
+    assert buffer.count("a", since) == 3
+
+
+def test_reload_keeps_the_longest_requested_period(session_factory):
+    buffer = TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory, window_seconds=10)
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=60)
+    db = session_factory()
+    RateLimiterService(db).log_token_usage_batch([("a", now - timedelta(seconds=30))])
+    db.close()
+
+    assert buffer.count("a", since) == 1
+    buffer.record("a", now)
+    buffer.flush()
+
+    assert buffer.count("a", since) == 2
+
+
+def test_buffered_engine_check_seeds_off_the_event_loop(monkeypatch, session_factory):
+    engine = BufferedSQLRateLimiterEngine(TokenUsageBuffer(flush_size=100, flush_interval=60, session_factory=session_factory))
+    seed = engine.buffer.seed
+    seed_threads = []
+
+    def recording_seed(digest, since):
+        seed_threads.append(threading.current_thread())
+        seed(digest, since)
+
+    monkeypatch.setattr(engine.buffer, "seed", recording_seed)
+
+    async def scenario():
+        return [await engine.check("token-a", 2, 10) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [False, False, True]
+    assert len(seed_threads) == 1
+    assert seed_threads[0] is not threading.main_thread()
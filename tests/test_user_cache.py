@@ -0,0 +1,70 @@
+from app.cores.database import SessionLocal
+from app.cores.user_cache import UserSummary, UserSummaryCache, user_cache
+from app.main import app  # noqa: F401 (tạo bảng và đăng ký mọi model)
+from app.models.posts import Post
+from app.models.users import RoleEnum, User
+from app.repositories.user_repository import UserRepository
+from app.services.post_service import PostService
+
+
+def summary(user_id: int, username: str = "alice", status: bool = True) -> UserSummary:
+    return UserSummary(id=user_id, username=username, role=RoleEnum.user, status=status)
+
+
+def test_lookup_by_id_and_username_and_lru_eviction():
+    cache = UserSummaryCache(max_size=2, ttl_seconds=60)
+    for user_id, username in ((1, "a"), (2, "b"), (3, "c")):
+        cache.put(user_id, summary(user_id, username), cache.generation())
+
+    assert cache.get(1) is None
+    assert cache.get_by_username("b").id == 2
+    assert cache.get(3).username == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_load_racing_with_invalidate_is_not_cached():
+    cache = UserSummaryCache(max_size=10, ttl_seconds=60)
+
+    def loader():
+        # User bị block trong lúc đang đọc bản ghi cũ
+        cache.invalidate(1)
+        return summary(1)
+
+    assert cache.get_or_load(1, loader).status is True
+    assert cache.get(1) is None
+    assert cache.stats()["stale_skips"] == 1
+
+    loaded = cache.get_or_load(1, lambda: summary(1, status=False))
+    assert cache.get(1) == loaded
+
+
+def create_post(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        post = Post(title="cached owner", content="content", user_id=user_id)
+        db.add(post)
+        db.commit()
+        return post.id
+    finally:
+        db.close()
+
+
+def test_post_reads_reuse_cached_owner_and_see_block_immediately(register_user, statements):
+    user_id, _ = register_user("uc", "User Cache")
+    post_id = create_post(user_id)
+    statements.clear()
+    db = SessionLocal()
+    try:
+        PostService(db).get_post_by_id(post_id)
+        PostService(db).get_post_by_id(post_id)
+        user_lookups = [s for s in statements if "FROM users" in s]
+
+        UserRepository(db).block_user(db.get(User, user_id))
+        assert user_cache.get(user_id) is None
+        blocked = UserRepository(db).get_summary_by_id(user_id)
+    finally:
+        db.close()
+
+    assert len(user_lookups) == 1
+    assert blocked.status is False
+    assert blocked.version == 1
@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cores.user_search import query_patterns, search_text, trigrams
+from app.main import app
+from app.models.users import RoleEnum
+
+client = TestClient(app)
+URL = "/api/v1/admin/users/search"
+
+
+def test_search_text_and_query_patterns():
+    assert search_text("Alice_1", "Nguyễn Đức Thảo") == "^^alice_1 ^^nguyen ^^duc ^^thao"
+    assert query_patterns("Đức th") == ["duc", "^^th"]
+    assert trigrams("^^ab ^^c") == {"^^a", "^ab", "^^c"}
+
+
+@pytest.fixture
+def register(register_user, login_user):
+    def register(fullname: str, username: str = None) -> tuple[str, dict]:
+        _, username = register_user("us", fullname, username=username)
+        return username, {"Authorization": f"Bearer {login_user(username)['access_token']}"}
+
+    return register
+
+
+@pytest.fixture
+def admin_headers(auth_headers):
+    return auth_headers("us", "User Search Admin", RoleEnum.admin)
+
+
+def search(headers: dict, q: str) -> list[str]:
+    response = client.get(URL, params={"q": q}, headers=headers)
+    assert response.status_code == 200
+    return [user["username"] for user in response.json()]
+
+
+def test_prefix_and_substring_search_ranked_by_relevance(register, admin_headers):
+    tag = uuid.uuid4().hex[:6]
+    substring, _ = register(f"Trần Thị Q{tag}zz")
+    prefix, _ = register(f"Lê Văn {tag}zz Dài Hơn")
+    short_prefix, _ = register(f"{tag}zz Ngắn")
+    exact, _ = register("Someone Else", username=f"{tag}zz")
+    headers = admin_headers
+
+    assert search(headers, f"{tag.upper()}ZZ") == [exact, short_prefix, prefix, substring]
+    assert search(headers, f"tran {tag}") == [substring]
+    assert search(headers, f"ngan {tag}") == [short_prefix]
+    # Từ ngắn hơn 3 ký tự chỉ khớp đầu từ
+    assert search(headers, f"{tag} th") == [substring]
+    assert search(headers, f"{tag} hi") == []
+
+
+def test_index_follows_profile_update_and_filters_admin_pages(register, admin_headers):
+    tag = uuid.uuid4().hex[:6]
+    username, user_headers = register(f"Old {tag}name")
+    headers = admin_headers
+    assert search(headers, f"old {tag}") == [username]
+
+    response = client.put("/api/v1/users/me", headers=user_headers, json={
+        "email": f"{username}@example.com",
+        "fullname": f"Mới {tag}name",
+        "gender": "other",
+    })
+    assert response.status_code == 200
+    assert search(headers, f"old {tag}") == []
+    assert search(headers, f"moi {tag}") == [username]
+
+    page = client.get("/api/v1/admin/users-with-posts", params={"name": f"{tag}name"}, headers=headers).json()
+    assert [user["username"] for user in page["data"]] == [username]
+    assert page["pagination"]["total"] == 1